@@ -4,26 +4,31 @@ A Flask application that allows users to explore Wikipedia articles and visualiz
 Google Gemini's recursive search process in real-time.
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import logging
 from flask import Flask
 from flask_socketio import SocketIO
 
 from config import Config
-from utils.rate_limiter import RateLimiter
-from services.gemini_service import GeminiService
-from services.search_engine import RecursiveSearchEngine
+from services.container import ServiceContainer
+from services.search_workers import create_search_runner
 from routes.main_routes import main_bp
 from routes.socket_handlers import register_socket_handlers
+from utils.structured_logging import configure_logging
+from utils.ws_deflate import install_ws_deflate
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, Config.LOG_LEVEL.upper()),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: records are formatted and written off the request and search threads
+configure_logging()
 logger = logging.getLogger(__name__)
 
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
 def create_app():
     """Create and configure the Flask application."""
+    started = time.perf_counter()
     app = Flask(__name__)
     app.config.from_object(Config)
 
@@ -35,52 +40,69 @@ def create_app():
         cors_allowed_origins="*",
         logger=Config.DEBUG,
         engineio_logger=Config.DEBUG,
-        async_mode='threading'  # Use threading for better compatibility
+        async_mode='threading',  # Use threading for better compatibility
+        # lets search workers in other processes emit to this node's clients
+        message_queue=Config.SOCKETIO_MESSAGE_QUEUE or None,
+        # the polling fallback compresses large responses; WebSockets use
+        # permessage-deflate (see utils.ws_deflate)
+        http_compression=True,
+        compression_threshold=Config.POLLING_COMPRESSION_THRESHOLD
     )
+    install_ws_deflate()
 
     logger.info("✅ SocketIO initialized")
 
-    # Initialize services
-    logger.info("🔧 Initializing services...")
-    rate_limiter = RateLimiter(max_calls_per_minute=Config.MAX_CALLS_PER_MINUTE)
-    gemini_service = GeminiService(rate_limiter)
-    search_engine = RecursiveSearchEngine(socketio, gemini_service)
-
-    logger.info("✅ Services initialized")
+    # Services are built on first use (or by the warm-up below), once, and shared
+    services = ServiceContainer(socketio)
+    search_runner = create_search_runner(socketio, services)
 
     # Register blueprints
     app.register_blueprint(main_bp)
     logger.info("✅ Blueprints registered")
 
     # Register socket handlers
-    register_socket_handlers(socketio, search_engine, rate_limiter)
+    register_socket_handlers(socketio, search_runner, services)
     logger.info("✅ Socket handlers registered")
 
     # Store services in app context for access in routes
-    app.rate_limiter = rate_limiter
-    app.gemini_service = gemini_service
-    app.search_engine = search_engine
+    app.services = services
+    app.search_runner = search_runner
 
     # Log configuration
     logger.info("📊 Application Configuration:")
-    logger.info(f"  - Gemini service available: {gemini_service.is_available()}")
-    logger.info(f"  - Model info: {gemini_service.get_model_info()}")
+    logger.info(f"  - Gemini backend: {Config.GEMINI_BACKEND} ({Config.GEMINI_MODEL})")
     logger.info(f"  - Rate limiting: {Config.MAX_CALLS_PER_MINUTE} calls per minute")
+    logger.info(f"  - Search workers: {search_runner.get_status()}")
     logger.info(f"  - Max search depth: {Config.MAX_SEARCH_DEPTH}")
     logger.info(f"  - Max articles per level: {Config.MAX_ARTICLES_PER_LEVEL}")
+    logger.info(f"  - Pre-warming: {Config.PREWARM_ENABLED} ({Config.PREWARM_QUOTA_SHARE:.0%} quota share)")
     logger.info(f"  - Debug mode: {Config.DEBUG}")
 
-    logger.info("✅ Wikipedia Explorer application created successfully")
+    services.timings["import:app"] = round(_IMPORT_SECONDS, 4)
+    services.timings["create_app"] = round(time.perf_counter() - started, 4)
+    logger.info(
+        f"✅ Wikipedia Explorer application created in {services.timings['create_app']:.3f}s "
+        f"(imports {services.timings['import:app']:.3f}s)"
+    )
+
+    if Config.WARM_UP_ON_START:
+        services.warm_up_in_background(socketio.start_background_task)
+
+    if Config.PREWARM_ENABLED:
+        services.prewarmer.start(socketio.start_background_task)
 
     return app, socketio
 
-# Create the application
-app, socketio = create_app()
+# Create the application.  Spawned search workers re-import this script as
+# __mp_main__ and build their own services, so they skip it.
+if __name__ != '__mp_main__':
+    app, socketio = create_app()
 
-# Make services available for imports (for backward compatibility)
-rate_limiter = app.rate_limiter
-gemini_service = app.gemini_service
-search_engine = app.search_engine
+def __getattr__(name):
+    """Lazily built services, for modules that still do ``from app import gemini_service``."""
+    if name in ('rate_limiter', 'gemini_service', 'search_engine'):
+        return getattr(app.services, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
     logger.info("🌟 Starting Wikipedia Explorer with Google Gemini...")
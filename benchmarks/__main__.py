@@ -0,0 +1,41 @@
+"""
+Run the micro-benchmark suite, optionally against a saved baseline.
+
+    python -m benchmarks                       # just run and print
+    python -m benchmarks --save-baseline       # record benchmarks/.results/.../*_baseline.json
+    python -m benchmarks --compare             # fail if any median regressed >15%
+    python -m benchmarks --compare --threshold 5
+
+Extra arguments after ``--`` are passed straight to pytest.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the micro-benchmark suite.")
+    parser.add_argument("--save-baseline", action="store_true", help="save results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the saved baseline")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed median regression in %%")
+    parser.add_argument("pytest_args", nargs="*")
+    args = parser.parse_args()
+
+    argv = ["-c", str(HERE / "pytest.ini"), "--rootdir", str(HERE.parent), str(HERE)]
+    if args.save_baseline:
+        argv.append("--benchmark-save=baseline")
+    if args.compare:
+        argv += [
+            "--benchmark-compare=*baseline",
+            f"--benchmark-compare-fail=median:{args.threshold:g}%",
+        ]
+    return pytest.main(argv + args.pytest_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
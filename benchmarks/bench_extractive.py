@@ -0,0 +1,19 @@
+"""
+Benchmarks for extractive sentence selection on a fetched article.
+"""
+
+import pytest
+
+from services.google_search_api import GoogleSearchAPI
+from utils.extractive import select_sentences
+
+
+@pytest.fixture(scope="module")
+def article_text(article_html):
+    return GoogleSearchAPI._extract_html(article_html)
+
+
+@pytest.mark.parametrize("max_chars", [400, 1000])
+def bench_select_sentences(benchmark, article_text, max_chars):
+    selected = benchmark(select_sentences, article_text, max_chars, "History of the printing press")
+    assert 0 < len(selected) <= max_chars
@@ -0,0 +1,39 @@
+"""
+Benchmarks for GoogleSearchAPI text extraction and result filtering.
+"""
+
+import pytest
+
+from services.google_search_api import GoogleSearchAPI
+
+
+def bench_extract_html(benchmark, article_html):
+    text = benchmark(GoogleSearchAPI._extract_html, article_html)
+    assert text
+
+
+def bench_extract_pdf(benchmark, article_pdf):
+    pytest.importorskip("pdfminer")
+    text = benchmark(GoogleSearchAPI._extract_pdf, article_pdf)
+    assert text
+
+
+def bench_format_and_filter_page(benchmark, search_page):
+    api = GoogleSearchAPI()
+    items = search_page["items"]
+
+    def run():
+        return [r for r in map(api._format, items) if api._is_relevant(r)]
+
+    assert benchmark(run)
+
+
+@pytest.mark.parametrize("blocklist_size", [10, 10000])
+def bench_filter_page_large_blocklist(benchmark, search_page, blocklist_size):
+    from services.result_filter import EXCLUDED_DOMAINS, ResultFilter
+
+    domains = list(EXCLUDED_DOMAINS) + [f"spam{i}.example.com" for i in range(blocklist_size)]
+    result_filter = ResultFilter(keywords=["article", "guide"], excluded_domains=domains)
+    page = [GoogleSearchAPI._format(item) for item in search_page["items"]]
+
+    benchmark(result_filter.filter, page)
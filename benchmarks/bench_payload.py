@@ -0,0 +1,46 @@
+"""
+Benchmarks for encoding tree_update payloads: JSON text vs msgpack bytes,
+with and without the permessage-deflate compression the WebSocket adds.
+"""
+
+import json
+import zlib
+
+import pytest
+
+from conftest import TREE_SIZES, build_tree
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def _summaries(size):
+    return {nid: node.to_summary_dict() for nid, node in build_tree(size).items()}
+
+
+def _json(tree):
+    return json.dumps(tree, separators=(",", ":")).encode()
+
+
+def _msgpack(tree):
+    return msgpack.packb(tree, use_bin_type=True)
+
+
+@pytest.mark.parametrize("encode", [_json, _msgpack], ids=["json", "msgpack"])
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_encode_tree(benchmark, size, encode):
+    tree = _summaries(size)
+    payload = benchmark(encode, tree)
+    benchmark.extra_info["bytes"] = len(payload)
+
+
+@pytest.mark.parametrize("encode", [_json, _msgpack], ids=["json", "msgpack"])
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_encode_and_deflate_tree(benchmark, size, encode):
+    tree = _summaries(size)
+
+    def run():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        return compressor.compress(encode(tree)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    payload = benchmark(run)
+    benchmark.extra_info["bytes"] = len(payload)
@@ -0,0 +1,33 @@
+"""
+Benchmarks for RateLimiter under thread contention.
+"""
+
+import threading
+
+import pytest
+
+from utils.rate_limiter import RateLimiter
+
+CALLS_PER_THREAD = 200
+
+
+@pytest.mark.parametrize("threads", [1, 8, 32])
+def bench_rate_limiter_contention(benchmark, threads):
+    def run():
+        limiter = RateLimiter(max_calls_per_minute=threads * CALLS_PER_THREAD)
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            barrier.wait()
+            for _ in range(CALLS_PER_THREAD):
+                if limiter.can_make_call():
+                    limiter.record_call()
+                limiter.wait_time()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+    benchmark.pedantic(run, rounds=5, iterations=1)
@@ -0,0 +1,50 @@
+"""
+Benchmarks for tree serialisation and traversal in RecursiveSearchEngine.
+"""
+
+import pytest
+
+from conftest import TREE_SIZES, build_tree
+
+
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_node_to_dict(benchmark, size):
+    nodes = list(build_tree(size).values())
+    benchmark(lambda: [n.to_dict() for n in nodes])
+
+
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_emit_tree_update(benchmark, engine, size):
+    engine.search_tree = build_tree(size)
+    benchmark(engine._emit_tree_update, "bench-session")
+    assert engine.emitter.flush()
+    assert engine.socketio.bytes_sent
+
+
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_find_unique_result(benchmark, engine, search_page, size):
+    engine.search_tree = build_tree(size)
+    results = [
+        {"url": item["link"], "title": item["title"]} for item in search_page["items"]
+    ]
+    assert benchmark(engine._find_unique_result, results)
+
+
+@pytest.mark.parametrize("size", TREE_SIZES)
+def bench_collect_abstract_blocks(benchmark, engine, size):
+    tree = build_tree(size)
+    for node in tree.values():
+        node.synthesis = None
+    engine.search_tree = tree
+
+    def run():
+        for node in tree.values():
+            node.synthesis = None
+        # synthesise bottom-up first, as the recursion would
+        for node in reversed(list(tree.values())):
+            if node.children:
+                engine._synthesize_subtree(node)
+        return engine._collect_abstract_blocks()
+
+    leaf_block, full_block = benchmark(run)
+    assert full_block
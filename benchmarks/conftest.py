@@ -0,0 +1,86 @@
+"""
+Shared fixtures for the micro-benchmark suite.
+
+The benchmarks run fully offline: the service config is pointed at the fake
+backends before any application module is imported, and the inputs are the
+recorded pages under ``benchmarks/fixtures``.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+os.environ.setdefault("GOOGLE_SEARCH_BASE_URL", "http://127.0.0.1:9/customsearch/v1")
+sys.path.insert(0, str(ROOT))
+
+from models.search_tree import SearchTreeNode  # noqa: E402
+from services.search_engine import RecursiveSearchEngine  # noqa: E402
+
+TREE_SIZES = [10, 100, 1000]
+
+
+class _StaticGemini:
+    """GeminiService stand-in whose condensing step costs nothing."""
+
+    @staticmethod
+    def synthesize_subtree(subtree_title, abstracts, max_tokens):
+        return abstracts[: max_tokens * 2]
+
+
+class _RecordingSocketIO:
+    """Socket.IO stand-in that JSON-encodes each payload like the real server."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    def emit(self, event, data, room=None, **kwargs):
+        self.bytes_sent += len(json.dumps(data))
+
+
+def build_tree(size: int, fanout: int = 3) -> dict:
+    """Build a breadth-first tree of *size* populated nodes."""
+    snippet = (FIXTURES / "search_page.json").read_text()[:300]
+    tree = {}
+    order = []
+    for i in range(size):
+        parent_id = order[(i - 1) // fanout] if i else None
+        node = SearchTreeNode(f"Article {i}", parent_id)
+        node.id = f"node-{i}"
+        node.url = f"https://example{i % 97}.com/article/{i}"
+        node.snippet = snippet
+        node.image = f"https://example{i % 97}.com/img/{i}.jpg"
+        node.source = f"example{i % 97}.com"
+        node.search_query = f"history of article {i}"
+        node.summary = snippet
+        node.set_completed()
+        tree[node.id] = node
+        order.append(node.id)
+        if parent_id:
+            tree[parent_id].add_child(node.id)
+    return tree
+
+
+@pytest.fixture(scope="session")
+def article_html() -> str:
+    return (FIXTURES / "article.html").read_text()
+
+
+@pytest.fixture(scope="session")
+def article_pdf() -> bytes:
+    return (FIXTURES / "article.pdf").read_bytes()
+
+
+@pytest.fixture(scope="session")
+def search_page() -> dict:
+    return json.loads((FIXTURES / "search_page.json").read_text())
+
+
+@pytest.fixture
+def engine():
+    return RecursiveSearchEngine(_RecordingSocketIO(), gemini_service=_StaticGemini())
@@ -4,30 +4,157 @@ Configuration settings for Wikipedia Explorer
 
 import os
 
-from flask import Flask
-
-app = Flask(__name__)
-
 class Config:
     # Flask settings
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
     # Google Custom Search API settings
-    GOOGLE_SEARCH_API_KEY = os.environ["GOOGLE_SEARCH_API_KEY"]
-    GOOGLE_SEARCH_ENGINE_ID = os.environ['GOOGLE_SEARCH_ENGINE_ID']
+    GOOGLE_SEARCH_API_KEY = os.getenv('GOOGLE_SEARCH_API_KEY', '')
+    GOOGLE_SEARCH_ENGINE_ID = os.getenv('GOOGLE_SEARCH_ENGINE_ID', '')
+    # Point at services/fake_backends.SearchStubServer to run offline
+    GOOGLE_SEARCH_BASE_URL = os.getenv('GOOGLE_SEARCH_BASE_URL', 'https://www.googleapis.com/customsearch/v1')
+
+    # Credential pools (services/credential_pool.py): further keys as a comma-separated
+    # list ('key' or 'key:engine_id' for search), and each key's quota per minute and
+    # per day (0: not enforced locally, only counted)
+    GOOGLE_SEARCH_EXTRA_CREDENTIALS = [c.strip() for c in os.getenv('GOOGLE_SEARCH_EXTRA_CREDENTIALS', '').split(',') if c.strip()]
+    GOOGLE_SEARCH_KEY_CALLS_PER_MINUTE = int(os.getenv('GOOGLE_SEARCH_KEY_CALLS_PER_MINUTE', '0'))
+    GOOGLE_SEARCH_KEY_CALLS_PER_DAY = int(os.getenv('GOOGLE_SEARCH_KEY_CALLS_PER_DAY', '0'))
 
     SEARCH_RESULTS_LIMIT = int(os.getenv('SEARCH_RESULTS_LIMIT', '10'))
     SEARCH_KEYWORDS = ['article', 'news', 'blog', 'post', 'guide', 'tutorial', 'review', 'analysis']
 
+    # Result relevance rules (see services/result_filter.py for the defaults).
+    # EXCLUDED_DOMAINS_FILE holds one domain per line and may list thousands.
+    RELEVANCE_CONTENT_TERMS = [t.strip() for t in os.getenv('RELEVANCE_CONTENT_TERMS', '').split(',') if t.strip()]
+    EXTRA_EXCLUDED_DOMAINS = [d.strip() for d in os.getenv('EXTRA_EXCLUDED_DOMAINS', '').split(',') if d.strip()]
+    EXCLUDED_DOMAINS_FILE = os.getenv('EXCLUDED_DOMAINS_FILE', '')
+
+    # In-process cache of /api/search results: a repeated query is answered at once
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '256'))
+    SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', '600'))
+
+    # /api/search pagination: results per response (one upstream page at most),
+    # and whether to fetch the page behind the next cursor in the background
+    SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '10'))
+    SEARCH_PREFETCH_NEXT_PAGE = os.getenv('SEARCH_PREFETCH_NEXT_PAGE', 'True').lower() == 'true'
+
+    # Article fetching (services/article_fetcher.py): concurrency caps, pool sizes,
+    # body size cap, DNS cache TTL (0 disables) and HTTP/2 (needs httpx[http2])
+    FETCH_MAX_CONCURRENCY = int(os.getenv('FETCH_MAX_CONCURRENCY', '16'))
+    FETCH_PER_HOST_CONCURRENCY = int(os.getenv('FETCH_PER_HOST_CONCURRENCY', '4'))
+    FETCH_POOL_HOSTS = int(os.getenv('FETCH_POOL_HOSTS', '64'))
+    FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', str(10 * 1024 * 1024)))
+    FETCH_DNS_CACHE_TTL = float(os.getenv('FETCH_DNS_CACHE_TTL', '300'))
+    FETCH_HTTP2 = os.getenv('FETCH_HTTP2', 'False').lower() == 'true'
+
+    # Shared HTTP clients (services/http_clients.py): connections per upstream
+    # for the Custom Search API and Gemini; article pools use the FETCH_* sizes
+    GOOGLE_SEARCH_POOL_SIZE = int(os.getenv('GOOGLE_SEARCH_POOL_SIZE', '10'))
+    GEMINI_POOL_SIZE = int(os.getenv('GEMINI_POOL_SIZE', '10'))
+
+    # Hedged requests (utils/hedging.py): an article fetch or Gemini call still running
+    # after the observed percentile of its latency (never sooner than the minimum
+    # delay) races a backup – the next result of the same query, or a duplicate
+    # Gemini request if quota allows – and the first to finish wins
+    HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', 'True').lower() == 'true'
+    HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '90'))
+    HEDGE_MIN_DELAY = float(os.getenv('HEDGE_MIN_DELAY', '1.0'))
+    HEDGE_MAX_WORKERS = int(os.getenv('HEDGE_MAX_WORKERS', '32'))
+
+    # Host health (services/host_health.py): failures before a host's circuit opens,
+    # initial and maximum cooldown, hosts remembered, and robots.txt handling
+    HOST_FAILURE_THRESHOLD = int(os.getenv('HOST_FAILURE_THRESHOLD', '3'))
+    HOST_COOLDOWN_SECONDS = float(os.getenv('HOST_COOLDOWN_SECONDS', '300'))
+    HOST_COOLDOWN_MAX_SECONDS = float(os.getenv('HOST_COOLDOWN_MAX_SECONDS', '3600'))
+    HOST_HEALTH_MAX_HOSTS = int(os.getenv('HOST_HEALTH_MAX_HOSTS', '2048'))
+    RESPECT_ROBOTS_TXT = os.getenv('RESPECT_ROBOTS_TXT', 'True').lower() == 'true'
+    ROBOTS_TXT_TTL = float(os.getenv('ROBOTS_TXT_TTL', '3600'))
+
     # Google Gemini settings
-    GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
-    MAX_TOKENS = int(os.getenv('MAX_TOKENS', '100'))
+    GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+    MAX_TOKENS = int(os.getenv('MAX_TOKENS', '100'))  # output cap per article summary
     TEMPERATURE = float(os.getenv('TEMPERATURE', '0.7'))
 
+    # Model routing (services/model_router.py): per-node tasks (queries, summaries,
+    # syntheses) use the fast model, final_analysis uses GEMINI_MODEL.  A model whose
+    # recent p90 latency exceeds its budget, or which was throttled within the
+    # cooldown, is tried after the next one in line.
+    GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.0-flash')
+    GEMINI_FAST_MODEL = os.getenv('GEMINI_FAST_MODEL', 'gemini-2.0-flash')
+    GEMINI_FALLBACK_MODEL = os.getenv('GEMINI_FALLBACK_MODEL', 'gemini-2.0-flash-lite')
+    GEMINI_QUERY_MAX_TOKENS = int(os.getenv('GEMINI_QUERY_MAX_TOKENS', '512'))
+    GEMINI_FAST_P90_BUDGET = float(os.getenv('GEMINI_FAST_P90_BUDGET', '5'))
+    GEMINI_ANALYSIS_P90_BUDGET = float(os.getenv('GEMINI_ANALYSIS_P90_BUDGET', '45'))
+    GEMINI_THROTTLE_COOLDOWN = float(os.getenv('GEMINI_THROTTLE_COOLDOWN', '30'))
+
+    GEMINI_EXTRA_API_KEYS = [k.strip() for k in os.getenv('GEMINI_EXTRA_API_KEYS', '').split(',') if k.strip()]
+    GEMINI_KEY_CALLS_PER_MINUTE = int(os.getenv('GEMINI_KEY_CALLS_PER_MINUTE', os.getenv('MAX_CALLS_PER_MINUTE', '15')))
+    GEMINI_KEY_CALLS_PER_DAY = int(os.getenv('GEMINI_KEY_CALLS_PER_DAY', '0'))
+
+    # 'google' for the real API, 'fake' for services/fake_backends.FakeGeminiClient
+    GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', 'google').lower()
+    FAKE_SEED = int(os.getenv('FAKE_SEED', '0'))
+    FAKE_GEMINI_LATENCY = float(os.getenv('FAKE_GEMINI_LATENCY', '0.5'))
+    FAKE_GEMINI_ERROR_RATE = float(os.getenv('FAKE_GEMINI_ERROR_RATE', '0'))
+    FAKE_GEMINI_THROTTLE_RATE = float(os.getenv('FAKE_GEMINI_THROTTLE_RATE', '0'))
+
+    # Extractive pre-summarisation (utils/extractive.py): article text kept per page, the
+    # characters of its most informative sentences sent to Gemini, and a no-LLM mode
+    # in which node summaries are extracted locally as well
+    ARTICLE_TEXT_MAX_CHARS = int(os.getenv('ARTICLE_TEXT_MAX_CHARS', '20000'))
+    EXTRACT_CONTENT_CHARS = int(os.getenv('EXTRACT_CONTENT_CHARS', '1000'))
+    LOCAL_SUMMARIES = os.getenv('LOCAL_SUMMARIES', 'False').lower() == 'true'
+    LOCAL_SUMMARY_CHARS = int(os.getenv('LOCAL_SUMMARY_CHARS', '400'))
+
+    # Batched summarisation: how many prompt tokens one multi-article request may use
+    SUMMARY_BATCH_TOKEN_BUDGET = int(os.getenv('SUMMARY_BATCH_TOKEN_BUDGET', '6000'))
+
+    # Hierarchical final analysis: a subtree's abstracts are condensed once they
+    # exceed the subtree budget, and the closing prompt is capped at the final budget
+    SUBTREE_SYNTHESIS_TOKEN_BUDGET = int(os.getenv('SUBTREE_SYNTHESIS_TOKEN_BUDGET', '1500'))
+    FINAL_ANALYSIS_TOKEN_BUDGET = int(os.getenv('FINAL_ANALYSIS_TOKEN_BUDGET', '6000'))
+
     # Rate limiting settings (Gemini has different limits)
-    MAX_CALLS_PER_MINUTE = int(os.getenv('MAX_CALLS_PER_MINUTE', '15'))  # Gemini allows more requests
+    MAX_CALLS_PER_MINUTE = int(os.getenv('MAX_CALLS_PER_MINUTE', '15'))  # Gemini allows more requests, per key
+
+    # Search workers (services/search_workers.py): 0 runs searches on threads of the
+    # web process; N>0 spawns N worker processes.  With a Socket.IO message queue
+    # (redis://...) jobs go through Redis and workers may run on other machines.
+    SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', '0'))
+    SEARCH_WORKER_THREADS = int(os.getenv('SEARCH_WORKER_THREADS', '2'))
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+    SEARCH_JOB_QUEUE_KEY = os.getenv('SEARCH_JOB_QUEUE_KEY', 'origin-explorer:search-jobs')
+
+    # Socket emits (services/session_emitter.py): at most one tree_update frame per
+    # session per interval, and tree frames are held back while a client has more
+    # than this many packets queued
+    EMIT_INTERVAL = float(os.getenv('EMIT_INTERVAL', '0.25'))
+    EMIT_MAX_CLIENT_BACKLOG = int(os.getenv('EMIT_MAX_CLIENT_BACKLOG', '16'))
+
+    # Socket payloads (utils/payload_codec.py, utils/ws_deflate.py): tree frames as
+    # msgpack for clients that ask, permessage-deflate on WebSocket connections and
+    # gzip/deflate for polling responses over the threshold (bytes).  Level 1-9;
+    # a window of 2**bits bytes per connection, kept between frames with context
+    # takeover so each tree frame compresses against the previous one.
+    SOCKETIO_MSGPACK = os.getenv('SOCKETIO_MSGPACK', 'True').lower() == 'true'
+    WS_DEFLATE = os.getenv('WS_DEFLATE', 'True').lower() == 'true'
+    WS_DEFLATE_LEVEL = int(os.getenv('WS_DEFLATE_LEVEL', '6'))
+    WS_DEFLATE_WINDOW_BITS = int(os.getenv('WS_DEFLATE_WINDOW_BITS', '15'))
+    WS_DEFLATE_CONTEXT_TAKEOVER = os.getenv('WS_DEFLATE_CONTEXT_TAKEOVER', 'True').lower() == 'true'
+    POLLING_COMPRESSION_THRESHOLD = int(os.getenv('POLLING_COMPRESSION_THRESHOLD', '1024'))
+    # Record the encoded size of JSON tree frames too (costs one extra encode per frame)
+    PAYLOAD_METRICS = os.getenv('PAYLOAD_METRICS', 'True').lower() == 'true'
+
+    # Node details served by /api/node/<id> (services/node_store.py): searches kept
+    # in memory and how long their details stay available
+    NODE_STORE_SESSIONS = int(os.getenv('NODE_STORE_SESSIONS', '256'))
+    NODE_STORE_TTL = float(os.getenv('NODE_STORE_TTL', '3600'))
+
+    # Generated queries whose content words overlap an earlier query of the same tree
+    # by at least this token Jaccard similarity reuse its results (services/query_registry.py)
+    QUERY_SIMILARITY_THRESHOLD = float(os.getenv('QUERY_SIMILARITY_THRESHOLD', '0.6'))
 
     # Search settings
     MAX_SEARCH_DEPTH = int(os.getenv('MAX_SEARCH_DEPTH', '2'))
@@ -44,5 +171,59 @@ class Config:
     HOST = os.getenv('HOST', '0.0.0.0')
     PORT = int(os.getenv('PORT', '5000'))
 
-    # Logging settings
+    # Pre-warming: explore the most opened root articles while the site is
+    # quiet and serve the stored trees instantly.  Off by default, since it
+    # spends quota unattended; it never uses more than PREWARM_QUOTA_SHARE of
+    # a daily quota or starts while live traffic uses more than that share of
+    # the Gemini minute window.  Demand is opens, each halving in weight every
+    # PREWARM_HALF_LIFE seconds; articles below PREWARM_MIN_DEMAND (1.5: opened
+    # twice lately) are skipped.
+    PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', 'False').lower() == 'true'
+    PREWARM_QUOTA_SHARE = float(os.getenv('PREWARM_QUOTA_SHARE', '0.2'))
+    PREWARM_INTERVAL = float(os.getenv('PREWARM_INTERVAL', '60'))
+    PREWARM_IDLE_SECONDS = float(os.getenv('PREWARM_IDLE_SECONDS', '120'))
+    PREWARM_TTL = float(os.getenv('PREWARM_TTL', '21600'))
+    PREWARM_TOP_N = int(os.getenv('PREWARM_TOP_N', '20'))
+    PREWARM_MIN_DEMAND = float(os.getenv('PREWARM_MIN_DEMAND', '1.5'))
+    PREWARM_HALF_LIFE = float(os.getenv('PREWARM_HALF_LIFE', '86400'))
+    PREWARM_MAX_TREES = int(os.getenv('PREWARM_MAX_TREES', '100'))
+
+    # Cost ledger: every upstream call is recorded for per-search and daily
+    # totals.  Costs are estimates from these list prices (USD).
+    GOOGLE_SEARCH_COST_PER_1000 = float(os.getenv('GOOGLE_SEARCH_COST_PER_1000', '5.0'))
+    GEMINI_INPUT_COST_PER_MILLION = float(os.getenv('GEMINI_INPUT_COST_PER_MILLION', '0.10'))
+    GEMINI_OUTPUT_COST_PER_MILLION = float(os.getenv('GEMINI_OUTPUT_COST_PER_MILLION', '0.40'))
+    LEDGER_MAX_ENTRIES = int(os.getenv('LEDGER_MAX_ENTRIES', '5000'))
+    LEDGER_RECENT_SEARCHES = int(os.getenv('LEDGER_RECENT_SEARCHES', '50'))
+    LEDGER_DAYS = int(os.getenv('LEDGER_DAYS', '30'))
+
+    # Logging settings: records are written by a background thread, as JSON
+    # lines ('json') or plain text ('text').  LOG_SAMPLE_RATES keeps a fraction
+    # of routine per-node events ("event=rate,..."); warnings and errors from one
+    # call site are let through LOG_ERROR_BURST times per LOG_ERROR_WINDOW seconds.
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'tree_update=0.1,search_query=0.25')
+    LOG_ERROR_BURST = int(os.getenv('LOG_ERROR_BURST', '5'))
+    LOG_ERROR_WINDOW = float(os.getenv('LOG_ERROR_WINDOW', '60'))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+    # Admin endpoints (/api/admin/*, /api/ledger, /api/prewarm, /api/quota,
+    # /api/http-pools) need this token in the X-Admin-Token header; left empty,
+    # they are not served at all
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+    # On-demand profiling (utils/profiling.py): longest stack-sampling run allowed,
+    # seconds between samples, rows in the top-functions table, and the frames
+    # tracemalloc keeps per allocation
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.01'))
+    PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '30'))
+    TRACEMALLOC_FRAMES = int(os.getenv('TRACEMALLOC_FRAMES', '10'))
+
+    # Build services and preload heavy imports in the background as soon as the
+    # app starts, instead of on the first request
+    WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'True').lower() == 'true'
+
+    # Metrics settings: send a per-stage timing breakdown to the tree UI after each search
+    EMIT_SEARCH_TIMINGS = os.getenv('EMIT_SEARCH_TIMINGS', 'True').lower() == 'true'
@@ -26,6 +26,8 @@ class SearchTreeNode:
 
         # Gemini Summary
         self.summary: Optional[str] = None
+        # Condensed abstracts of this node's whole subtree, for the final analysis
+        self.synthesis: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert node to dictionary for JSON serialization."""
@@ -44,6 +46,29 @@ class SearchTreeNode:
             'search_query': self.search_query
         }
 
+    def to_summary_dict(self) -> Dict[str, Any]:
+        """The structural fields sent in every tree update."""
+        return {
+            'id': self.id,
+            'parent_id': self.parent_id,
+            'status': self.status,
+            'title': self.title
+        }
+
+    def to_detail_dict(self) -> Dict[str, Any]:
+        """The heavier fields, loaded by the client when a node is expanded."""
+        return {
+            'id': self.id,
+            'timestamp': self.timestamp,
+            'error_message': self.error_message,
+            'url': self.url,
+            'snippet': self.snippet,
+            'image': self.image,
+            'source': self.source,
+            'search_query': self.search_query,
+            'summary': self.summary
+        }
+
     def add_child(self, child_id: str) -> None:
         """Add a child node ID."""
         if child_id not in self.children:
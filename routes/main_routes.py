@@ -2,19 +2,41 @@
 Main Flask routes for the application
 """
 
+import base64
+import binascii
+import functools
+import hmac
 import logging
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, Response, current_app, render_template, jsonify, request, stream_with_context
 
-from services.google_search_api import GoogleSearchAPI
+from config import Config
+from services.cost_ledger import ledger
+from services.host_health import host_health
+from utils import profiling
+from utils.hedging import hedging_status
+from utils.metrics import metrics
+from utils.search_cache import SearchCache, normalize_query
+from utils.structured_logging import logging_status
 
 logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
-# Initialize Google Search API
-google_search = GoogleSearchAPI()
+# Recent /api/search pages, keyed by normalised query; values map an upstream
+# start index to that page's {"results", "next_start"}
+search_cache = SearchCache(max_entries=Config.SEARCH_CACHE_SIZE, ttl_seconds=Config.SEARCH_CACHE_TTL)
+
+# Background fetches of the page behind each next cursor
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='search-prefetch')
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+# Custom Search never returns results past index 100
+_MAX_START_INDEX = 91
 
 @main_bp.route('/')
 def index():
@@ -46,37 +68,124 @@ def debug():
     """Debug page for testing Socket.IO connection."""
     return render_template('debug.html')
 
-@main_bp.route('/api/search', methods=['POST'])
-def search_articles():
-    """API endpoint for searching articles."""
+class _BadSearchRequest(ValueError):
+    """A search request that fails validation (HTTP 400)."""
+
+def _encode_cursor(query, start, offset):
+    payload = json.dumps({'q': normalize_query(query), 's': start, 'o': offset})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor, query):
+    """Return the (start, offset) a cursor points at, validating it against *query*."""
     try:
-        data = request.get_json()
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        start, offset = int(payload['s']), int(payload['o'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise _BadSearchRequest('Invalid cursor')
+
+    if payload.get('q') != normalize_query(query):
+        raise _BadSearchRequest('Cursor does not belong to this query')
+    if not 1 <= start <= _MAX_START_INDEX or offset < 0:
+        raise _BadSearchRequest('Invalid cursor')
+    return start, offset
+
+def _parse_search_request():
+    """Validate a search request body; returns (query, limit, start, offset)."""
+    data = request.get_json(silent=True)
+
+    if not data:
+        raise _BadSearchRequest('No data provided')
+
+    query = data.get('query', '').strip()
+    limit = data.get('limit', Config.SEARCH_MAX_LIMIT)
+
+    if not query:
+        raise _BadSearchRequest('Search query is required')
+
+    if len(query) < 2:
+        raise _BadSearchRequest('Search query must be at least 2 characters')
+
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise _BadSearchRequest('limit must be a positive integer')
+    limit = min(limit, Config.SEARCH_MAX_LIMIT)
+
+    start, offset = 1, 0
+    if data.get('cursor'):
+        start, offset = _decode_cursor(data['cursor'], query)
+
+    return query, limit, start, offset
 
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': 'No data provided'
-            }), 400
+def _load_page(google_search, query, start):
+    """Return one upstream page, from cache or with a single upstream call."""
+    pages = search_cache.get(query) or {}
+    if start not in pages:
+        page = google_search.search_page(query, start)
+        pages = {**(search_cache.get(query) or {}), start: page}
+        search_cache.put(query, pages)
+    else:
+        ledger.record('google_search', 'search_page', cached=True)
+    return pages[start]
+
+def _prefetch_page(google_search, query, start):
+    """Opportunistically load the page at *start* in the background."""
+    if not Config.SEARCH_PREFETCH_NEXT_PAGE or start > _MAX_START_INDEX:
+        return
+    if start in (search_cache.get(query) or {}):
+        return
+
+    key = (normalize_query(query), start)
+    with _prefetch_lock:
+        if key in _prefetching:
+            return
+        _prefetching.add(key)
+
+    def run():
+        try:
+            _load_page(google_search, query, start)
+        except Exception as e:
+            logger.debug(f"Prefetch of '{query}' at {start} failed: {e}")
+        finally:
+            with _prefetch_lock:
+                _prefetching.discard(key)
 
-        query = data.get('query', '').strip()
-        limit = data.get('limit', 10)
+    _prefetch_pool.submit(run)
 
-        if not query:
-            return jsonify({
-                'success': False,
-                'error': 'Search query is required'
-            }), 400
+def _search(query, limit, start, offset):
+    """
+    Serve up to *limit* results from the cursor position, making at most one
+    upstream call, and return (results, next_cursor).
+    """
+    google_search = current_app.services.google_search
+    page = _load_page(google_search, query, start)
+    results = page['results'][offset:offset + limit]
 
-        if len(query) < 2:
-            return jsonify({
-                'success': False,
-                'error': 'Search query must be at least 2 characters'
-            }), 400
+    if offset + limit < len(page['results']):
+        next_cursor = _encode_cursor(query, start, offset + limit)
+    elif page['next_start'] and page['next_start'] <= _MAX_START_INDEX:
+        next_cursor = _encode_cursor(query, page['next_start'], 0)
+        _prefetch_page(google_search, query, page['next_start'])
+    else:
+        next_cursor = None
 
-        logger.info(f"Search request: '{query}' (limit: {limit})")
+    return results, next_cursor
+
+@main_bp.route('/api/search', methods=['POST'])
+def search_articles():
+    """
+    API endpoint for searching articles.
+
+    Each request returns at most ``Config.SEARCH_MAX_LIMIT`` results and
+    costs at most one upstream page; pass the returned ``next_cursor`` back as
+    ``cursor`` to continue.
+    """
+    try:
+        query, limit, start, offset = _parse_search_request()
+
+        logger.info(f"Search request: '{query}' (limit: {limit}, start: {start}, offset: {offset})")
 
         # Search for articles
-        results = google_search.search_articles(query, limit)
+        results, next_cursor = _search(query, limit, start, offset)
 
         logger.info(f"Found {len(results)} results for '{query}'")
 
@@ -84,9 +193,16 @@ def search_articles():
             'success': True,
             'query': query,
             'results': results,
-            'count': len(results)
+            'count': len(results),
+            'next_cursor': next_cursor
         })
 
+    except _BadSearchRequest as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
     except Exception as e:
         logger.error(f"Search error: {e}", exc_info=True)
         return jsonify({
@@ -94,30 +210,202 @@ def search_articles():
             'error': str(e)
         }), 500
 
+@main_bp.route('/api/search/stream', methods=['POST'])
+def stream_search_articles():
+    """
+    Stream search results as NDJSON: a ``{"page", "results"}`` line as soon as
+    the page is available, then a final ``{"done", "count", "next_cursor"}``
+    line (or an ``{"error"}`` line).  Takes the same body as ``/api/search``.
+    """
+    try:
+        query, limit, start, offset = _parse_search_request()
+    except _BadSearchRequest as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    logger.info(f"Streaming search request: '{query}' (limit: {limit}, start: {start})")
+
+    def generate():
+        try:
+            results, next_cursor = _search(query, limit, start, offset)
+        except Exception as e:
+            logger.error(f"Search error: {e}", exc_info=True)
+            yield json.dumps({'error': str(e)}) + '\n'
+            return
+
+        yield json.dumps({'page': start // 10, 'results': results}) + '\n'
+        yield json.dumps({
+            'done': True,
+            'query': query,
+            'count': len(results),
+            'next_cursor': next_cursor
+        }) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@main_bp.route('/api/node/<path:node_id>')
+def node_details(node_id):
+    """Details of one tree node, loaded when the user expands it."""
+    session_id = request.args.get('session', '')
+    if not session_id:
+        return jsonify({'error': 'session is required'}), 400
+
+    details = current_app.services.node_store.get(session_id, node_id)
+    if details is None:
+        return jsonify({'error': 'Node not found'}), 404
+    return jsonify(details)
+
 @main_bp.route('/api/health')
 def health_check():
     """Health check endpoint."""
-    from app import gemini_service
+    gemini_service = current_app.services.gemini_service
 
     return jsonify({
         'status': 'healthy',
         'service': 'Article Explorer',
         'ai_provider': 'Google Gemini',
         'ai_available': gemini_service.is_available(),
-        'search_available': google_search.is_available(),
+        'search_available': current_app.services.google_search.is_available(),
         'server_running': True
     })
 
+@main_bp.route('/metrics')
+def prometheus_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@main_bp.route('/api/startup')
+def startup_timings():
+    """Import, app-construction, service-build and warm-up timings of this process."""
+    return jsonify(current_app.services.timings)
+
+def _admin_only(view):
+    """Serve *view* only to requests carrying ``Config.ADMIN_TOKEN`` in X-Admin-Token."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.ADMIN_TOKEN:
+            return jsonify({'error': 'Not found'}), 404
+        supplied = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(supplied.encode(), Config.ADMIN_TOKEN.encode()):
+            return jsonify({'error': 'Forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@main_bp.route('/api/http-pools')
+@_admin_only
+def http_pools():
+    """Connection pool usage of the shared per-upstream HTTP clients."""
+    return jsonify(current_app.services.http_clients.stats())
+
+@main_bp.route('/api/quota')
+@_admin_only
+def quota_status():
+    """Per-key quota usage of the Google Search and Gemini credential pools."""
+    services = current_app.services
+    return jsonify({
+        'google_search': services.google_search.credentials.get_status(),
+        'gemini': services.gemini_service.credentials.get_status()
+    })
+
+@main_bp.route('/api/ledger')
+@_admin_only
+def ledger_status():
+    """Estimated upstream spend: daily burn, recent searches and, with ?session=, its calls."""
+    body = {
+        'daily': ledger.daily(),
+        'recent_searches': ledger.recent_searches()
+    }
+    session_id = request.args.get('session')
+    if session_id:
+        body['entries'] = ledger.entries(session_id, limit=request.args.get('limit', 200, type=int))
+    return jsonify(body)
+
+@main_bp.route('/api/prewarm')
+@_admin_only
+def prewarm_status():
+    """Root-article demand and the pre-warmed trees ready to serve."""
+    return jsonify(current_app.services.prewarmer.get_status())
+
+@main_bp.route('/api/admin/profile', methods=['POST'])
+@_admin_only
+def profile_stacks():
+    """
+    Sample the stacks of every thread (or, with ``session``, of one running
+    search) for ``seconds`` and return collapsed stacks plus the hottest
+    functions.  ``?format=collapsed`` returns the collapsed stacks alone, as
+    a file for flamegraph.pl or speedscope.
+    """
+    data = request.get_json(silent=True) or {}
+    seconds = data.get('seconds', 10)
+    interval = data.get('interval')
+    if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) \
+            or not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+        return jsonify({'error': f'seconds must be between 0 and {Config.PROFILE_MAX_SECONDS:g}'}), 400
+    if interval is not None and (isinstance(interval, bool) or not isinstance(interval, (int, float))):
+        return jsonify({'error': 'interval must be a number'}), 400
+
+    session_id = data.get('session') or None
+    logger.info(f"Profiling {'search ' + session_id if session_id else 'all threads'} for {seconds}s")
+    try:
+        result = profiling.sample_stacks(seconds, interval=interval, session_id=session_id)
+    except profiling.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+
+    if request.args.get('format') == 'collapsed':
+        return Response(
+            result['collapsed'] + '\n',
+            mimetype='text/plain',
+            headers={'Content-Disposition': 'attachment; filename="profile.collapsed"'}
+        )
+    return jsonify(result)
+
+@main_bp.route('/api/admin/memory', methods=['GET', 'POST'])
+@_admin_only
+def profile_memory():
+    """
+    tracemalloc: POST ``{"action": "start"}`` (optionally ``"frames"``) to
+    begin tracing, ``"snapshot"`` for the top allocation sites and the growth
+    since the previous snapshot, ``"stop"`` to end.  GET shows the status.
+    """
+    if request.method == 'GET':
+        return jsonify(profiling.memory_status())
+
+    data = request.get_json(silent=True) or {}
+    action = data.get('action', 'snapshot')
+    if action == 'start':
+        frames = data.get('frames')
+        if frames is not None and (isinstance(frames, bool) or not isinstance(frames, int) or frames < 1):
+            return jsonify({'error': 'frames must be a positive integer'}), 400
+        logger.info("tracemalloc started")
+        return jsonify(profiling.start_memory_trace(frames))
+    if action == 'stop':
+        logger.info("tracemalloc stopped")
+        return jsonify(profiling.stop_memory_trace())
+    if action == 'snapshot':
+        limit = data.get('limit')
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, int) or limit < 1):
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        try:
+            return jsonify(profiling.memory_snapshot(data.get('group_by', 'lineno'), limit))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify({'error': 'action must be start, snapshot or stop'}), 400
+
 @main_bp.route('/api/ai-status')
 def ai_status():
     """Get current AI service status."""
-    from app import gemini_service
-    return jsonify(gemini_service.get_model_info())
+    return jsonify(current_app.services.gemini_service.get_model_info())
 
 @main_bp.route('/api/search-status')
 def search_status():
     """Get current search service status."""
     return jsonify({
         'provider': 'Google Custom Search',
-        'available': google_search.is_available()
+        'available': current_app.services.google_search.is_available(),
+        'unhealthy_hosts': host_health.get_status(),
+        'search_workers': current_app.search_runner.get_status(),
+        'hedging': hedging_status(),
+        'logging': logging_status()
     })
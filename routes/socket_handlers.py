@@ -6,9 +6,11 @@ import logging
 from flask import request
 from flask_socketio import emit
 
+from utils import payload_codec
+
 logger = logging.getLogger(__name__)
 
-def register_socket_handlers(socketio, search_engine, rate_limiter):
+def register_socket_handlers(socketio, search_runner, services):
     """Register all socket event handlers."""
 
     @socketio.on('connect')
@@ -22,8 +24,9 @@ def register_socket_handlers(socketio, search_engine, rate_limiter):
         })
 
     @socketio.on('disconnect')
-    def handle_disconnect():
+    def handle_disconnect(reason=None):
         logger.info(f" Client disconnected: {request.sid}")
+        payload_codec.forget(request.sid)
 
     @socketio.on('start_search')
     def handle_start_search(data):
@@ -66,7 +69,19 @@ def register_socket_handlers(socketio, search_engine, rate_limiter):
 
         logger.info(f"Article data: {article_data}")
 
+        # tree frames as msgpack if the client can decode them
+        encoding = payload_codec.set_encoding(session_id, data.get('encoding'))
+
+        # a popular article may already have been explored in a quiet spell
+        prewarmer = services.prewarmer
+        prewarmer.record_open(article_data)
+        warm_tree = prewarmer.lookup(article_data)
+        if warm_tree is not None:
+            prewarmer.serve(warm_tree, session_id)
+            return
+
         # Check rate limit before starting
+        rate_limiter = services.rate_limiter
         if not rate_limiter.can_make_call():
             wait_time = rate_limiter.wait_time()
             logger.warning(f"Rate limited. Wait time: {wait_time:.0f} seconds")
@@ -78,23 +93,13 @@ def register_socket_handlers(socketio, search_engine, rate_limiter):
 
         logger.info(f"Starting search for '{article_title}' (session: {session_id})")
 
-        # Start search in background
+        # Hand the search to a background thread or worker process
         try:
-            def run_search():
-                try:
-                    search_engine.start_search(article_data, session_id)
-                except Exception as e:
-                    logger.error(f"Search engine error: {e}", exc_info=True)
-                    socketio.emit('error', {
-                        'message': f'Search engine error: {str(e)}',
-                        'session_id': session_id
-                    }, room=session_id)
-
-            socketio.start_background_task(run_search)
-            logger.info("Background search task started successfully")
+            search_runner.submit(article_data, session_id, encoding)
+            logger.info("Search job submitted successfully")
 
         except Exception as e:
-            logger.error(f"Failed to start background task: {e}", exc_info=True)
+            logger.error(f"Failed to submit search job: {e}", exc_info=True)
             emit('error', {'message': f'Failed to start search: {str(e)}'})
 
     @socketio.on('test')
@@ -120,7 +125,7 @@ def register_socket_handlers(socketio, search_engine, rate_limiter):
     @socketio.on('get_rate_limit_status')
     def handle_get_rate_limit_status():
         """Handle request for rate limit status."""
-        status = rate_limiter.get_status()
+        status = services.rate_limiter.get_status()
         logger.info(f"Rate limit status requested: {status}")
         emit('rate_limit_status', status)
 
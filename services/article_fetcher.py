@@ -0,0 +1,206 @@
+"""
+article_fetcher.py – pooled, concurrency-limited HTTP client for article pages.
+
+Kept separate from the Custom Search session so article hosts get their own
+connection pools, browser-style content negotiation and concurrency caps
+(global and per host).  Uses HTTP/2 through ``httpx`` when ``FETCH_HTTP2`` is
+set and the ``h2`` package is installed, and plain keep-alive ``requests``
+otherwise.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from urllib3.util.retry import Retry
+
+from config import Config
+from services.http_clients import HttpClients
+from utils.dns_cache import DnsCache, mount_dns_cache
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class FetchCancelled(Exception):
+    """The caller no longer wants the page (another hedged fetch won)."""
+
+
+def _check(cancel: Optional[threading.Event], url: str) -> None:
+    if cancel is not None and cancel.is_set():
+        raise FetchCancelled(url)
+
+
+def _accept_encoding() -> str:
+    """Advertise brotli only when urllib3/httpx can actually decode it."""
+    try:
+        import brotli  # type: ignore  # noqa: F401
+    except ModuleNotFoundError:
+        return "gzip, deflate"
+    return "gzip, deflate, br"
+
+
+def _http2_client(timeout: Tuple[float, float]):
+    """An ``httpx`` HTTP/2 client, or ``None`` if the extras are missing."""
+    try:
+        import h2  # type: ignore  # noqa: F401
+        import httpx
+    except ModuleNotFoundError:
+        logger.warning("FETCH_HTTP2 is set but httpx[http2] is not installed; using HTTP/1.1")
+        return None
+
+    return httpx.Client(
+        http2=True,
+        follow_redirects=True,
+        timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+        limits=httpx.Limits(
+            max_connections=Config.FETCH_MAX_CONCURRENCY,
+            max_keepalive_connections=Config.FETCH_MAX_CONCURRENCY,
+        ),
+    )
+
+
+@dataclass(slots=True, frozen=True)
+class FetchedPage:
+    url: str
+    content_type: str
+    content: bytes
+    encoding: Optional[str]
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class ArticleFetcher:
+    """Fetches article HTML/PDF bodies under global and per-host limits."""
+
+    _TIMEOUT = (5, 15)
+    _HEADERS = {
+        "User-Agent": "OriginExplorer/3.1 (strict-text+pdf)",
+        "Accept": "text/html,application/xhtml+xml,application/pdf;q=0.9,*/*;q=0.5",
+        "Accept-Language": "en;q=0.9,*;q=0.5",
+    }
+
+    def __init__(self, http_clients: Optional[HttpClients] = None) -> None:
+        http_clients = http_clients or HttpClients()
+        headers = dict(self._HEADERS, **{"Accept-Encoding": _accept_encoding()})
+
+        self._http2 = _http2_client(self._TIMEOUT) if Config.FETCH_HTTP2 else None
+        if self._http2 is not None:
+            self._http2.headers.update(headers)
+            http_clients.register_httpx("articles_http2", self._http2)
+
+        self._session = http_clients.session(
+            "articles",
+            pool_hosts=Config.FETCH_POOL_HOSTS,
+            pool_size=Config.FETCH_PER_HOST_CONCURRENCY,
+            retries=Retry(total=1, backoff_factor=0.3, status_forcelist=(502, 503, 504)),
+            headers=headers,
+        )
+        # article hosts only: other clients in the process resolve as usual
+        self.dns_cache: Optional[DnsCache] = None
+        if Config.FETCH_DNS_CACHE_TTL > 0:
+            self.dns_cache = DnsCache(Config.FETCH_DNS_CACHE_TTL)
+            mount_dns_cache(self._session, self.dns_cache)
+
+        self._global_slots = threading.BoundedSemaphore(Config.FETCH_MAX_CONCURRENCY)
+        # host -> [semaphore, fetches holding or waiting for it]; a host is
+        # dropped once nothing is in flight, so the map only holds busy hosts
+        self._host_slots: Dict[str, List] = {}
+        self._host_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def fetch(
+        self,
+        url: str,
+        timeout: Optional[Tuple[float, float]] = None,
+        cancel: Optional[threading.Event] = None,
+    ) -> FetchedPage:
+        """
+        Download *url*, raising on HTTP errors or bodies over the size cap.
+        Setting *cancel* (a hedged fetch that lost) aborts with ``FetchCancelled``.
+        """
+        timeout = timeout or self._TIMEOUT
+        host = urlparse(url).netloc.lower()
+        host_slots = self._claim_host(host)
+        try:
+            with span("fetch_queue_wait"):
+                # the host first, so fetches queued behind one busy host do not
+                # sit on global slots that other hosts could use
+                host_slots.acquire()
+                self._global_slots.acquire()
+            try:
+                _check(cancel, url)
+                with span("article_download"):
+                    if self._http2 is not None:
+                        return self._fetch_http2(url, timeout, cancel)
+                    return self._fetch_http1(url, timeout, cancel)
+            finally:
+                self._global_slots.release()
+                host_slots.release()
+        finally:
+            self._release_host(host)
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _claim_host(self, host: str) -> threading.BoundedSemaphore:
+        with self._host_lock:
+            entry = self._host_slots.get(host)
+            if entry is None:
+                entry = self._host_slots[host] = [
+                    threading.BoundedSemaphore(Config.FETCH_PER_HOST_CONCURRENCY), 0
+                ]
+            entry[1] += 1
+            return entry[0]
+
+    def _release_host(self, host: str) -> None:
+        with self._host_lock:
+            entry = self._host_slots[host]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._host_slots[host]
+
+    def _fetch_http1(
+        self, url: str, timeout: Tuple[float, float], cancel: Optional[threading.Event]
+    ) -> FetchedPage:
+        with self._session.get(url, timeout=timeout, stream=True) as resp:
+            resp.raise_for_status()
+            body = bytearray()
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                _check(cancel, url)
+                body += chunk
+                if len(body) > Config.FETCH_MAX_BYTES:
+                    raise ValueError(f"Response from {url} exceeds {Config.FETCH_MAX_BYTES} bytes")
+            ctype = resp.headers.get("Content-Type", "")
+            # without an explicit charset requests assumes ISO-8859-1 for text/*
+            encoding = (
+                requests.utils.get_encoding_from_headers(resp.headers)
+                if "charset=" in ctype.lower()
+                else None
+            )
+            return FetchedPage(url, ctype, bytes(body), encoding)
+
+    def _fetch_http2(
+        self, url: str, timeout: Tuple[float, float], cancel: Optional[threading.Event]
+    ) -> FetchedPage:
+        with self._http2.stream("GET", url, timeout=timeout[1]) as resp:
+            resp.raise_for_status()
+            body = bytearray()
+            for chunk in resp.iter_bytes():
+                _check(cancel, url)
+                body += chunk
+                if len(body) > Config.FETCH_MAX_BYTES:
+                    raise ValueError(f"Response from {url} exceeds {Config.FETCH_MAX_BYTES} bytes")
+            return FetchedPage(url, resp.headers.get("Content-Type", ""), bytes(body), resp.charset_encoding)
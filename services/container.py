@@ -0,0 +1,175 @@
+"""
+container.py – lazily built, shared services for one application.
+
+``create_app`` used to construct every service while the modules were still
+being imported, and routes and the search engine each built their own
+``GoogleSearchAPI``.  ``ServiceContainer`` builds each service the first time
+it is asked for, exactly once (thread-safe), and hands the same instance to
+every caller.  ``warm_up`` builds them all and preloads the heavy optional
+imports, so a fresh worker can do that in the background instead of on its
+first request.  Every step is timed in ``timings``.  The services share one
+``HttpClients``, so each upstream has a single connection pool per process,
+and one set of quota counters, which worker processes share with it.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# imported on first use by the services; preloading them is what warm-up is for
+_HEAVY_MODULES = ("bs4", "pdfminer.high_level")
+
+
+class ServiceContainer:
+    """Builds each service on first access and shares it afterwards."""
+
+    def __init__(self, socketio=None, node_store=None, quota_counters=None) -> None:
+        self.socketio = socketio
+        self._instances: Dict[str, Any] = {}
+        if node_store is not None:
+            self._instances["node_store"] = node_store
+        if quota_counters is not None:
+            self._instances["quota_counters"] = quota_counters
+        self._lock = threading.RLock()
+        self.timings: Dict[str, float] = {}
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        instance = self._instances.get(name)
+        if instance is None:
+            # reentrant: building the engine asks for the services it needs
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    start = time.perf_counter()
+                    instance = factory()
+                    self.timings[f"build:{name}"] = round(time.perf_counter() - start, 4)
+                    self._instances[name] = instance
+        return instance
+
+    # ------------------------------------------------------------------ #
+    # Services
+    # ------------------------------------------------------------------ #
+
+    @property
+    def http_clients(self):
+        from services.http_clients import HttpClients
+
+        return self._get("http_clients", HttpClients)
+
+    @property
+    def quota_counters(self):
+        from services.quota_counters import create_quota_counters
+
+        return self._get("quota_counters", create_quota_counters)
+
+    @property
+    def rate_limiter(self):
+        from services.credential_pool import gemini_pool
+        from services.quota_counters import SharedRateLimiter
+
+        # MAX_CALLS_PER_MINUTE is per Gemini key; the pool spreads calls over all
+        # of them.  Counted the way GeminiService's pool counts them (blank and
+        # repeated keys dropped) - the service itself is built from this limiter.
+        # Every process counts into the same window, so workers don't multiply it.
+        keys = max(len(gemini_pool(offline=Config.GEMINI_BACKEND == 'fake')), 1)
+        return self._get(
+            "rate_limiter",
+            lambda: SharedRateLimiter(
+                Config.MAX_CALLS_PER_MINUTE * keys, self.quota_counters, "gemini:calls"
+            ),
+        )
+
+    @property
+    def gemini_service(self):
+        from services.gemini_service import GeminiService
+
+        return self._get(
+            "gemini_service",
+            lambda: GeminiService(self.rate_limiter, self.http_clients, self.quota_counters),
+        )
+
+    @property
+    def article_fetcher(self):
+        from services.article_fetcher import ArticleFetcher
+
+        return self._get("article_fetcher", lambda: ArticleFetcher(self.http_clients))
+
+    @property
+    def google_search(self):
+        from services.google_search_api import GoogleSearchAPI
+
+        return self._get(
+            "google_search",
+            lambda: GoogleSearchAPI(self.http_clients, self.article_fetcher, self.quota_counters),
+        )
+
+    @property
+    def node_store(self):
+        from services.node_store import create_node_store
+
+        return self._get("node_store", create_node_store)
+
+    @property
+    def search_engine(self):
+        from services.search_engine import RecursiveSearchEngine
+
+        return self._get(
+            "search_engine",
+            lambda: RecursiveSearchEngine(
+                self.socketio,
+                self.gemini_service,
+                node_store=self.node_store,
+                google_search=self.google_search,
+            ),
+        )
+
+    @property
+    def prewarmer(self):
+        from services.prewarm import Prewarmer
+
+        return self._get("prewarmer", lambda: Prewarmer(self, self.socketio))
+
+    # ------------------------------------------------------------------ #
+    # Warm-up
+    # ------------------------------------------------------------------ #
+
+    def warm_up(self) -> Dict[str, float]:
+        """Build every service and preload heavy imports; returns the timings."""
+        start = time.perf_counter()
+        self.search_engine  # builds everything the engine depends on
+
+        t0 = time.perf_counter()
+        self.gemini_service.warm_up()
+        self.timings["warm:gemini_client"] = round(time.perf_counter() - t0, 4)
+
+        for module in _HEAVY_MODULES:
+            t0 = time.perf_counter()
+            try:
+                importlib.import_module(module)
+            except ModuleNotFoundError:
+                continue
+            self.timings[f"import:{module}"] = round(time.perf_counter() - t0, 4)
+
+        self.timings["warm_up"] = round(time.perf_counter() - start, 4)
+        logger.info(f"Services warmed up in {self.timings['warm_up']:.2f}s")
+        return dict(self.timings)
+
+    def warm_up_in_background(self, start_task: Optional[Callable[..., Any]] = None) -> None:
+        def run() -> None:
+            try:
+                self.warm_up()
+            except Exception as e:
+                logger.error(f"Service warm-up failed: {e}", exc_info=True)
+
+        if start_task is not None:
+            start_task(run)
+        else:
+            threading.Thread(target=run, name="service-warm-up", daemon=True).start()
@@ -0,0 +1,208 @@
+"""
+cost_ledger.py – what every exploration spends upstream.
+
+Every call to a provider (Google Custom Search, Gemini, article fetches) and
+every answer served from a cache instead is recorded with the session, node
+and depth of the current trace context (see ``utils.metrics``), its latency
+and, for Gemini, its input and output tokens – the API's usage metadata when
+the response has it, a character-count estimate otherwise.
+
+Per-search totals go out with ``search_complete``.  The totals of recent
+searches and the daily burn (per Pacific-time quota day, like the provider
+quotas themselves) are served by ``/api/ledger``.  Costs are estimates from
+the ``*_COST_*`` settings, not billing data.
+
+A search runs in one process, so its totals are complete wherever it ran.
+Daily burn and recent searches are per process; the local worker pool's web
+process folds in the totals its workers report with ``search_complete``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config import Config
+from services.quota_counters import quota_day
+from utils.metrics import current_trace
+
+
+def estimate_cost(provider: str, calls: int, input_tokens: int = 0, output_tokens: int = 0) -> float:
+    if provider == "google_search":
+        return calls * Config.GOOGLE_SEARCH_COST_PER_1000 / 1000
+    if provider == "gemini":
+        return (
+            input_tokens * Config.GEMINI_INPUT_COST_PER_MILLION
+            + output_tokens * Config.GEMINI_OUTPUT_COST_PER_MILLION
+        ) / 1_000_000
+    return 0.0
+
+
+class _Totals:
+    __slots__ = ("calls", "cache_hits", "failures", "seconds", "input_tokens", "output_tokens", "cost")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        if entry["cache"] == "hit":
+            self.cache_hits += 1
+        else:
+            self.calls += 1
+        if not entry["ok"]:
+            self.failures += 1
+        self.seconds += entry["seconds"]
+        self.input_tokens += entry["input_tokens"]
+        self.output_tokens += entry["output_tokens"]
+        self.cost += entry["cost_usd"]
+
+    def merge(self, totals: Dict[str, Any]) -> None:
+        self.calls += totals.get("calls", 0)
+        self.cache_hits += totals.get("cache_hits", 0)
+        self.failures += totals.get("failures", 0)
+        self.seconds += totals.get("seconds", 0.0)
+        self.input_tokens += totals.get("input_tokens", 0)
+        self.output_tokens += totals.get("output_tokens", 0)
+        self.cost += totals.get("cost_usd", 0.0)
+
+    def asdict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "seconds": round(self.seconds, 3),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost, 6),
+        }
+
+
+def _summary(providers: Dict[str, _Totals]) -> Dict[str, Any]:
+    return {
+        "providers": {name: t.asdict() for name, t in sorted(providers.items())},
+        "calls": sum(t.calls for t in providers.values()),
+        "cache_hits": sum(t.cache_hits for t in providers.values()),
+        "cost_usd": round(sum(t.cost for t in providers.values()), 6),
+    }
+
+
+class CostLedger:
+    """Thread-safe record of upstream calls, totalled per search and per day."""
+
+    def __init__(self) -> None:
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=Config.LEDGER_MAX_ENTRIES)
+        self._searches: Dict[str, Dict[str, _Totals]] = {}
+        self._depths: Dict[str, Dict[int, _Totals]] = {}
+        self._days: Dict[str, Dict[str, _Totals]] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=Config.LEDGER_RECENT_SEARCHES)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Recording
+    # ------------------------------------------------------------------ #
+
+    def record(
+        self,
+        provider: str,
+        operation: str,
+        seconds: float = 0.0,
+        ok: bool = True,
+        cached: bool = False,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        model: Optional[str] = None,
+    ) -> None:
+        """Record one upstream call (or, with *cached*, one call a cache saved)."""
+        session_id, depth, node_id = current_trace()
+        now = time.time()
+        entry = {
+            "ts": round(now, 3),
+            "provider": provider,
+            "operation": operation,
+            "model": model,
+            "session_id": session_id,
+            "node_id": node_id,
+            "depth": depth,
+            "seconds": round(seconds, 4),
+            "ok": ok,
+            "cache": "hit" if cached else "miss",
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": 0.0 if cached else round(estimate_cost(provider, 1, input_tokens, output_tokens), 8),
+        }
+        day = quota_day(now)
+        with self._lock:
+            self._entries.append(entry)
+            self._totals(self._days, day, provider).add(entry)
+            if len(self._days) > Config.LEDGER_DAYS:
+                self._days.pop(min(self._days))
+            if session_id is not None:
+                self._totals(self._searches, session_id, provider).add(entry)
+                if depth is not None:
+                    self._totals(self._depths, session_id, depth).add(entry)
+
+    @staticmethod
+    def _totals(table: Dict, outer: Any, inner: Any) -> _Totals:
+        totals = table.setdefault(outer, {}).get(inner)
+        if totals is None:
+            totals = table[outer][inner] = _Totals()
+        return totals
+
+    def merge_search(self, session_id: str, search: Dict[str, Any]) -> None:
+        """Fold the totals of a search that ran in another process into this one's reports."""
+        day = quota_day(time.time())
+        with self._lock:
+            for provider, totals in search.get("providers", {}).items():
+                self._totals(self._days, day, provider).merge(totals)
+            self._recent.append({"session_id": session_id, **search})
+
+    # ------------------------------------------------------------------ #
+    # Per search
+    # ------------------------------------------------------------------ #
+
+    def search_totals(self, session_id: str) -> Dict[str, Any]:
+        """Totals of *session_id*'s running search, per provider and per depth."""
+        with self._lock:
+            summary = _summary(self._searches.get(session_id, {}))
+            summary["depths"] = {
+                depth: totals.asdict()
+                for depth, totals in sorted(self._depths.get(session_id, {}).items())
+            }
+        return summary
+
+    def finish_search(self, session_id: str, **labels: Any) -> None:
+        """Move *session_id*'s totals to the recent searches, tagged with *labels*."""
+        summary = self.search_totals(session_id)
+        with self._lock:
+            self._searches.pop(session_id, None)
+            self._depths.pop(session_id, None)
+            self._recent.append({"session_id": session_id, **labels, **summary})
+
+    def entries(self, session_id: Optional[str] = None, limit: int = 200) -> List[Dict[str, Any]]:
+        """The latest recorded calls, optionally of one session only."""
+        with self._lock:
+            entries = [e for e in self._entries if session_id is None or e["session_id"] == session_id]
+        return entries[-limit:]
+
+    # ------------------------------------------------------------------ #
+    # Reporting
+    # ------------------------------------------------------------------ #
+
+    def daily(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {day: _summary(providers) for day, providers in sorted(self._days.items())}
+
+    def recent_searches(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._recent)
+
+
+ledger = CostLedger()
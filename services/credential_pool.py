@@ -0,0 +1,238 @@
+"""
+credential_pool.py – spread upstream calls over several API keys.
+
+The Custom Search API and Gemini meter every key separately, per minute and
+per day.  ``CredentialPool`` counts what each key has used, hands out the key
+with the most headroom for every request and retires a key the upstream
+reports as exhausted until its window resets, so throughput grows with the
+number of configured keys.  ``get_status`` reports per-key usage.  The
+counts are kept in ``services.quota_counters``, so search workers share them
+with each other and with the web process.
+
+Daily windows follow Google's quota day, which starts at midnight Pacific
+time.  A limit of 0 is not enforced locally – usage is still counted, and the
+upstream's own quota errors still retire the key.  A per-minute refusal only
+retires a key while another one has headroom; with nowhere to rotate to, the
+call simply fails as it would with a single key.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from services.quota_counters import LocalCounters, Usage, counter_name, next_quota_day
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Credential:
+    key: str
+    engine_id: str = ""  # Custom Search only
+
+    @property
+    def label(self) -> str:
+        """Safe to log and report: the last four characters of the key."""
+        return f"…{self.key[-4:]}"
+
+
+class _Key:
+    def __init__(self, pool: str, credential: Credential) -> None:
+        self.credential = credential
+        self.counter = counter_name(pool, credential.key)
+        self.exhausted_reports = 0  # reports made by this process
+
+
+class CredentialPool:
+    """Thread-safe per-key quota accounting for one upstream."""
+
+    def __init__(
+        self,
+        name: str,
+        credentials: List[Credential],
+        per_minute: int = 0,
+        per_day: int = 0,
+        counters=None,
+    ) -> None:
+        self.name = name
+        self.per_minute = per_minute
+        self.per_day = per_day
+        # the same key listed twice is still one quota
+        unique = list(dict.fromkeys(credentials))
+        self._keys = [_Key(name, c) for c in unique]
+        # usage is counted wherever every process of the deployment sees it
+        self._counters = counters if counters is not None else LocalCounters()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def credentials(self) -> List[Credential]:
+        return [key.credential for key in self._keys]
+
+    def _usage(self, now: float) -> List[Usage]:
+        return self._counters.usage([key.counter for key in self._keys], now)
+
+    # ------------------------------------------------------------------ #
+    # Choosing a key
+    # ------------------------------------------------------------------ #
+
+    def _headroom(self, usage: Usage, now: float) -> float:
+        """Fraction of the tighter window still unused; 0 means unusable."""
+        if usage.retired_until > now:
+            return 0.0
+        room = 1.0
+        if self.per_minute:
+            room = min(room, 1 - usage.minute / self.per_minute)
+        if self.per_day:
+            room = min(room, 1 - usage.day / self.per_day)
+        return max(room, 0.0)
+
+    def acquire(self) -> Optional[Credential]:
+        """
+        Reserve one call on the key with the most headroom, or None if all are
+        spent.  Ties – every call, for keys without local limits – go to the
+        key with the fewest calls this minute, then today, so calls rotate.
+        """
+        with self._lock, self._counters.transaction():
+            now = time.time()
+            best, best_rank = None, None
+            for key, usage in zip(self._keys, self._usage(now)):
+                room = self._headroom(usage, now)
+                if room <= 0:
+                    continue
+                rank = (room, -usage.minute, -usage.day)
+                if best_rank is None or rank > best_rank:
+                    best, best_rank = key, rank
+            if best is None:
+                return None
+
+            self._counters.record(best.counter, now)
+            return best.credential
+
+    def wait_time(self) -> float:
+        """Seconds until some key has headroom again (0 if one has now)."""
+        with self._lock:
+            now = time.time()
+            waits = []
+            for usage in self._usage(now):
+                if self._headroom(usage, now) > 0:
+                    return 0.0
+                ready = usage.retired_until
+                if self.per_day and usage.day >= self.per_day:
+                    ready = max(ready, next_quota_day(now))
+                if self.per_minute and usage.minute >= self.per_minute:
+                    ready = max(ready, usage.oldest + 60)
+                waits.append(ready - now)
+            return max(min(waits), 0.0) if waits else float("inf")
+
+    def report_exhausted(
+        self, credential: Credential, daily: bool = False, retry_after: Optional[float] = None
+    ) -> None:
+        """Retire *credential* after the upstream refused it for quota reasons."""
+        with self._lock:
+            now = time.time()
+            index = next((i for i, k in enumerate(self._keys) if k.credential == credential), None)
+            if index is None:
+                return
+            key = self._keys[index]
+            key.exhausted_reports += 1
+            usages = self._usage(now)
+            others = any(self._headroom(u, now) > 0 for i, u in enumerate(usages) if i != index)
+            if not daily and retry_after is None and not others:
+                # nothing to rotate to: a passing throttle is the caller's to back off from
+                return
+
+            if retry_after is not None:
+                until = now + retry_after
+            elif daily:
+                until = next_quota_day(now)
+            else:
+                # the minute window frees up as its oldest call ages out
+                until = (usages[index].oldest or now) + 60
+            window = "day" if daily else "minute"
+            self._counters.retire(key.counter, until, window)
+
+        logger.warning(
+            "%s key %s is out of %s quota; retired for %.0fs",
+            self.name, credential.label, window, until - now,
+        )
+
+    # ------------------------------------------------------------------ #
+    # Reporting
+    # ------------------------------------------------------------------ #
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            keys = []
+            for key, usage in zip(self._keys, self._usage(now)):
+                room = self._headroom(usage, now)
+                retired = usage.retired_until > now
+                keys.append({
+                    "key": key.credential.label,
+                    "calls_last_minute": usage.minute,
+                    "calls_today": usage.day,
+                    "calls_total": usage.total,
+                    "headroom": round(room, 3),
+                    "retired_for": round(usage.retired_until - now, 1) if retired else 0,
+                    "retired_window": usage.retired_window if retired else None,
+                    "exhausted_reports": key.exhausted_reports,
+                })
+            return {
+                "per_minute_limit": self.per_minute,
+                "per_day_limit": self.per_day,
+                "available_keys": sum(1 for k in keys if k["headroom"] > 0),
+                "keys": keys,
+            }
+
+
+# --------------------------------------------------------------------------- #
+# Pools built from Config
+# --------------------------------------------------------------------------- #
+
+
+def google_search_pool(offline: bool = False, counters=None) -> CredentialPool:
+    """Every configured Custom Search key; one unmetered placeholder for a local stub."""
+    credentials = []
+    if Config.GOOGLE_SEARCH_API_KEY and Config.GOOGLE_SEARCH_ENGINE_ID:
+        credentials.append(Credential(Config.GOOGLE_SEARCH_API_KEY, Config.GOOGLE_SEARCH_ENGINE_ID))
+    for entry in Config.GOOGLE_SEARCH_EXTRA_CREDENTIALS:
+        key, _, engine_id = entry.partition(":")
+        engine_id = engine_id or Config.GOOGLE_SEARCH_ENGINE_ID
+        if key and engine_id:
+            credentials.append(Credential(key, engine_id))
+
+    if offline:
+        # a local stub (see services.fake_backends) does not check credentials
+        return CredentialPool(
+            "google_search", credentials or [Credential("offline", "offline")], counters=counters
+        )
+    return CredentialPool(
+        "google_search",
+        credentials,
+        per_minute=Config.GOOGLE_SEARCH_KEY_CALLS_PER_MINUTE,
+        per_day=Config.GOOGLE_SEARCH_KEY_CALLS_PER_DAY,
+        counters=counters,
+    )
+
+
+def gemini_pool(offline: bool = False, counters=None) -> CredentialPool:
+    """Every configured Gemini key; one unmetered placeholder for the fake backend."""
+    if offline:
+        return CredentialPool("gemini", [Credential("fake")], counters=counters)
+
+    keys = [Config.GEMINI_API_KEY] + Config.GEMINI_EXTRA_API_KEYS
+    return CredentialPool(
+        "gemini",
+        [Credential(k) for k in keys if k and k != "your-gemini-api-key-here"],
+        per_minute=Config.GEMINI_KEY_CALLS_PER_MINUTE,
+        per_day=Config.GEMINI_KEY_CALLS_PER_DAY,
+        counters=counters,
+    )
@@ -0,0 +1,267 @@
+"""
+fake_backends.py – deterministic offline stand-ins for Google Search and Gemini.
+
+* ``SearchStubServer`` – a local HTTP server speaking the subset of the Custom
+  Search JSON API that ``GoogleSearchAPI`` uses, plus the article pages its
+  results link to.  Point ``GOOGLE_SEARCH_BASE_URL`` at ``<stub>/customsearch/v1``.
+* ``FakeGeminiClient`` – a drop-in for ``genai.Client`` with configurable
+  latency, error rate and 429 rate.  Selected with ``GEMINI_BACKEND=fake``.
+
+Run the stub on its own with ``python -m services.fake_backends --port 8765``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+_WORDS: List[str] = [
+    "origin", "history", "empire", "trade", "railway", "printing", "press",
+    "revolution", "industry", "science", "reform", "colonial", "market",
+    "treaty", "invention", "migration", "archive", "ancient", "network",
+    "engine", "harbour", "charter", "guild", "telegraph", "canal", "census",
+]
+
+
+def _rng(*parts: Any) -> random.Random:
+    """Return a RNG seeded from *parts*, so equal inputs give equal outputs."""
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _phrase(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+# --------------------------------------------------------------------------- #
+# Google Custom Search + article pages
+# --------------------------------------------------------------------------- #
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+
+    def do_GET(self) -> None:  # noqa: N802 – http.server naming
+        parsed = urlparse(self.path)
+        if parsed.path.endswith("/customsearch/v1"):
+            self._search(parse_qs(parsed.query))
+        elif parsed.path.startswith("/articles/"):
+            self._article(parsed.path.rsplit("/", 1)[-1])
+        else:
+            self.send_error(404)
+
+    def _search(self, params: Dict[str, List[str]]) -> None:
+        stub = self.server.stub
+        query = params.get("q", [""])[0]
+        start = int(params.get("start", ["1"])[0])
+        num = int(params.get("num", ["10"])[0])
+        stub.sleep(stub.search_latency)
+
+        rng = _rng(stub.seed, query, start)
+        base = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+        items = []
+        for i in range(start, start + num):
+            slug = hashlib.sha1(f"{stub.seed}|{query}|{i}".encode()).hexdigest()[:12]
+            topic = _phrase(rng, 3)
+            items.append(
+                {
+                    "title": f"The history of {topic}: an article",
+                    "link": f"{base}/articles/{slug}",
+                    "snippet": f"A guide to the origin of {topic}. {_phrase(rng, 12)}.",
+                }
+            )
+
+        body = {"items": items, "queries": {"nextPage": [{"startIndex": start + num}]}}
+        self._send(200, "application/json", json.dumps(body).encode())
+
+    def _article(self, slug: str) -> None:
+        stub = self.server.stub
+        rng = _rng(stub.seed, slug)
+        stub.sleep(stub.article_latency)
+        if rng.random() < stub.article_error_rate:
+            self.send_error(503)
+            return
+
+        paragraphs = "".join(
+            f"<p>{_phrase(rng, 40).capitalize()}.</p>" for _ in range(rng.randint(5, 15))
+        )
+        page = (
+            f"<html><head><title>{slug}</title><style>p{{}}</style></head>"
+            f"<body><nav>Home | About</nav><article>{paragraphs}</article></body></html>"
+        )
+        self._send(200, "text/html; charset=utf-8", page.encode())
+
+    def _send(self, status: int, ctype: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("stub: " + fmt, *args)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    stub: "SearchStubServer"
+
+
+class SearchStubServer:
+    """Local HTTP stand-in for the Custom Search API and the article hosts."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+        search_latency: float = 0.0,
+        article_latency: float = 0.0,
+        article_error_rate: float = 0.0,
+    ) -> None:
+        self.seed = seed
+        self.search_latency = search_latency
+        self.article_latency = article_latency
+        self.article_error_rate = article_error_rate
+
+        self._server = _StubHTTPServer((host, port), _StubHandler)
+        self._server.stub = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/customsearch/v1"
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def start(self) -> "SearchStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Search stub listening on %s", self.base_url)
+        return self
+
+    def serve_forever(self) -> None:
+        logger.info("Search stub listening on %s", self.base_url)
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# --------------------------------------------------------------------------- #
+# Gemini
+# --------------------------------------------------------------------------- #
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGeminiClient") -> None:
+        self._client = client
+
+    def generate_content(self, model: str, contents: List[str], config: Any = None) -> Any:
+        return self._client.generate(model, "\n".join(map(str, contents)))
+
+
+class FakeGeminiClient:
+    """
+    Stand-in for ``genai.Client`` that answers the prompts ``GeminiService``
+    sends with deterministic text.  Failures are drawn from a seeded RNG and
+    raised as the same ``google.genai.errors`` types the real client uses.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency: float = 0.5,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+    ) -> None:
+        self.seed = seed
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.models = _FakeModels(self)
+
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def generate(self, model: str, prompt: str) -> Any:
+        with self._lock:
+            self._calls += 1
+            call_no = self._calls
+
+        rng = _rng(self.seed, prompt)
+        fate = _rng(self.seed, call_no).random()
+        if self.latency > 0:
+            time.sleep(self.latency * rng.uniform(0.5, 1.5))
+
+        if fate < self.throttle_rate:
+            raise errors.ClientError(
+                429, {"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}}
+            )
+        if fate < self.throttle_rate + self.error_rate:
+            raise errors.ServerError(
+                503, {"error": {"code": 503, "message": "Service unavailable", "status": "UNAVAILABLE"}}
+            )
+
+        return SimpleNamespace(text=self._answer(prompt, rng))
+
+    @staticmethod
+    def _answer(prompt: str, rng: random.Random) -> str:
+        sections = re.findall(r"=== ARTICLE (\S+) ===", prompt)
+        if sections:
+            return json.dumps({alias: f"Summary of {_phrase(rng, 20)}." for alias in sections})
+
+        if "search queries" in prompt:
+            queries = "\n".join(_phrase(rng, 5) for _ in range(5))
+            return f"**Analysis**\n{_phrase(rng, 30)}\n**\n{queries}"
+
+        return " ".join(f"{_phrase(rng, 15).capitalize()}." for _ in range(4))
+
+
+# --------------------------------------------------------------------------- #
+# CLI
+# --------------------------------------------------------------------------- #
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the offline Custom Search stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--article-latency", type=float, default=0.0)
+    parser.add_argument("--article-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    SearchStubServer(
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+        search_latency=args.search_latency,
+        article_latency=args.article_latency,
+        article_error_rate=args.article_error_rate,
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,261 @@
 gemini_service.py – minimal wrapper around the Google Gemini client.
 """
 
+import json
 import logging
 import re
+import threading
 import time
-from typing import List, Optional
-
-from google import genai
+from typing import Dict, List, Optional, Tuple
 
 from config import Config
+from services.cost_ledger import ledger
+from services.credential_pool import Credential, gemini_pool
+from services.http_clients import HttpClients
+from services.model_router import ModelRouter
+from utils.hedging import Hedger
+from utils.metrics import span
 from utils.rate_limiter import RateLimiter
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+# Per-article content cap, shared by the single and batched summary prompts
+SUMMARY_CONTENT_CHARS = 2000
+# Tokens reserved per article for the section delimiter and JSON answer
+_BATCH_SECTION_OVERHEAD = 150
+# Longest wait for a key's minute window to reopen before a call gives up
+_MAX_QUOTA_WAIT = 60
 
 logger = logging.getLogger(__name__)
 
+
+def _types():
+    """``google.genai.types``, imported on first use."""
+    from google.genai import types
+
+    return types
+
+
+def _quota_window(exc: Exception) -> Optional[str]:
+    """'day' or 'minute' if *exc* is the API throttling the key, else None."""
+    if getattr(exc, "code", None) != 429 and getattr(exc, "status", None) != "RESOURCE_EXHAUSTED":
+        return None
+    return "day" if "perday" in str(exc).lower().replace(" ", "") else "minute"
+
+
+def _usage(contents, response) -> Tuple[int, int]:
+    """``(input, output)`` tokens of a call: the API's count, or an estimate."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt = getattr(usage, "prompt_token_count", None)
+    output = getattr(usage, "candidates_token_count", None)
+    if prompt is None:
+        prompt = sum(estimate_tokens(str(c)) for c in (contents or []))
+    if output is None:
+        output = estimate_tokens(getattr(response, "text", None) or "")
+    return prompt, output
+
+
+def _summary_words() -> int:
+    """Words to ask for, so a summary ends well inside its MAX_TOKENS output cap."""
+    return Config.MAX_TOKENS * 3 // 5
+
+
 class GeminiService:
-    def __init__(self, rate_limiter: RateLimiter):
+    def __init__(
+        self,
+        rate_limiter: RateLimiter,
+        http_clients: Optional[HttpClients] = None,
+        quota_counters=None,
+    ):
         self.rate_limiter = rate_limiter
-        self.model = None
+        self.http_clients = http_clients
+        self._clients: Dict[str, object] = {}
+        self._model_lock = threading.Lock()
         self.use_mock_data = True
 
+        # requests are spread over every configured key by remaining quota, and
+        # each task goes to the model the router currently prefers for it
+        self.credentials = gemini_pool(offline=Config.GEMINI_BACKEND == 'fake', counters=quota_counters)
+        self.router = ModelRouter()
+        # calls slower than the usual p90 for their task race a duplicate
+        self._hedgers: Dict[str, Hedger] = {}
+
+        # the clients (and google.genai, which is slow to import) are created on
+        # first use or by warm_up(), not while the app is being built
+        if Config.GEMINI_BACKEND == 'fake':
+            self.use_mock_data = False
+            logger.warning("Using the offline fake Gemini backend")
+        elif len(self.credentials):
+            self.use_mock_data = False
+        else:
+            logger.warning("Gemini API key not configured, using mock data")
+
+    @property
+    def model(self):
+        """The first key's Gemini client, created on first access."""
+        if self.use_mock_data:
+            return None
+        return self._client_for(self.credentials.credentials[0])
+
+    def _client_for(self, credential: Credential):
+        client = self._clients.get(credential.key)
+        if client is None and not self.use_mock_data:
+            with self._model_lock:
+                client = self._clients.get(credential.key)
+                if client is None and not self.use_mock_data:
+                    client = self._create_client(credential.key)
+                    if client is not None:
+                        self._clients[credential.key] = client
+        return client
+
+    def _create_client(self, api_key: str):
         try:
-            if Config.GEMINI_API_KEY and Config.GEMINI_API_KEY != 'your-gemini-api-key-here':
-                self.model = genai.Client(api_key=Config.GEMINI_API_KEY)
-                self.use_mock_data = False
-                logger.info(f"Gemini client initialized successfully with model: {Config.GEMINI_MODEL}")
-            else:
-                logger.warning("Gemini API key not configured, using mock data")
+            if Config.GEMINI_BACKEND == 'fake':
+                from services.fake_backends import FakeGeminiClient
+
+                return FakeGeminiClient(
+                    seed=Config.FAKE_SEED,
+                    latency=Config.FAKE_GEMINI_LATENCY,
+                    error_rate=Config.FAKE_GEMINI_ERROR_RATE,
+                    throttle_rate=Config.FAKE_GEMINI_THROTTLE_RATE,
+                )
+
+            from google import genai
+
+            http_options = None
+            if self.http_clients is not None:
+                # timeouts stay with the SDK's per-request options, not httpx's 5s default
+                http_options = _types().HttpOptions(
+                    httpx_client=self.http_clients.httpx_client(
+                        "gemini", Config.GEMINI_POOL_SIZE, timeout=None
+                    )
+                )
+            client = genai.Client(api_key=api_key, http_options=http_options)
+            logger.info("Gemini client initialized successfully")
+            return client
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {e}")
+            self.use_mock_data = True
+            return None
+
+    def _generate(self, task: str, contents: List[str], max_output_tokens: Optional[int] = None, **config):
+        """
+        Run *task* on the healthiest model of its profile (see ``ModelRouter``),
+        falling back to the next one when a model is throttled or failing.
+        """
+        profile = self.router.profile(task)
+        generation = _types().GenerateContentConfig(
+            temperature=Config.TEMPERATURE,
+            max_output_tokens=max_output_tokens or profile.max_output_tokens,
+            **config,
+        )
+
+        candidates = self.router.candidates(task)
+        for i, model in enumerate(candidates):
+            start = time.perf_counter()
+            try:
+                # any wait for quota happens on this thread, not on a hedging pool thread
+                credential = self._acquire_credential()
+                if credential is None:
+                    raise RuntimeError("Every Gemini API key is out of quota")
+                response, _ = self._hedger(task).run(
+                    lambda cancel: self._generate_content(
+                        task, credential, model=model, contents=contents, config=generation
+                    ),
+                    lambda: self._duplicate_request(task, model, contents, generation),
+                )
+            except Exception as e:
+                status = getattr(e, "code", None)
+                if _quota_window(e):
+                    self.router.record_throttled(model)
+                elif isinstance(status, int) and status >= 500:
+                    self.router.record(model, time.perf_counter() - start, ok=False)
+                else:
+                    raise  # a bad request fails the same way on any model
+                if i == len(candidates) - 1:
+                    raise
+                logger.warning(f"Gemini model {model} failed for {task} ({e}); trying {candidates[i + 1]}")
+                continue
+
+            self.router.record(model, time.perf_counter() - start)
+            return response
+
+    def _hedger(self, task: str) -> Hedger:
+        hedger = self._hedgers.get(task)
+        if hedger is None:
+            hedger = self._hedgers.setdefault(task, Hedger(f"gemini_{task}"))
+        return hedger
+
+    def _duplicate_request(self, task: str, model: str, contents: List[str], generation):
+        """A hedge for a slow call: the same request again, if quota allows it now."""
+        if not self.rate_limiter.can_make_call():
+            return None
+        credential = self.credentials.acquire()
+        if credential is None:
+            return None
+        self.rate_limiter.record_call()
+        return lambda cancel: self._generate_content(
+            task, credential, model=model, contents=contents, config=generation
+        )
+
+    def _acquire_credential(self) -> Optional[Credential]:
+        """The key with the most quota left, waiting up to ``_MAX_QUOTA_WAIT`` for one."""
+        credential = self.credentials.acquire()
+        if credential is None:
+            wait_time = self.credentials.wait_time()
+            if wait_time > _MAX_QUOTA_WAIT:
+                return None
+            logger.warning(f"Every Gemini key is at its quota. Waiting {wait_time:.1f} seconds...")
+            with span("rate_limit_wait"):
+                time.sleep(wait_time)
+            credential = self.credentials.acquire()
+        return credential
+
+    def _generate_content(self, task: str, credential: Optional[Credential], **kwargs):
+        """
+        ``generate_content`` with *credential*, already acquired.  A key the API
+        throttles is retired and the call retried at once with the next one that
+        has quota left; nothing here waits, as it may run on a hedging thread.
+        Every attempt is recorded in the cost ledger under *task*.
+        """
+        error: Optional[Exception] = None
+        for _ in range(len(self.credentials)):
+            if credential is None:
+                credential = self.credentials.acquire()
+                if credential is None:
+                    break
+
+            client = self._client_for(credential)
+            if client is None:
+                raise ValueError("Gemini API not available")
+            start = time.perf_counter()
+            try:
+                response = client.models.generate_content(**kwargs)
+            except Exception as e:
+                ledger.record(
+                    "gemini", task, time.perf_counter() - start, ok=False, model=kwargs.get("model")
+                )
+                window = _quota_window(e)
+                if window is None:
+                    raise
+                self.credentials.report_exhausted(credential, daily=window == "day")
+                credential = None
+                error = e
+                continue
+
+            input_tokens, output_tokens = _usage(kwargs.get("contents"), response)
+            ledger.record(
+                "gemini", task, time.perf_counter() - start,
+                input_tokens=input_tokens, output_tokens=output_tokens, model=kwargs.get("model"),
+            )
+            return response
+
+        if error is not None:
+            raise error
+        raise RuntimeError("Every Gemini API key is out of quota")
+
+    def warm_up(self) -> None:
+        """Create the client now rather than on the first search."""
+        self.model
 
     def get_related_search_queries(self, article_title: str, article_content: str = "") -> List[str]:
         """Get related search queries for finding more articles."""
@@ -37,7 +265,8 @@ class GeminiService:
             if not self.rate_limiter.can_make_call():
                 wait_time = self.rate_limiter.wait_time()
                 logger.warning(f"Rate limited. Waiting {wait_time:.1f} seconds...")
-                time.sleep(wait_time + 1)
+                with span("rate_limit_wait"):
+                    time.sleep(wait_time + 1)
 
             if not self.model or self.use_mock_data:
                 raise ValueError("Gemini API Failed")
@@ -69,10 +298,8 @@ class GeminiService:
             Jeff Bezos wealth inequality public perception
             """
 
-            response = self.model.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[prompt]
-            )
+            with span("gemini_queries"):
+                response = self._generate("queries", [prompt])
 
             if response.text:
                 queries = [
@@ -103,11 +330,12 @@ class GeminiService:
             if not self.model or self.use_mock_data:
                 raise ValueError("Gemini API not available")
 
-            prompt = f"Summarize the following article content in a concise paragraph:\n\n{article_content[:2000]}"
-            response = self.model.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[prompt]
+            prompt = (
+                f"Summarize the following article content in a concise paragraph of at most "
+                f"{_summary_words()} words:\n\n{article_content[:SUMMARY_CONTENT_CHARS]}"
             )
+            with span("gemini_summary"):
+                response = self._generate("summary", [prompt])
 
             summary = response.text.strip() if response.text else ""
             if not summary:
@@ -121,6 +349,149 @@ class GeminiService:
             logger.error(f"Error summarizing article with Gemini: {e}")
             raise RuntimeError("Error summarizing article with Gemini")
 
+    def summarize_articles(self, articles: Dict[str, str]) -> Dict[str, str]:
+        """
+        Summarise several articles, packing as many as fit into each request.
+
+        *articles* maps node IDs to article content; the result maps the same
+        IDs to summaries.  Batches are sized from
+        ``Config.SUMMARY_BATCH_TOKEN_BUDGET``.  Articles whose summary is
+        missing from a batched response fall back to :meth:`summarize_article`;
+        articles that still fail are left out of the result.
+        """
+        summaries: Dict[str, str] = {}
+
+        for batch in self._plan_summary_batches(articles):
+            parsed: Dict[str, str] = {}
+            if len(batch) > 1:
+                try:
+                    parsed = self._summarize_batch(batch)
+                except Exception as e:
+                    logger.warning(f"Batched summary failed, falling back to single calls: {e}")
+
+            for node_id, content in batch.items():
+                if node_id in parsed:
+                    summaries[node_id] = parsed[node_id]
+                    continue
+                try:
+                    summaries[node_id] = self.summarize_article(content)
+                except RuntimeError:
+                    logger.warning(f"Could not summarise article for node {node_id}")
+
+        return summaries
+
+    def _plan_summary_batches(self, articles: Dict[str, str]) -> List[Dict[str, str]]:
+        """Split *articles* into batches that fit the summary token budget."""
+        budget = Config.SUMMARY_BATCH_TOKEN_BUDGET
+        batches: List[Dict[str, str]] = []
+        current: Dict[str, str] = {}
+        used = 0
+
+        for node_id, content in articles.items():
+            content = (content or "")[:SUMMARY_CONTENT_CHARS]
+            cost = estimate_tokens(content) + _BATCH_SECTION_OVERHEAD
+            if current and used + cost > budget:
+                batches.append(current)
+                current, used = {}, 0
+            current[node_id] = content
+            used += cost
+
+        if current:
+            batches.append(current)
+        return batches
+
+    def _summarize_batch(self, batch: Dict[str, str]) -> Dict[str, str]:
+        """Summarise a batch of articles in one request, keyed by node ID."""
+        if not self.model or self.use_mock_data:
+            raise ValueError("Gemini API not available")
+
+        if not self.rate_limiter.can_make_call():
+            wait_time = self.rate_limiter.wait_time()
+            logger.warning(f"Rate limited. Waiting {wait_time:.1f} seconds...")
+            with span("rate_limit_wait"):
+                time.sleep(wait_time + 1)
+
+        # Node IDs embed article titles, so the prompt uses short numeric
+        # aliases that the model can echo back reliably.
+        aliases = {str(i): node_id for i, node_id in enumerate(batch, start=1)}
+        sections = "\n".join(
+            f"=== ARTICLE {alias} ===\n{batch[node_id]}\n=== END ARTICLE {alias} ==="
+            for alias, node_id in aliases.items()
+        )
+        prompt = f"""
+        Summarize each of the following articles in a concise paragraph of at most
+        {_summary_words()} words.
+        Articles are delimited by "=== ARTICLE <id> ===" and "=== END ARTICLE <id> ===".
+
+        Return a JSON object mapping every article id to its summary, for example:
+        {{"1": "<summary>", "2": "<summary>"}}
+
+        {sections}
+        """
+
+        with span("gemini_batch_summary"):
+            response = self._generate(
+                "summary",
+                [prompt],
+                max_output_tokens=Config.MAX_TOKENS * len(batch),
+                response_mime_type="application/json",
+            )
+        self.rate_limiter.record_call()
+
+        parsed = self._parse_batch_response(response.text or "")
+        summaries = {
+            node_id: str(parsed[alias]).strip()
+            for alias, node_id in aliases.items()
+            if alias in parsed and str(parsed[alias]).strip()
+        }
+        logger.info(f"Gemini summarised {len(summaries)}/{len(batch)} articles in one request")
+        return summaries
+
+    @staticmethod
+    def _parse_batch_response(text: str) -> Dict[str, str]:
+        """Parse a JSON ``{id: summary}`` object, tolerating Markdown code fences."""
+        text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+        parsed = json.loads(text)
+        if not isinstance(parsed, dict):
+            raise ValueError("Batched summary response is not a JSON object")
+        return parsed
+
+    def synthesize_subtree(self, subtree_title: str, abstracts: str, max_tokens: int) -> str:
+        """Condense the abstracts of one subtree into at most *max_tokens* tokens."""
+        prompt = f"""
+        The following abstracts come from one branch of a research-tree exploration,
+        rooted at the article '{subtree_title}'. Condense them into a single synthesis
+        of at most {max_tokens * 3 // 4} words.
+
+        Keep article titles and sources, the chronology of the sources, and any
+        causal claims or shifts in framing between them.
+
+        {truncate_to_tokens(abstracts, Config.FINAL_ANALYSIS_TOKEN_BUDGET)}
+        """
+
+        try:
+            if not self.model or self.use_mock_data:
+                raise ValueError("Gemini API not available")
+
+            # unlike the other calls, don't wait for quota: the caller truncates instead
+            if not self.rate_limiter.can_make_call():
+                raise ValueError("Rate limited")
+
+            with span("gemini_synthesis"):
+                response = self._generate("synthesis", [prompt], max_output_tokens=max_tokens)
+
+            synthesis = response.text.strip() if response.text else ""
+            if not synthesis:
+                logger.warning("Gemini returned empty subtree synthesis")
+                raise RuntimeError("Gemini returned empty subtree synthesis")
+
+            self.rate_limiter.record_call()
+            return synthesis
+
+        except Exception as e:
+            logger.error(f"Error synthesising subtree with Gemini: {e}")
+            raise RuntimeError("Error synthesising subtree with Gemini")
+
     def final_analysis(self, root_title: str, leaf_block, full_block) -> str:
 
         prompt =  f"""
@@ -138,7 +509,7 @@ class GeminiService:
     Trace the progression through intermediate articles, noting any changes
     in framing, causality claims, or biases.
 
-    Full-tree abstracts (root → intermediates → leaves):
+    Full-tree abstracts (root → intermediates → leaves, condensed per branch):
     {full_block}
     ------------------------------------------------------------
     Write PART A first (concise), then PART B (≈2× PART A length).
@@ -148,10 +519,8 @@ class GeminiService:
             if not self.model or self.use_mock_data:
                 raise ValueError("Gemini API not available")
 
-            response = self.model.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=[prompt]
-            )
+            with span("gemini_final_analysis"):
+                response = self._generate("final_analysis", [prompt])
 
             summary = response.text.strip() if response.text else ""
             if not summary:
@@ -169,12 +538,15 @@ class GeminiService:
 
 
     def is_available(self) -> bool:
-        return self.model is not None and not self.use_mock_data
+        # configured, without building a client (health checks must stay cheap);
+        # a client that fails to build switches use_mock_data on
+        return not self.use_mock_data and len(self.credentials) > 0
 
     def get_model_info(self) -> dict:
         return {
-            'provider': 'Google Gemini',
+            'provider': 'Google Gemini' if Config.GEMINI_BACKEND != 'fake' else 'Fake Gemini (offline)',
             'model': Config.GEMINI_MODEL,
+            'routing': self.router.get_status(),
             'available': self.is_available(),
             'using_mock_data': self.use_mock_data
         }
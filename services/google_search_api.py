@@ -1,60 +1,32 @@
 from __future__ import annotations
 
+import contextvars
 import html
 import io
 import logging
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
 import requests
-from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from config import Config
+from services.article_fetcher import ArticleFetcher, FetchCancelled
+from services.cost_ledger import ledger
+from services.credential_pool import google_search_pool
+from services.host_health import host_health, looks_blocked
+from services.http_clients import HttpClients
+from services.result_filter import ResultFilter
+from utils.metrics import span
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
-# --------------------------------------------------------------------------- #
-# Constants
-# --------------------------------------------------------------------------- #
-
-CONTENT_TERMS: List[str] = [
-    "article",
-    "blog",
-    "post",
-    "guide",
-    "tutorial",
-    "essay",
-    "story",
-    "origin",
-    "history",
-]
-EXCLUDED_DOMAINS: List[str] = [
-    "youtube.com",
-    "facebook.com",
-    "twitter.com",
-    "instagram.com",
-    "tiktok.com",
-    "pinterest.com",
-    "linkedin.com",
-]
-# file types we *still* want to reject (videos, slides, etc.)
-EXCLUDED_EXTENSIONS: List[str] = [
-    ".ppt",
-    ".pptx",
-    ".doc",
-    ".docx",
-    ".xls",
-    ".xlsx",
-    ".mp4",
-    ".avi",
-    ".mov",
-]
-MIME_HINTS: List[str] = ["video", "playlist", "watch", "login", "signup"]
-
 # --------------------------------------------------------------------------- #
 # Helpers
 # --------------------------------------------------------------------------- #
@@ -79,42 +51,65 @@ class _Result:
 
 
 def _retry() -> Retry:
+    # 429s are not retried here: _call_google moves on to another key instead
     return Retry(
         total=3,
         backoff_factor=0.5,
-        status_forcelist=(429, 500, 502, 503, 504),
+        status_forcelist=(500, 502, 503, 504),
         allowed_methods={"GET"},
     )
 
 
-def _domain(url: str) -> str:
+def _quota_window(resp: requests.Response) -> Optional[str]:
+    """'day' or 'minute' if the API refused the key for quota, else None."""
+    if resp.status_code not in (403, 429):
+        return None
     try:
-        return urlparse(url).netloc.replace("www.", "")
-    except Exception:
-        return ""
+        error = resp.json().get("error", {})
+    except ValueError:
+        error = {}
+    reasons = {e.get("reason") for e in error.get("errors", []) if isinstance(e, dict)}
+    message = str(error.get("message", "")).lower()
 
+    if "dailyLimitExceeded" in reasons or "per day" in message:
+        return "day"
+    if resp.status_code == 429 or reasons & {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"}:
+        return "minute"
+    return None  # e.g. an invalid key or a disabled API
 
-def _has_content_term(text: str) -> bool:
-    text = text.lower()
-    return any(term in text for term in CONTENT_TERMS)
 
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
-def _has_keyword(text: str) -> bool:
-    kw_list: List[str] = getattr(Config, "SEARCH_KEYWORDS", [])
-    if not kw_list:
-        return True
-    lowered = text.lower()
-    return any(k.lower() in lowered for k in kw_list)
 
+def _domain(url: str) -> str:
+    try:
+        return urlparse(url).netloc.replace("www.", "")
+    except Exception:
+        return ""
 
-def _looks_like_file(url: str) -> bool:
-    lowered = url.lower()
-    return any(lowered.endswith(ext) for ext in EXCLUDED_EXTENSIONS)
 
+def _failure_kind(exc: Exception) -> Optional[str]:
+    """Classify a fetch failure for the host health registry (None: URL-specific)."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        if status >= 500:
+            return "http_5xx"
+        if status in (401, 403, 429):
+            return f"http_{status}"
+        return None  # e.g. a 404 says nothing about the host
 
-def _mime_hint(url: str) -> bool:
-    lowered = url.lower()
-    return any(hint in lowered for hint in MIME_HINTS)
+    name = type(exc).__name__.lower()
+    if "timeout" in name:
+        return "timeout"
+    if "retry" in name:
+        return "http_5xx"
+    if "connect" in name:
+        return "connection"
+    return "unparsable"
 
 
 def _is_pdf(url: str, ctype: str | None = None) -> bool:
@@ -135,96 +130,170 @@ class GoogleSearchAPI:
     _PAGE_SIZE = 10
     _TIMEOUT = (5, 15)
 
-    def __init__(self) -> None:
-        self.api_key: str = Config.GOOGLE_SEARCH_API_KEY
-        self.search_engine_id: str = Config.GOOGLE_SEARCH_ENGINE_ID
+    def __init__(
+        self,
+        http_clients: Optional[HttpClients] = None,
+        fetcher: Optional[ArticleFetcher] = None,
+        quota_counters=None,
+    ) -> None:
+        self.base_url: str = getattr(Config, "GOOGLE_SEARCH_BASE_URL", self.BASE_URL)
+        # each request uses whichever configured key has the most quota left
+        self.credentials = google_search_pool(
+            offline=self.base_url != self.BASE_URL, counters=quota_counters
+        )
 
-        if not self.api_key or not self.search_engine_id:
-            raise ValueError(
+        # missing credentials fail the first search, not application start-up
+        if not self.is_available():
+            logger.warning(
                 "Google Search API credentials are missing "
                 "(Config.GOOGLE_SEARCH_API_KEY / GOOGLE_SEARCH_ENGINE_ID)."
             )
 
-        self._session = requests.Session()
-        self._session.headers.update(
-            {
+        http_clients = http_clients or HttpClients()
+        self._session = http_clients.session(
+            "google_search",
+            pool_hosts=1,
+            pool_size=Config.GOOGLE_SEARCH_POOL_SIZE,
+            retries=_retry(),
+            headers={
                 "User-Agent": "OriginExplorer/3.1 (strict-text+pdf)",
                 "Accept": "application/json",
-            }
+            },
         )
-        adapter = HTTPAdapter(max_retries=_retry())
-        self._session.mount("https://", adapter)
-        self._session.mount("http://", adapter)
+
+        self._filter = ResultFilter.from_config()
+        # article pages get their own pooled client; self._session is for the JSON API
+        self._fetcher = fetcher or ArticleFetcher(http_clients)
 
     # ------------------------------------------------------------------ #
     # Public API
     # ------------------------------------------------------------------ #
 
     def search_articles(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """Return up to *limit* relevant HTML/PDF article results for *query*."""
+        """
+        Return up to *limit* relevant HTML/PDF article results for *query*.
+
+        A single upstream page is fetched on the calling thread; when *limit*
+        needs several, they are requested in parallel.
+        """
         if not query:
             raise ValueError("Query may not be empty")
 
         try:
-            results: List[_Result] = []
             pages = min((limit - 1) // self._PAGE_SIZE + 1, 10)
+            starts = [page * self._PAGE_SIZE + 1 for page in range(pages)]
+            if pages == 1:
+                responses = [self._call_google(query, limit, starts[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=pages) as pool:
+                    futures = [
+                        pool.submit(
+                            contextvars.copy_context().run, self._call_google, query, limit, page_start
+                        )
+                        for page_start in starts
+                    ]
+                    responses = [future.result() for future in futures]
+
+            results = [r for data in responses for r in self._relevant_results(data)]
+            return [r.asdict() for r in results[:limit]]
 
-            for page in range(pages):
-                start = page * self._PAGE_SIZE + 1
-                data = self._call_google(query, limit, start)
-
-                for item in data.get("items", []):
-                    article = self._format(item)
-                    if self._is_relevant(article):
-                        results.append(article)
-                        if len(results) >= limit:
-                            break
+        except Exception as exc:
+            # a routine upstream failure: the traceback only at DEBUG
+            logger.warning("search_articles failed: %s", exc, exc_info=logger.isEnabledFor(logging.DEBUG))
+            raise ValueError("Search API Failed") from exc
 
-                if len(results) >= limit:
-                    break
+    def search_page(self, query: str, start: int = 1) -> Dict[str, Any]:
+        """
+        Fetch exactly one upstream page of results for *query*.
 
-            return [r.asdict() for r in results[:limit]]
+        Returns ``{"results": [...], "next_start": int | None}``, where
+        ``next_start`` comes from the ``queries.nextPage`` field of the
+        response and is ``None`` on the last page.
+        """
+        if not query:
+            raise ValueError("Query may not be empty")
 
+        try:
+            data = self._call_google(query, self._PAGE_SIZE, start)
+            next_page = data.get("queries", {}).get("nextPage") or [{}]
+            return {
+                "results": [r.asdict() for r in self._relevant_results(data)],
+                "next_start": next_page[0].get("startIndex"),
+            }
         except Exception as exc:
-            logger.exception("search_articles failed: %s", exc)
+            # a routine upstream failure: the traceback only at DEBUG
+            logger.warning("search_page failed: %s", exc, exc_info=logger.isEnabledFor(logging.DEBUG))
             raise ValueError("Search API Failed") from exc
 
-    def get_article_content(self, url: str) -> Optional[str]:
+    def get_article_content(self, url: str, cancel: Optional[threading.Event] = None) -> Optional[str]:
         """
         Fetch article text (HTML or PDF) from *url*.
 
-        Returns up to 2 000 characters, raising ``ValueError`` on any problem.
+        Returns up to ``Config.ARTICLE_TEXT_MAX_CHARS`` characters, raising
+        ``ValueError`` on any problem.
         """
         if not url:
             raise ValueError("URL may not be empty")
 
-        if _looks_like_file(url) or _mime_hint(url):
+        if self._filter.is_blocked_url(url):
             raise ValueError("Unsupported file type")
 
+        if not host_health.allow_request(url):
+            raise ValueError(f"Skipping {url}: host is failing, circuit open")
+
+        if not host_health.robots_allowed(url, self._fetch_robots_txt):
+            raise ValueError(f"Skipping {url}: disallowed by robots.txt")
+
         try:
-            resp = self._session.get(url, timeout=self._TIMEOUT, stream=True)
-            resp.raise_for_status()
-            ctype = resp.headers.get("Content-Type", "")
-            if _is_pdf(url, ctype):
-                text = self._extract_pdf(resp.content)
-            else:
-                text = self._extract_html(resp.text)
-            return text[:2000] if text else None
+            start = time.perf_counter()
+            try:
+                page = self._fetcher.fetch(url, cancel=cancel)
+            except Exception:
+                ledger.record("article_fetch", "fetch", time.perf_counter() - start, ok=False)
+                raise
+            ledger.record("article_fetch", "fetch", time.perf_counter() - start)
+            with span("article_parse"):
+                if _is_pdf(url, page.content_type):
+                    text = self._extract_pdf(page.content)
+                else:
+                    text = self._extract_html(page.text)
+        except FetchCancelled as exc:
+            raise ValueError(f"Fetch of {url} cancelled") from exc
         except Exception as exc:
-            logger.exception("get_article_content failed: %s", exc)
+            kind = _failure_kind(exc)
+            if kind:
+                host_health.record_failure(url, kind, str(exc)[:200])
+            # routine on the open web, so no traceback
+            logger.warning("get_article_content failed for %s: %s", url, exc)
             raise ValueError(f"Failed to fetch content from {url}") from exc
 
-    def is_available(self) -> bool:  # public contract unchanged
-        return True
+        if not text:
+            host_health.record_failure(url, "unparsable", "no text extracted")
+            return None
+
+        signal = looks_blocked(text)
+        if signal:
+            host_health.record_failure(url, "blocked", signal)
+            raise ValueError(f"Paywall or bot check at {url}: {signal!r}")
+
+        host_health.record_success(url)
+        return text[: Config.ARTICLE_TEXT_MAX_CHARS]
+
+    def is_available(self) -> bool:
+        return len(self.credentials) > 0
 
     # ------------------------------------------------------------------ #
     # Internals
     # ------------------------------------------------------------------ #
 
     def _call_google(self, query: str, limit: int, start: int) -> Dict[str, Any]:
+        if not self.is_available():
+            raise ValueError(
+                "Google Search API credentials are missing "
+                "(Config.GOOGLE_SEARCH_API_KEY / GOOGLE_SEARCH_ENGINE_ID)."
+            )
+
         params = {
-            "key": self.api_key,
-            "cx": self.search_engine_id,
             "q": f"{query} (origin OR history) (article OR blog OR guide OR tutorial)",
             "num": min(limit, self._PAGE_SIZE),
             "start": start,
@@ -235,10 +304,35 @@ class GoogleSearchAPI:
             ),
         }
 
-        resp = self._session.get(self.BASE_URL, params=params, timeout=self._TIMEOUT)
+        # a key refused for quota is retired and the request moves on to the next
+        for _ in range(len(self.credentials)):
+            credential = self.credentials.acquire()
+            if credential is None:
+                raise ValueError("Every Google Search API key is out of quota")
+
+            params.update(key=credential.key, cx=credential.engine_id)
+            started = time.perf_counter()
+            try:
+                with span("google_search"):
+                    resp = self._session.get(self.base_url, params=params, timeout=self._TIMEOUT)
+            except Exception:
+                ledger.record("google_search", "search", time.perf_counter() - started, ok=False)
+                raise
+            ledger.record("google_search", "search", time.perf_counter() - started, ok=resp.ok)
+
+            window = _quota_window(resp)
+            if window is None:
+                break
+            self.credentials.report_exhausted(
+                credential, daily=window == "day", retry_after=_retry_after(resp)
+            )
+
         resp.raise_for_status()
         return resp.json()
 
+    def _fetch_robots_txt(self, robots_url: str) -> str:
+        return self._fetcher.fetch(robots_url, timeout=(2, 3)).text
+
     # ---------------- text extraction ---------------- #
 
     @staticmethod
@@ -281,15 +375,11 @@ class GoogleSearchAPI:
 
     # ---------------- result helpers ---------------- #
 
+    def _relevant_results(self, data: Dict[str, Any]) -> List[_Result]:
+        return self._filter.filter(map(self._format, data.get("items", [])))
+
     def _is_relevant(self, art: _Result) -> bool:
-        blob = f"{art.title} {art.snippet} {art.url}".lower()
-        return (
-            _has_content_term(blob)
-            and _has_keyword(blob)
-            and not _looks_like_file(art.url)
-            and not _mime_hint(art.url)
-            and not any(dom in art.url.lower() for dom in EXCLUDED_DOMAINS)
-        )
+        return self._filter.is_relevant(art)
 
     @staticmethod
     def _format(item: Dict[str, Any]) -> _Result:
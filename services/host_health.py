@@ -0,0 +1,253 @@
+"""
+host_health.py – per-host health registry for article fetching.
+
+Remembers which hosts recently timed out, refused us (403), failed (5xx),
+served unparsable bodies or paywall/bot-check pages, and opens a circuit
+breaker per host so later searches skip it instead of waiting out the full
+fetch timeout again.  It also caches each host's robots.txt.
+
+A circuit opens after ``HOST_FAILURE_THRESHOLD`` failures without a success
+in between.  Once its cooldown has passed it is half-open: a single fetch
+is let through as a probe.  A successful probe closes it; a failed one
+reopens it with twice the cooldown.  Failures reported while the circuit is
+already open (fetches that started before it opened) are counted but do not
+extend it.  Only the ``HOST_HEALTH_MAX_HOSTS`` most recently used hosts are
+remembered.
+
+The registry never touches the network itself; ``robots_allowed`` takes a
+fetch callable for the (cached) robots.txt download.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+ROBOTS_USER_AGENT = "OriginExplorer"
+
+# a half-open probe that never reports back (cancelled, or an error that is
+# not the host's fault) stops blocking the next probe after this long
+_PROBE_TIMEOUT = 60.0
+
+_BLOCK_SIGNALS = re.compile(
+    r"subscribe to (?:continue|read)"
+    r"|enable javascript (?:and cookies )?to continue"
+    r"|access denied"
+    r"|verify (?:that )?you are (?:a )?human"
+    r"|are you a robot"
+    r"|checking your browser"
+    r"|complete the captcha",
+    re.IGNORECASE,
+)
+
+
+def host_of(url: str) -> str:
+    """``host[:port]`` of *url* – the unit robots.txt and circuits apply to."""
+    try:
+        return urlparse(url).netloc.rsplit("@", 1)[-1].lower()
+    except ValueError:
+        return ""
+
+
+# paywall and bot-check interstitials are short; a longer page that mentions
+# "access denied" is an article about it
+_BLOCK_PAGE_MAX_CHARS = 600
+
+
+def looks_blocked(text: str) -> Optional[str]:
+    """Return the paywall/bot-check phrase found in *text*, if it is short enough to be one."""
+    if len(text) > _BLOCK_PAGE_MAX_CHARS:
+        return None
+    match = _BLOCK_SIGNALS.search(text)
+    return match.group(0).lower() if match else None
+
+
+@dataclass
+class _HostState:
+    failures: int = 0
+    cooldown: float = 0.0
+    open_until: float = 0.0
+    probe_started: float = 0.0  # while half-open: when the probe was let through
+    last_error: str = ""
+    robots: Optional[RobotFileParser] = None
+    robots_fetched_at: float = 0.0
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+class HostHealthRegistry:
+    """Thread-safe circuit breakers and robots.txt cache, keyed by host."""
+
+    def __init__(self, max_hosts: Optional[int] = None) -> None:
+        self.max_hosts = max_hosts or Config.HOST_HEALTH_MAX_HOSTS
+        self._hosts: "OrderedDict[str, _HostState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        """*host*'s state, created if needed and marked recently used (lock held)."""
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState()
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+
+    @staticmethod
+    def _probe_pending(state: _HostState, now: float) -> bool:
+        return now - state.probe_started < _PROBE_TIMEOUT
+
+    # ------------------------------------------------------------------ #
+    # Circuit breaker
+    # ------------------------------------------------------------------ #
+
+    def is_available(self, url: str) -> bool:
+        """
+        Whether a fetch from the host could go ahead now: its circuit is
+        closed, or half-open with no probe in flight.  Does not claim the probe.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            if state is None or not state.open_until:
+                return True
+            return now >= state.open_until and not self._probe_pending(state, now)
+
+    def allow_request(self, url: str) -> bool:
+        """Like ``is_available``, but a half-open host's one probe is claimed by this call."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            if state is None or not state.open_until:
+                return True
+            if now < state.open_until or self._probe_pending(state, now):
+                return False
+            state.probe_started = now
+            return True
+
+    def penalty(self, url: str) -> int:
+        """Recent failure count for the host, for ranking candidates."""
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            return state.failures if state else 0
+
+    def record_success(self, url: str) -> None:
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            if state:
+                state.failures = 0
+                state.cooldown = 0.0
+                state.open_until = 0.0
+                state.probe_started = 0.0
+
+    def record_failure(self, url: str, kind: str, detail: str = "") -> None:
+        """
+        Count a failure of *kind* (``timeout``, ``connection``, ``http_403``,
+        ``http_5xx``, ``unparsable``, ``blocked``) against the URL's host.
+        """
+        host = host_of(url)
+        if not host:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(host)
+            state.failures += 1
+            state.last_error = f"{kind}: {detail}" if detail else kind
+            state.counts[kind] = state.counts.get(kind, 0) + 1
+
+            if state.open_until:
+                if now < state.open_until:
+                    return  # already open: a fetch that started earlier
+                # half-open: the probe (or a fetch from before) failed
+            elif state.failures < Config.HOST_FAILURE_THRESHOLD:
+                return
+
+            # escalate only on the way into the open state
+            state.cooldown = min(
+                max(state.cooldown * 2, Config.HOST_COOLDOWN_SECONDS),
+                Config.HOST_COOLDOWN_MAX_SECONDS,
+            )
+            state.open_until = now + state.cooldown
+            state.probe_started = 0.0
+        logger.warning(
+            "Circuit open for %s for %.0fs after %s", host, state.cooldown, state.last_error
+        )
+
+    # ------------------------------------------------------------------ #
+    # robots.txt
+    # ------------------------------------------------------------------ #
+
+    def robots_allowed(self, url: str, fetch_text: Callable[[str], str]) -> bool:
+        """
+        Whether robots.txt lets us fetch *url*.  The file is downloaded with
+        *fetch_text* at most once per ``Config.ROBOTS_TXT_TTL`` per host; a
+        missing or unreachable robots.txt allows everything.
+        """
+        if not Config.RESPECT_ROBOTS_TXT:
+            return True
+
+        host = host_of(url)
+        if not host:
+            return True
+
+        with self._lock:
+            state = self._state(host)
+            fresh = time.monotonic() - state.robots_fetched_at < Config.ROBOTS_TXT_TTL
+            parser = state.robots if fresh else None
+
+        if parser is None:
+            parser = RobotFileParser()
+            parsed = urlparse(url)
+            try:
+                parser.parse(fetch_text(f"{parsed.scheme}://{parsed.netloc}/robots.txt").splitlines())
+            except Exception as exc:
+                logger.debug("robots.txt unavailable for %s: %s", host, exc)
+                parser.allow_all = True
+            with self._lock:
+                state.robots = parser
+                state.robots_fetched_at = time.monotonic()
+
+        return parser.can_fetch(ROBOTS_USER_AGENT, url)
+
+    def robots_known_disallowed(self, url: str) -> bool:
+        """True only if a cached robots.txt already forbids *url* (no fetching)."""
+        if not Config.RESPECT_ROBOTS_TXT:
+            return False
+        with self._lock:
+            state = self._hosts.get(host_of(url))
+            parser = state.robots if state else None
+        return parser is not None and not parser.can_fetch(ROBOTS_USER_AGENT, url)
+
+    # ------------------------------------------------------------------ #
+    # Introspection
+    # ------------------------------------------------------------------ #
+
+    def get_status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "failures": state.failures,
+                    "open_for_seconds": round(max(0.0, state.open_until - now), 1),
+                    "last_error": state.last_error,
+                    "counts": dict(state.counts),
+                }
+                for host, state in self._hosts.items()
+                if state.failures or state.counts
+            }
+
+
+host_health = HostHealthRegistry()
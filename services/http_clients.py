@@ -0,0 +1,176 @@
+"""
+http_clients.py – one pooled HTTP client per upstream, shared process-wide.
+
+The Custom Search API, article hosts and Gemini each get exactly one client,
+created on first use by ``HttpClients`` (owned by the ``ServiceContainer``)
+and shared by the routes, the search engine and its background threads, so
+connections and TLS sessions are reused instead of every component keeping
+its own pool.  Pool sizes come from ``Config``; ``stats()`` reports how each
+pool is being used.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class _CountingAdapter(HTTPAdapter):
+    """``HTTPAdapter`` that counts requests and transport failures."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.requests = 0
+        self.failures = 0
+        self._count_lock = threading.Lock()
+
+    def send(self, request, *args: Any, **kwargs: Any):
+        with self._count_lock:
+            self.requests += 1
+        try:
+            return super().send(request, *args, **kwargs)
+        except requests.RequestException:
+            with self._count_lock:
+                self.failures += 1
+            raise
+
+
+class HttpClients:
+    """Registry of named, lazily created, thread-safe HTTP clients."""
+
+    def __init__(self) -> None:
+        self._sessions: Dict[str, requests.Session] = {}
+        self._httpx: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def session(
+        self,
+        upstream: str,
+        pool_hosts: int = 10,
+        pool_size: int = 10,
+        retries: Optional[Retry] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> requests.Session:
+        """
+        The ``requests.Session`` for *upstream*; the pool settings only apply
+        to the call that creates it.
+        """
+        with self._lock:
+            session = self._sessions.get(upstream)
+            if session is None:
+                session = requests.Session()
+                if headers:
+                    session.headers.update(headers)
+                adapter = _CountingAdapter(
+                    pool_connections=pool_hosts,
+                    pool_maxsize=pool_size,
+                    max_retries=retries or 0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[upstream] = session
+                logger.info("HTTP pool '%s': %d hosts x %d connections", upstream, pool_hosts, pool_size)
+            return session
+
+    def httpx_client(self, upstream: str, max_connections: int = 10, **kwargs: Any):
+        """The ``httpx.Client`` for *upstream*, for SDKs that bring their own transport."""
+        import httpx
+
+        with self._lock:
+            client = self._httpx.get(upstream)
+            if client is None:
+                client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                    ),
+                    **kwargs,
+                )
+                self._httpx[upstream] = client
+                logger.info("HTTP pool '%s': %d connections (httpx)", upstream, max_connections)
+            return client
+
+    def register_httpx(self, upstream: str, client: Any) -> None:
+        """Track a client built elsewhere (e.g. HTTP/2 article fetching) in ``stats()``."""
+        with self._lock:
+            self._httpx.setdefault(upstream, client)
+
+    # ------------------------------------------------------------------ #
+    # Statistics
+    # ------------------------------------------------------------------ #
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            sessions = dict(self._sessions)
+            clients = dict(self._httpx)
+
+        report = {name: _session_stats(session) for name, session in sessions.items()}
+        report.update({name: _httpx_stats(client) for name, client in clients.items()})
+        return report
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for client in self._httpx.values():
+                client.close()
+            self._sessions.clear()
+            self._httpx.clear()
+
+
+def _session_stats(session: requests.Session) -> Dict[str, Any]:
+    adapter = session.get_adapter("https://")
+    hosts = {}
+    # urllib3 internals; the numbers are best-effort and never worth failing over
+    try:
+        manager = adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                # the queue is pre-filled with None placeholders for unopened slots
+                "idle": sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                if pool.pool is not None
+                else 0,
+                "max_size": pool.pool.maxsize if pool.pool is not None else 0,
+            }
+    except Exception as e:
+        logger.debug("Could not read urllib3 pool stats: %s", e)
+
+    return {
+        "client": "requests",
+        "pool_hosts": getattr(adapter, "_pool_connections", None),
+        "pool_size": getattr(adapter, "_pool_maxsize", None),
+        "requests": getattr(adapter, "requests", None),
+        "failures": getattr(adapter, "failures", None),
+        "connections_opened": sum(h["connections_opened"] for h in hosts.values()),
+        "idle_connections": sum(h["idle"] for h in hosts.values()),
+        "hosts": hosts,
+    }
+
+
+def _httpx_stats(client: Any) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {"client": "httpx"}
+    try:
+        pool = client._transport._pool
+        connections = list(pool.connections)
+        stats.update(
+            {
+                "max_connections": pool._max_connections,
+                "connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle()),
+            }
+        )
+    except Exception as e:
+        logger.debug("Could not read httpx pool stats: %s", e)
+    return stats
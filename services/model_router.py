@@ -0,0 +1,119 @@
+"""
+model_router.py – which Gemini model answers which task.
+
+Every task has a profile: the models to try, in order, and an output-token
+cap.  Per-node work (search queries, summaries, subtree syntheses) is latency
+critical and goes to a small, fast model; only ``final_analysis`` uses
+``GEMINI_MODEL``, which may be set to a larger one.
+
+``ModelRouter`` keeps each model's recent latencies and throttling.  A model
+whose p90 exceeds its task's budget, or which the API has just throttled, is
+tried after the others until its samples age out or its cooldown passes, so
+routing recovers by itself.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from utils.metrics import LatencyWindow
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    models: Tuple[str, ...]
+    max_output_tokens: Optional[int]
+    p90_budget: float  # seconds
+
+
+def _models(*names: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(n for n in names if n))
+
+
+def default_profiles() -> Dict[str, ModelProfile]:
+    fast = _models(Config.GEMINI_FAST_MODEL, Config.GEMINI_FALLBACK_MODEL)
+    large = _models(Config.GEMINI_MODEL, Config.GEMINI_FAST_MODEL)
+    budget = Config.GEMINI_FAST_P90_BUDGET
+    return {
+        "queries": ModelProfile(fast, Config.GEMINI_QUERY_MAX_TOKENS, budget),
+        "summary": ModelProfile(fast, Config.MAX_TOKENS, budget),
+        "synthesis": ModelProfile(fast, None, budget),  # the caller sizes the synthesis
+        "final_analysis": ModelProfile(large, None, Config.GEMINI_ANALYSIS_P90_BUDGET),
+    }
+
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 4)
+
+
+class ModelRouter:
+    """Orders each task's models by recent health; thread-safe."""
+
+    def __init__(self, profiles: Optional[Dict[str, ModelProfile]] = None) -> None:
+        self.profiles = profiles or default_profiles()
+        self.throttle_cooldown = Config.GEMINI_THROTTLE_COOLDOWN
+        self._latency: Dict[str, LatencyWindow] = {}
+        self._throttled_until: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def profile(self, task: str) -> ModelProfile:
+        return self.profiles[task]
+
+    def _window(self, model: str) -> LatencyWindow:
+        with self._lock:
+            window = self._latency.get(model)
+            if window is None:
+                window = self._latency[model] = LatencyWindow(max_samples=50)
+            return window
+
+    def candidates(self, task: str) -> List[str]:
+        """*task*'s models, healthy ones first, each group in profile order."""
+        profile = self.profiles[task]
+        now = time.monotonic()
+        healthy, degraded = [], []
+        for model in profile.models:
+            p90 = self._window(model).percentile(90)
+            slow = p90 is not None and p90 > profile.p90_budget
+            throttled = self._throttled_until.get(model, 0.0) > now
+            (degraded if slow or throttled else healthy).append(model)
+        return healthy + degraded
+
+    # ------------------------------------------------------------------ #
+    # Outcomes
+    # ------------------------------------------------------------------ #
+
+    def record(self, model: str, seconds: float, ok: bool = True) -> None:
+        self._window(model).observe(seconds)
+        with self._lock:
+            self._calls[model] = self._calls.get(model, 0) + 1
+            if not ok:
+                self._failures[model] = self._failures.get(model, 0) + 1
+
+    def record_throttled(self, model: str) -> None:
+        with self._lock:
+            self._calls[model] = self._calls.get(model, 0) + 1
+            self._failures[model] = self._failures.get(model, 0) + 1
+            self._throttled_until[model] = time.monotonic() + self.throttle_cooldown
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        models = sorted({m for p in self.profiles.values() for m in p.models})
+        return {
+            "tasks": {task: self.candidates(task) for task in self.profiles},
+            "models": {
+                model: {
+                    "calls": self._calls.get(model, 0),
+                    "failures": self._failures.get(model, 0),
+                    "p50_seconds": _rounded(self._window(model).percentile(50)),
+                    "p90_seconds": _rounded(self._window(model).percentile(90)),
+                    "throttled_for": round(max(self._throttled_until.get(model, 0.0) - now, 0.0), 1),
+                }
+                for model in models
+            },
+        }
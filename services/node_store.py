@@ -0,0 +1,94 @@
+"""
+node_store.py – per-search store of node details served on demand.
+
+``tree_update`` only carries each node's structure (id, parent, status,
+title); the heavier fields (snippet, URL, image, query, timestamps, summary)
+are written here and fetched by the client through ``/api/node/<id>`` when a
+node is expanded.
+
+``NodeStore`` keeps recent searches in memory (LRU + TTL).  With a Redis
+message queue, web nodes and search workers do not share memory, so
+``RedisNodeStore`` keeps one hash per search instead.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+
+class NodeStore:
+    """Thread-safe in-memory store of ``{session_id: {node_id: details}}``."""
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_sessions = max_sessions or Config.NODE_STORE_SESSIONS
+        self.ttl_seconds = ttl_seconds or Config.NODE_STORE_TTL
+        self._sessions: "OrderedDict[str, Tuple[float, Dict[str, Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id: str, details: Dict[str, Dict[str, Any]]) -> None:
+        """Add or replace the details of some of *session_id*'s nodes."""
+        with self._lock:
+            _, nodes = self._sessions.pop(session_id, (0.0, {}))
+            nodes.update(details)
+            self._sessions[session_id] = (time.time(), nodes)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str, node_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            stored_at, nodes = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            return nodes.get(node_id)
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class RedisNodeStore:
+    """Same interface, one Redis hash per search, shared across processes."""
+
+    def __init__(self, client, ttl_seconds: Optional[float] = None):
+        self._client = client
+        self.ttl_seconds = int(ttl_seconds or Config.NODE_STORE_TTL)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"origin-explorer:nodes:{session_id}"
+
+    def put(self, session_id: str, details: Dict[str, Dict[str, Any]]) -> None:
+        if not details:
+            return
+        key = self._key(session_id)
+        pipe = self._client.pipeline()
+        pipe.hset(key, mapping={nid: json.dumps(d) for nid, d in details.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def get(self, session_id: str, node_id: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.hget(self._key(session_id), node_id)
+        return json.loads(raw) if raw else None
+
+    def clear(self, session_id: str) -> None:
+        self._client.delete(self._key(session_id))
+
+
+def create_node_store():
+    """The store every process of this deployment can reach."""
+    if Config.SOCKETIO_MESSAGE_QUEUE:
+        # imported lazily: only Redis deployments need the client
+        from services.search_workers import redis_client
+
+        return RedisNodeStore(redis_client(Config.SOCKETIO_MESSAGE_QUEUE))
+    return NodeStore()
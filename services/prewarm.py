@@ -0,0 +1,333 @@
+"""
+prewarm.py – explore popular root articles before anyone asks.
+
+Every root article a client opens is counted in ``DemandLog``.  Each open's
+weight halves every ``PREWARM_HALF_LIFE`` seconds, so the ranking follows
+recent demand.  When the site is quiet, ``Prewarmer`` explores the
+top-ranked articles that have no fresh tree.  Quiet means no article opened
+for ``PREWARM_IDLE_SECONDS`` and Gemini's minute window mostly unused.  The
+exploration uses the engine's ``explore``, which captures events instead of
+emitting them.  Opening one of those articles later replays the stored tree
+at once instead of searching.
+
+The pre-warmer never uses more than ``PREWARM_QUOTA_SHARE`` of a provider's
+daily quota (where one is configured), nor more than that share of the
+Gemini minute window, which counts every process's calls (see
+``services.quota_counters``).  These checks, and the idle check, are made
+again before each upstream step of an exploration.  A minute window past the
+share is waited out, for up to a minute; a root article opened, the daily
+share spent or a window that stays full ends the exploration there, so live
+searches always keep the rest of the quota.  Explorations run one at a time on the web
+process, whatever the search runner, and are recorded in the cost ledger
+under ``prewarm:`` sessions.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from services.cost_ledger import ledger
+from services.quota_counters import quota_day
+from utils import payload_codec
+from utils.search_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_BUSY = "gemini minute window in use"
+# an exploration waits this long at most for the minute window to clear
+_MAX_YIELD = 60.0
+
+
+def article_key(article_data: Dict[str, Any]) -> str:
+    """The same article, however it was opened: by URL, else by title."""
+    url = (article_data.get("url") or "").strip().lower().rstrip("/")
+    return url or f"title:{normalize_query(article_data.get('title') or '')}"
+
+
+class DemandLog:
+    """Opens per root article, each worth less the older it is (thread-safe)."""
+
+    def __init__(self, half_life: Optional[float] = None, max_articles: int = 1000) -> None:
+        self.half_life = half_life or Config.PREWARM_HALF_LIFE
+        self.max_articles = max_articles
+        # key -> [score at `updated`, updated, opens, article_data]
+        self._articles: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated: float, now: float) -> float:
+        return score * math.pow(0.5, (now - updated) / self.half_life)
+
+    def record(self, article_data: Dict[str, Any]) -> None:
+        key = article_key(article_data)
+        now = time.time()
+        with self._lock:
+            entry = self._articles.get(key)
+            if entry is None:
+                if len(self._articles) >= self.max_articles:
+                    coldest = min(self._articles, key=lambda k: self._decayed(*self._articles[k][:2], now))
+                    del self._articles[coldest]
+                entry = self._articles[key] = [0.0, now, 0, article_data]
+            entry[0] = self._decayed(entry[0], entry[1], now) + 1.0
+            entry[1] = now
+            entry[2] += 1
+            entry[3] = article_data
+
+    def ranked(self, limit: int, min_score: float = 0.0) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """``(key, score, article_data)`` of the most demanded articles, best first."""
+        now = time.time()
+        with self._lock:
+            scored = [
+                (key, self._decayed(score, updated, now), data)
+                for key, (score, updated, _, data) in self._articles.items()
+            ]
+        scored = [s for s in scored if s[1] >= min_score]
+        scored.sort(key=lambda s: -s[1])
+        return scored[:limit]
+
+    def __len__(self) -> int:
+        return len(self._articles)
+
+
+@dataclass
+class WarmTree:
+    key: str
+    article_data: Dict[str, Any]
+    events: List[Tuple[str, Any]]
+    details: Dict[str, Dict[str, Any]]
+    warmed_at: float = field(default_factory=time.time)
+    served: int = 0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.warmed_at
+
+
+class Prewarmer:
+    """Explores in-demand articles in quiet, spare-quota windows and serves the results."""
+
+    def __init__(self, services, socketio) -> None:
+        self.services = services
+        self.socketio = socketio
+        self.demand = DemandLog()
+        self._trees: Dict[str, WarmTree] = {}
+        self._last_open = 0.0
+        self._day = ""
+        self._spent: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self.explored = 0
+        self.stopped = 0
+        self.served = 0
+        self.last_skip: Optional[str] = None
+
+    # ------------------------------------------------------------------ #
+    # Live traffic
+    # ------------------------------------------------------------------ #
+
+    def record_open(self, article_data: Dict[str, Any]) -> None:
+        """Count a root article a client opened."""
+        self._last_open = time.time()
+        self.demand.record(article_data)
+        logger.info(
+            "Root article opened: %s", article_data.get("title"),
+            extra={"event": "article_opened", "article_key": article_key(article_data)},
+        )
+
+    def lookup(self, article_data: Dict[str, Any]) -> Optional[WarmTree]:
+        """A fresh pre-warmed tree for *article_data*, if there is one."""
+        if not Config.PREWARM_ENABLED:
+            return None
+        with self._lock:
+            tree = self._trees.get(article_key(article_data))
+        if tree is None or tree.age > Config.PREWARM_TTL:
+            return None
+        return tree
+
+    def serve(self, tree: WarmTree, session_id: str) -> None:
+        """Replay *tree* to *session_id*, as if its search had just run."""
+        self.services.node_store.put(session_id, tree.details)
+        for event, data in tree.events:
+            if event != "tree_update" and isinstance(data, dict):
+                data = {**data, "session_id": session_id} if "session_id" in data else dict(data)
+                if event == "search_complete":
+                    data.update(prewarmed=True, warmed_at=tree.warmed_at)
+            self.socketio.emit(event, payload_codec.encode(event, data, session_id), room=session_id)
+        with self._lock:
+            tree.served += 1
+            self.served += 1
+        logger.info("Served pre-warmed tree for '%s' (%.0fs old)", tree.article_data.get("title"), tree.age)
+
+    # ------------------------------------------------------------------ #
+    # Background exploration
+    # ------------------------------------------------------------------ #
+
+    def start(self, start_task: Optional[Callable[..., Any]] = None) -> None:
+        if self._started or not Config.PREWARM_ENABLED:
+            return
+        self._started = True
+        if start_task is not None:
+            start_task(self._loop)
+        else:
+            threading.Thread(target=self._loop, name="prewarmer", daemon=True).start()
+        logger.info(
+            "Pre-warmer started (every %.0fs, %.0f%% quota share)",
+            Config.PREWARM_INTERVAL, Config.PREWARM_QUOTA_SHARE * 100,
+        )
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(Config.PREWARM_INTERVAL)
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Pre-warming failed: %s", e, exc_info=True)
+
+    def run_once(self) -> Optional[str]:
+        """Explore the most demanded article without a fresh tree; returns its key."""
+        candidates = [
+            (key, data)
+            for key, _, data in self.demand.ranked(Config.PREWARM_TOP_N, Config.PREWARM_MIN_DEMAND)
+            if self._needs_warming(key)
+        ]
+        if not candidates:
+            self.last_skip = "nothing to warm"
+            return None
+
+        reason = self._busy_reason()
+        if reason is not None:
+            self.last_skip = reason
+            logger.debug("Not pre-warming: %s", reason)
+            return None
+        self.last_skip = None
+
+        key, article_data = candidates[0]
+        session_id = f"prewarm:{uuid.uuid4().hex[:12]}"
+        started = time.perf_counter()
+        spent: Dict[str, Any] = {}
+        stop_reason: List[str] = []
+
+        def should_stop() -> bool:
+            # asked before each upstream step: live traffic takes precedence.
+            # A full minute window is waited out (it holds mostly our own
+            # calls), anything else ends the exploration.
+            deadline = time.monotonic() + _MAX_YIELD
+            while True:
+                spent.update(ledger.search_totals(session_id)["providers"])
+                reason = self._busy_reason(spent)
+                if reason != _WINDOW_BUSY or time.monotonic() >= deadline:
+                    break
+                time.sleep(min(max(self.services.rate_limiter.wait_time(), 1.0), 5.0))
+            if reason is not None:
+                stop_reason.append(reason)
+            return reason is not None
+
+        captured = self.services.search_engine.explore(article_data, session_id, should_stop)
+        complete = next((data for event, data in captured["events"] if event == "search_complete"), None)
+        if complete is None:
+            self._charge(spent)
+            if stop_reason:
+                self.stopped += 1
+                self.last_skip = f"stopped: {stop_reason[0]}"
+                logger.info("Stopped pre-warming '%s': %s", article_data.get("title"), stop_reason[0])
+            else:
+                logger.warning("Pre-warm exploration of '%s' did not complete", article_data.get("title"))
+            return None
+
+        self._charge((complete.get("cost") or {}).get("providers", {}))
+        tree = WarmTree(key, article_data, captured["events"], captured["details"])
+        with self._lock:
+            self._trees[key] = tree
+            while len(self._trees) > Config.PREWARM_MAX_TREES:
+                oldest = min(self._trees.values(), key=lambda t: t.warmed_at)
+                del self._trees[oldest.key]
+            self.explored += 1
+        logger.info(
+            "Pre-warmed '%s' in %.1fs (%d nodes)",
+            article_data.get("title"), time.perf_counter() - started, len(captured["details"]),
+        )
+        return key
+
+    def _needs_warming(self, key: str) -> bool:
+        with self._lock:
+            tree = self._trees.get(key)
+        # refreshed a little before it expires, so a hot article stays warm
+        return tree is None or tree.age > Config.PREWARM_TTL * 0.8
+
+    def _busy_reason(self, in_flight: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Why now is not a spare window, or None if it is.  *in_flight* holds the
+        running exploration's per-provider totals, not yet charged.
+        """
+        in_flight = in_flight or {}
+        if time.time() - self._last_open < Config.PREWARM_IDLE_SECONDS:
+            return "live traffic"
+
+        rate_limiter = self.services.rate_limiter
+        status = rate_limiter.get_status()
+        if status["recent_calls"] > status["max_calls_per_minute"] * Config.PREWARM_QUOTA_SHARE:
+            return _WINDOW_BUSY
+
+        pools = {
+            "google_search": self.services.google_search.credentials,
+            "gemini": self.services.gemini_service.credentials,
+        }
+        with self._lock:
+            self._roll_day()
+            for provider, pool in pools.items():
+                calls = self._spent.get(provider, 0) + in_flight.get(provider, {}).get("calls", 0)
+                if pool.per_day and calls >= (
+                    pool.per_day * len(pool) * Config.PREWARM_QUOTA_SHARE
+                ):
+                    return f"{provider} daily share spent"
+        return None
+
+    def _roll_day(self) -> None:
+        day = quota_day(time.time())
+        if day != self._day:
+            self._day, self._spent = day, {}
+
+    def _charge(self, providers: Dict[str, Any]) -> None:
+        """Count an exploration's upstream calls, per provider, against today's share."""
+        with self._lock:
+            self._roll_day()
+            for provider, totals in providers.items():
+                self._spent[provider] = self._spent.get(provider, 0) + totals.get("calls", 0)
+
+    # ------------------------------------------------------------------ #
+    # Reporting
+    # ------------------------------------------------------------------ #
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            trees = sorted(self._trees.values(), key=lambda t: -t.served)
+            spent = dict(self._spent)
+        return {
+            "enabled": Config.PREWARM_ENABLED,
+            "quota_share": Config.PREWARM_QUOTA_SHARE,
+            "explored": self.explored,
+            "stopped": self.stopped,
+            "served": self.served,
+            "last_skip": self.last_skip,
+            "calls_today": spent,
+            "demand": [
+                {"article": key, "score": round(score, 3), "title": data.get("title")}
+                for key, score, data in self.demand.ranked(Config.PREWARM_TOP_N)
+            ],
+            "trees": [
+                {
+                    "article": t.key,
+                    "title": t.article_data.get("title"),
+                    "age_seconds": round(t.age),
+                    "nodes": len(t.details),
+                    "served": t.served,
+                }
+                for t in trees
+            ],
+        }
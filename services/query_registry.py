@@ -0,0 +1,70 @@
+"""
+query_registry.py – the search queries one tree has already sent to Google.
+
+Gemini generates queries for every node independently, so siblings and
+cousins often ask for nearly the same thing.  Each query is reduced to its
+set of content words (lower-cased, stopwords and plural endings removed,
+order ignored); a query whose set matches – or overlaps an earlier one by at
+least ``QUERY_SIMILARITY_THRESHOLD`` (token Jaccard) – reuses that query's
+result list instead of spending another Custom Search call.  The engine then
+picks the next result not already in the tree from the reused list.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from config import Config
+from utils.extractive import STOPWORDS
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    terms = set()
+    for token in _TOKEN.findall(query.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 4 and token.endswith(("sses", "xes", "ches", "shes")):
+            token = token[:-2]
+        elif len(token) > 4 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        terms.add(token)
+    return frozenset(terms)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class QueryRegistry:
+    """Result lists of one search's queries, looked up by query similarity."""
+
+    def __init__(self, threshold: Optional[float] = None) -> None:
+        self.threshold = Config.QUERY_SIMILARITY_THRESHOLD if threshold is None else threshold
+        self._entries: List[Tuple[FrozenSet[str], str, List[Dict[str, Any]]]] = []
+        self.searched = 0
+        self.reused = 0
+
+    def lookup(self, query: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """``(earlier_query, results)`` for an equivalent earlier query, if any."""
+        terms = query_terms(query)
+        best, best_score = None, 0.0
+        for entry_terms, earlier, results in self._entries:
+            score = jaccard(terms, entry_terms)
+            if score > best_score:
+                best, best_score = (earlier, results), score
+        if best is None or best_score < self.threshold:
+            return None
+        self.reused += 1
+        return best
+
+    def record(self, query: str, results: List[Dict[str, Any]]) -> None:
+        self.searched += 1
+        self._entries.append((query_terms(query), query, results))
+
+    def get_status(self) -> Dict[str, int]:
+        return {"searched": self.searched, "reused": self.reused}
@@ -0,0 +1,319 @@
+"""
+quota_counters.py – call counts shared by every process of one deployment.
+
+``CredentialPool`` and the Gemini ``RateLimiter`` decide from how many calls
+were made in the last minute and today.  Counted per process, N search
+workers would each believe they had the whole quota, and the web process –
+which refuses new searches when the limiter is full – would never see the
+workers' calls.  The counts therefore live here, in the place every process
+of the deployment can reach (``create_quota_counters``):
+
+* ``LocalCounters`` – this process only; inline mode and tests.
+* ``SharedCounters`` – shared memory created by the web process and handed
+  to the local worker processes it spawns (``SEARCH_WORKERS>0``).  Minute
+  windows are kept in one-second buckets.
+* ``RedisCounters`` – Redis keys, for workers on any machine
+  (``SOCKETIO_MESSAGE_QUEUE``).  Two processes choosing a key at the same
+  moment may both take its last call; the upstream's own quota errors still
+  retire the key.
+
+Counters are addressed by name (``"gemini:<key hash>"``, ``"gemini:calls"``);
+API keys themselves are never stored.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import ContextManager, Deque, Dict, List, Optional
+
+from config import Config
+from utils.rate_limiter import RateLimiter
+
+try:
+    from zoneinfo import ZoneInfo
+
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:  # no tz database on this host
+    from datetime import timezone
+
+    _QUOTA_TZ = timezone.utc
+
+_WINDOW = 60  # seconds in the per-minute window
+_WINDOWS = ("", "minute", "day")  # retired_window, as stored in shared memory
+
+
+def quota_day(now: float) -> str:
+    """The Pacific-time date Google's daily quotas are counted against."""
+    return datetime.fromtimestamp(now, _QUOTA_TZ).date().isoformat()
+
+
+def next_quota_day(now: float) -> float:
+    today = datetime.fromtimestamp(now, _QUOTA_TZ)
+    midnight = (today + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+@dataclass
+class Usage:
+    """What one counter has seen."""
+
+    minute: int = 0  # calls in the last 60 seconds
+    oldest: float = 0.0  # time of the oldest of those calls
+    day: int = 0  # calls this quota day
+    total: int = 0
+    retired_until: float = 0.0
+    retired_window: str = ""
+
+
+def counter_name(prefix: str, secret: str) -> str:
+    """A stable counter name for *secret* (an API key) that does not reveal it."""
+    return f"{prefix}:{hashlib.sha256(secret.encode()).hexdigest()[:16]}"
+
+
+class LocalCounters:
+    """Counts kept in this process."""
+
+    def __init__(self) -> None:
+        self._minute: Dict[str, Deque[float]] = {}
+        self._usage: Dict[str, Usage] = {}
+        self._days: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def transaction(self) -> ContextManager:
+        # callers already serialise their own read-then-record under their lock
+        return contextlib.nullcontext()
+
+    def _roll(self, name: str, now: float) -> Usage:
+        usage = self._usage.setdefault(name, Usage())
+        calls = self._minute.setdefault(name, deque())
+        while calls and now - calls[0] >= _WINDOW:
+            calls.popleft()
+        usage.minute = len(calls)
+        usage.oldest = calls[0] if calls else 0.0
+        day = quota_day(now)
+        if self._days.get(name) != day:
+            self._days[name], usage.day = day, 0
+        return usage
+
+    def usage(self, names: List[str], now: float) -> List[Usage]:
+        with self._lock:
+            return [Usage(**vars(self._roll(name, now))) for name in names]
+
+    def record(self, name: str, now: float) -> None:
+        with self._lock:
+            usage = self._roll(name, now)
+            self._minute[name].append(now)
+            usage.day += 1
+            usage.total += 1
+
+    def retire(self, name: str, until: float, window: str) -> None:
+        with self._lock:
+            usage = self._usage.setdefault(name, Usage())
+            usage.retired_until = max(usage.retired_until, until)
+            usage.retired_window = window
+
+
+class SharedCounters:
+    """
+    Counts in shared memory, for the web process and the workers it spawns.
+    Must be handed to ``multiprocessing.Process`` as an argument.
+    """
+
+    def __init__(self, slots: int = 256) -> None:
+        # spawn, like ProcessSearchRunner: the arrays travel with the Process args
+        ctx = multiprocessing.get_context("spawn")
+        self.slots = slots
+        self._lock = ctx.RLock()
+        self._ids = ctx.RawArray("q", slots)  # 0 marks a free slot
+        self._bucket_seconds = ctx.RawArray("q", slots * _WINDOW)
+        self._bucket_calls = ctx.RawArray("i", slots * _WINDOW)
+        self._days = ctx.RawArray("i", slots)
+        self._day_calls = ctx.RawArray("i", slots)
+        self._totals = ctx.RawArray("q", slots)
+        self._retired_until = ctx.RawArray("d", slots)
+        self._retired_window = ctx.RawArray("b", slots)
+
+    def transaction(self) -> ContextManager:
+        """Hold across a read and the record it leads to, in every process."""
+        return self._lock
+
+    @staticmethod
+    def _id(name: str) -> int:
+        # not hash(): string hashes differ between processes
+        return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], "big") >> 1 or 1
+
+    def _slot(self, name: str) -> int:
+        wanted = self._id(name)
+        for slot in range(self.slots):
+            if self._ids[slot] == wanted:
+                return slot
+            if self._ids[slot] == 0:
+                self._ids[slot] = wanted
+                return slot
+        raise RuntimeError(f"All {self.slots} shared quota counters are in use")
+
+    def _read(self, slot: int, now: float, day: int) -> Usage:
+        second = int(now)
+        minute, oldest = 0, 0.0
+        for bucket in range(slot * _WINDOW, (slot + 1) * _WINDOW):
+            calls, at = self._bucket_calls[bucket], self._bucket_seconds[bucket]
+            if calls and at > second - _WINDOW:
+                minute += calls
+                oldest = at if not oldest else min(oldest, at)
+        window = _WINDOWS[self._retired_window[slot]]
+        return Usage(
+            minute=minute,
+            oldest=float(oldest),
+            day=self._day_calls[slot] if self._days[slot] == day else 0,
+            total=self._totals[slot],
+            retired_until=self._retired_until[slot],
+            retired_window=window,
+        )
+
+    @staticmethod
+    def _day_number(now: float) -> int:
+        return int(quota_day(now).replace("-", ""))
+
+    def usage(self, names: List[str], now: float) -> List[Usage]:
+        with self._lock:
+            number = self._day_number(now)
+            return [self._read(self._slot(name), now, number) for name in names]
+
+    def record(self, name: str, now: float) -> None:
+        with self._lock:
+            slot, second, number = self._slot(name), int(now), self._day_number(now)
+            bucket = slot * _WINDOW + second % _WINDOW
+            if self._bucket_seconds[bucket] != second:
+                self._bucket_seconds[bucket], self._bucket_calls[bucket] = second, 0
+            self._bucket_calls[bucket] += 1
+            if self._days[slot] != number:
+                self._days[slot], self._day_calls[slot] = number, 0
+            self._day_calls[slot] += 1
+            self._totals[slot] += 1
+
+    def retire(self, name: str, until: float, window: str) -> None:
+        with self._lock:
+            slot = self._slot(name)
+            self._retired_until[slot] = max(self._retired_until[slot], until)
+            self._retired_window[slot] = _WINDOWS.index(window)
+
+
+class RedisCounters:
+    """Counts in Redis, shared by web nodes and workers on any machine."""
+
+    _FIELDS = 5  # pipeline replies per counter in usage()
+
+    def __init__(self, client) -> None:
+        self._client = client
+        # minute-window members must be unique across processes
+        self._member_prefix = f"{os.getpid()}:{os.urandom(4).hex()}"
+        self._sequence = itertools.count()
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return f"origin-explorer:quota:{name}"
+
+    def transaction(self) -> ContextManager:
+        return contextlib.nullcontext()
+
+    def usage(self, names: List[str], now: float) -> List[Usage]:
+        day = quota_day(now)
+        pipe = self._client.pipeline()
+        for name in names:
+            key = self._key(name)
+            pipe.zremrangebyscore(f"{key}:minute", "-inf", now - _WINDOW)
+            pipe.zrange(f"{key}:minute", 0, -1, withscores=True)
+            pipe.get(f"{key}:day:{day}")
+            pipe.get(f"{key}:total")
+            pipe.hmget(f"{key}:retired", "until", "window")
+        replies = pipe.execute()
+
+        usages = []
+        for i in range(len(names)):
+            _, calls, day_calls, total, (until, window) = replies[i * self._FIELDS:(i + 1) * self._FIELDS]
+            usages.append(Usage(
+                minute=len(calls),
+                oldest=calls[0][1] if calls else 0.0,
+                day=int(day_calls or 0),
+                total=int(total or 0),
+                retired_until=float(until or 0),
+                retired_window=window.decode() if window else "",
+            ))
+        return usages
+
+    def record(self, name: str, now: float) -> None:
+        key, day = self._key(name), quota_day(now)
+        member = f"{self._member_prefix}:{next(self._sequence)}"
+        pipe = self._client.pipeline()
+        pipe.zadd(f"{key}:minute", {member: now})
+        pipe.expire(f"{key}:minute", _WINDOW * 2)
+        pipe.incr(f"{key}:day:{day}")
+        pipe.expire(f"{key}:day:{day}", 2 * 24 * 3600)
+        pipe.incr(f"{key}:total")
+        pipe.execute()
+
+    def retire(self, name: str, until: float, window: str) -> None:
+        key = f"{self._key(name)}:retired"
+        current = self._client.hget(key, "until")
+        until = max(until, float(current or 0))
+        pipe = self._client.pipeline()
+        pipe.hset(key, mapping={"until": until, "window": window})
+        pipe.expireat(key, int(until) + 1)
+        pipe.execute()
+
+
+class SharedRateLimiter(RateLimiter):
+    """``RateLimiter`` whose calls are counted in *counters*, by every process."""
+
+    def __init__(self, max_calls_per_minute: int, counters, name: str) -> None:
+        super().__init__(max_calls_per_minute)
+        self.counters = counters
+        self.name = name
+
+    def _usage(self) -> Usage:
+        return self.counters.usage([self.name], time.time())[0]
+
+    def can_make_call(self) -> bool:
+        return self._usage().minute < self.max_calls_per_minute
+
+    def record_call(self) -> None:
+        self.counters.record(self.name, time.time())
+
+    def wait_time(self) -> float:
+        return self._wait_time(self._usage())
+
+    @staticmethod
+    def _wait_time(usage: Usage) -> float:
+        if not usage.minute:
+            return 0
+        return max(0, _WINDOW - (time.time() - usage.oldest))
+
+    def get_status(self) -> dict:
+        usage = self._usage()
+        return {
+            'can_make_call': usage.minute < self.max_calls_per_minute,
+            'wait_time': self._wait_time(usage),
+            'recent_calls': usage.minute,
+            'max_calls_per_minute': self.max_calls_per_minute
+        }
+
+
+def create_quota_counters(workers: Optional[int] = None):
+    """The counters every process of this deployment can reach."""
+    if Config.SOCKETIO_MESSAGE_QUEUE:
+        # imported lazily: only Redis deployments need the client
+        from services.search_workers import redis_client
+
+        return RedisCounters(redis_client(Config.SOCKETIO_MESSAGE_QUEUE))
+    if (Config.SEARCH_WORKERS if workers is None else workers) > 0:
+        return SharedCounters()
+    return LocalCounters()
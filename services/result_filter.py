@@ -0,0 +1,150 @@
+"""
+result_filter.py – precompiled relevance filter for search results.
+
+Each term list is compiled once into a single regex (or suffix tuple), and
+excluded domains live in a set matched against every suffix of the result's
+host, so the cost per result stays flat as the blocklists grow.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Iterable, List, Optional, Pattern, Protocol, Sequence
+from urllib.parse import urlparse
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------------- #
+# Default rule set
+# --------------------------------------------------------------------------- #
+
+CONTENT_TERMS: List[str] = [
+    "article",
+    "blog",
+    "post",
+    "guide",
+    "tutorial",
+    "essay",
+    "story",
+    "origin",
+    "history",
+]
+EXCLUDED_DOMAINS: List[str] = [
+    "youtube.com",
+    "facebook.com",
+    "twitter.com",
+    "instagram.com",
+    "tiktok.com",
+    "pinterest.com",
+    "linkedin.com",
+]
+# file types we *still* want to reject (videos, slides, etc.)
+EXCLUDED_EXTENSIONS: List[str] = [
+    ".ppt",
+    ".pptx",
+    ".doc",
+    ".docx",
+    ".xls",
+    ".xlsx",
+    ".mp4",
+    ".avi",
+    ".mov",
+]
+MIME_HINTS: List[str] = ["video", "playlist", "watch", "login", "signup"]
+
+
+class _Filterable(Protocol):
+    title: str
+    snippet: str
+    url: str
+
+
+def _compile_terms(terms: Iterable[str]) -> Optional[Pattern[str]]:
+    """One alternation over *terms* (longest first), or ``None`` if empty."""
+    cleaned = sorted({t.lower() for t in terms if t}, key=len, reverse=True)
+    if not cleaned:
+        return None
+    return re.compile("|".join(map(re.escape, cleaned)))
+
+
+def _load_domain_file(path: str) -> List[str]:
+    """Read one domain per line, ignoring blanks and ``#`` comments."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return [line.split("#", 1)[0].strip() for line in fh if line.split("#", 1)[0].strip()]
+    except OSError as exc:
+        logger.warning("Could not read excluded domains from %s: %s", path, exc)
+        return []
+
+
+class ResultFilter:
+    """Decides which search results are worth turning into tree nodes."""
+
+    def __init__(
+        self,
+        content_terms: Sequence[str] = CONTENT_TERMS,
+        keywords: Sequence[str] = (),
+        excluded_domains: Iterable[str] = EXCLUDED_DOMAINS,
+        excluded_extensions: Sequence[str] = EXCLUDED_EXTENSIONS,
+        mime_hints: Sequence[str] = MIME_HINTS,
+    ) -> None:
+        self._content_re = _compile_terms(content_terms)
+        self._keyword_re = _compile_terms(keywords)
+        self._mime_re = _compile_terms(mime_hints)
+        self._extensions = tuple(ext.lower() for ext in excluded_extensions)
+        self._domains = frozenset(
+            d.lower().strip().lstrip(".").removeprefix("www.") for d in excluded_domains if d.strip()
+        )
+
+    @classmethod
+    def from_config(cls) -> "ResultFilter":
+        """Build the filter from the default rules plus ``Config`` overrides."""
+        domains = list(EXCLUDED_DOMAINS) + list(getattr(Config, "EXTRA_EXCLUDED_DOMAINS", []))
+        domains_file = getattr(Config, "EXCLUDED_DOMAINS_FILE", "")
+        if domains_file:
+            domains += _load_domain_file(domains_file)
+
+        return cls(
+            content_terms=getattr(Config, "RELEVANCE_CONTENT_TERMS", None) or CONTENT_TERMS,
+            keywords=getattr(Config, "SEARCH_KEYWORDS", []),
+            excluded_domains=domains,
+        )
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def is_relevant(self, result: _Filterable) -> bool:
+        blob = f"{result.title} {result.snippet} {result.url}".lower()
+        if self._content_re is not None and not self._content_re.search(blob):
+            return False
+        # no keywords configured means every result passes this check
+        if self._keyword_re is not None and not self._keyword_re.search(blob):
+            return False
+        return not self.is_blocked_url(result.url)
+
+    def filter(self, results: Iterable[_Filterable]) -> list:
+        """Return the relevant results of a whole page, preserving order."""
+        return [r for r in results if self.is_relevant(r)]
+
+    def is_blocked_url(self, url: str) -> bool:
+        """True for file downloads, video/login pages and excluded domains."""
+        lowered = url.lower()
+        if lowered.endswith(self._extensions):
+            return True
+        if self._mime_re is not None and self._mime_re.search(lowered):
+            return True
+        return self.is_excluded_domain(lowered)
+
+    def is_excluded_domain(self, url: str) -> bool:
+        """True if the URL's host or any parent domain is on the blocklist."""
+        try:
+            host = urlparse(url).hostname or ""
+        except ValueError:
+            return False
+
+        labels = host.split(".")
+        return any(".".join(labels[i:]) in self._domains for i in range(len(labels) - 1))
@@ -3,31 +3,131 @@ Recursive search engine for building article trees using Google Search
 """
 
 import logging
+import threading
 import time
 import random
-from typing import Dict, Optional, List
-
-from flask_socketio import rooms
+from typing import Any, Callable, Dict, Optional, List
 
 from config import Config
 from models.search_tree import SearchTreeNode
+from services.cost_ledger import ledger
 from services.google_search_api import GoogleSearchAPI
 from services.gemini_service import GeminiService
+from services.host_health import host_health
+from services.node_store import create_node_store
+from services.query_registry import QueryRegistry
+from services.session_emitter import SessionEmitter
+from utils.extractive import local_summary, select_sentences
+from utils.hedging import Hedger
+from utils.metrics import metrics, span, trace_context
+from utils.tokens import estimate_tokens, truncate_to_tokens
 
 logger = logging.getLogger(__name__)
 
 
+class SearchStopped(Exception):
+    """An exploration's ``should_stop`` asked it to give way (see ``explore``)."""
+
+
 class RecursiveSearchEngine:
     """Handles recursive article search with real-time tree updates using Google Search."""
 
     # ────────────────────────────────  init / public  ──────────────────────────────── #
 
-    def __init__(self, socketio_instance, gemini_service: GeminiService):
+    def __init__(
+        self,
+        socketio_instance,
+        gemini_service: GeminiService,
+        node_store=None,
+        google_search: Optional[GoogleSearchAPI] = None,
+    ):
         self.socketio = socketio_instance
+        # buffers and coalesces events so the search thread never waits on clients
+        self.emitter = SessionEmitter(socketio_instance)
         self.gemini_service = gemini_service
-        self.google_search = GoogleSearchAPI()
-        self.search_tree: Dict[str, SearchTreeNode] = {}
+        # shared with the routes when built by the service container
+        self.google_search = google_search or GoogleSearchAPI()
+        # node details are served on demand from here instead of riding along
+        # in every tree_update
+        self.node_store = node_store if node_store is not None else create_node_store()
+        # a fetch slower than the usual p90 races the next result of the same query
+        self._fetch_hedger = Hedger("article_fetch")
+        # every search runs on its own background task, so per-search state is
+        # kept thread-local and concurrent sessions never share a tree
+        self._local = threading.local()
+
+    @property
+    def search_tree(self) -> Dict[str, SearchTreeNode]:
+        """The tree of the search running on the current thread."""
+        return self._local.__dict__.setdefault("search_tree", {})
+
+    @search_tree.setter
+    def search_tree(self, tree: Dict[str, SearchTreeNode]) -> None:
+        self._local.search_tree = tree
+
+    @property
+    def article_content(self) -> Dict[str, str]:
+        """Fetched article text of the current thread's search, keyed by node ID."""
+        return self._local.__dict__.setdefault("article_content", {})
+
+    @article_content.setter
+    def article_content(self, content: Dict[str, str]) -> None:
+        self._local.article_content = content
+
+    @property
+    def stored_details(self) -> Dict[str, Dict]:
+        """Node details last written to the node store for the current search."""
+        return self._local.__dict__.setdefault("stored_details", {})
+
+    @stored_details.setter
+    def stored_details(self, details: Dict[str, Dict]) -> None:
+        self._local.stored_details = details
+
+    @property
+    def candidate_results(self) -> Dict[str, List[Dict[str, str]]]:
+        """Unused search results per node of the current search, for hedged fetches."""
+        return self._local.__dict__.setdefault("candidate_results", {})
+
+    @candidate_results.setter
+    def candidate_results(self, candidates: Dict[str, List[Dict[str, str]]]) -> None:
+        self._local.candidate_results = candidates
+
+    @property
+    def query_registry(self) -> QueryRegistry:
+        """Queries the current thread's search has sent, with their results."""
+        registry = self._local.__dict__.get("query_registry")
+        if registry is None:
+            registry = self._local.query_registry = QueryRegistry()
+        return registry
+
+    @query_registry.setter
+    def query_registry(self, registry: QueryRegistry) -> None:
+        self._local.query_registry = registry
+
+    def explore(
+        self,
+        initial_article_data: Dict,
+        session_id: str,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a search with no client attached (see ``services.prewarm``).
 
+        Returns ``{"events": [(event, data), ...], "details": {node_id: ...}}``:
+        what ``start_search`` would have emitted – only the last ``tree_update``
+        – and written to the node store.  *should_stop* is asked before every
+        step that calls an upstream; once it returns True the search ends
+        there, without ``search_complete``.
+        """
+        captured: Dict[str, Any] = {"events": [], "details": {}}
+        self._local.capture = captured
+        self._local.should_stop = should_stop
+        try:
+            self.start_search(initial_article_data, session_id)
+        finally:
+            self._local.capture = None
+            self._local.should_stop = None
+        return captured
 
     def start_search(self, initial_article_data: Dict, session_id: str) -> None:
         """Start recursive search and emit tree updates."""
@@ -40,90 +140,142 @@ class RecursiveSearchEngine:
             session_id,
         )
 
-        try:
-            self.search_tree = {}  # clear any previous tree
-            root_node = self._create_root_node(initial_article_data)
-            self.search_tree[root_node.id] = root_node
-
-            self._emit_search_started(article_title, session_id)
-            self._emit_tree_update(session_id)
+        with trace_context(session_id=session_id):
+            try:
+                self.search_tree = {}  # clear any previous tree
+                self.article_content = {}
+                self.stored_details = {}
+                self.query_registry = QueryRegistry()
+                self.candidate_results = {}
+                root_node = self._create_root_node(initial_article_data)
+                self.search_tree[root_node.id] = root_node
+
+                self._emit_search_started(article_title, session_id)
+                self._emit_tree_update(session_id)
 
-            # begin the recursion
-            self._recursive_search(root_node.id, 0, session_id)
+                # begin the recursion
+                self._recursive_search(root_node.id, 0, session_id)
 
-            self._emit_final_analysis(self._final_analysis(article_title), session_id)
+                self._check_stop()
+                self._emit_final_analysis(self._final_analysis(article_title), session_id)
 
-            self._emit_search_complete(session_id)
-            logger.info(
-                "Search completed for '%s' with %d nodes",
-                article_title,
-                len(self.search_tree),
-            )
+                self._emit_search_timings(session_id)
+                self._emit_search_complete(session_id)
+                logger.info(
+                    "Search completed for '%s' with %d nodes (%d queries searched, %d reused)",
+                    article_title,
+                    len(self.search_tree),
+                    self.query_registry.searched,
+                    self.query_registry.reused,
+                )
 
-        except Exception as e:
-            logger.error("Error in start_search: %s", e, exc_info=True)
-            self._emit_error(f"Search failed: {e}", session_id)
+            except SearchStopped:
+                logger.info("Stopped exploring '%s' early (session: %s)", article_title, session_id)
+            except Exception as e:
+                logger.error("Error in start_search: %s", e, exc_info=True)
+                self._emit_error(f"Search failed: {e}", session_id)
+            finally:
+                metrics.reset_search(session_id)
+                ledger.finish_search(
+                    session_id,
+                    title=article_title,
+                    nodes=len(self.search_tree),
+                    max_depth=Config.MAX_SEARCH_DEPTH,
+                    max_articles_per_level=Config.MAX_ARTICLES_PER_LEVEL,
+                    local_summaries=Config.LOCAL_SUMMARIES,
+                )
 
     # ────────────────────────────────  recursion  ──────────────────────────────── #
 
     def _recursive_search(self, node_id: str, depth: int, session_id: str) -> None:
         """Perform recursive search with real-time updates."""
-        try:
-            if depth >= Config.MAX_SEARCH_DEPTH:
-                logger.info("Reached max depth %d for node %s", depth, node_id)
-                return
-
-            current_node = self.search_tree[node_id]
-            logger.info("Processing node: '%s' at depth %d", current_node.title, depth)
-
-            self._delay_between_requests()
+        with trace_context(depth=depth, node_id=node_id):
+            try:
+                if depth >= Config.MAX_SEARCH_DEPTH:
+                    logger.info("Reached max depth %d for node %s", depth, node_id)
+                    return
 
-            article_content = self._fetch_article_content(current_node)
+                current_node = self.search_tree[node_id]
+                logger.info("Processing node: '%s' at depth %d", current_node.title, depth)
 
-            current_node.summary = self.gemini_service.summarize_article(article_content)
-            search_queries = self._get_related_search_queries(
-                current_node.title, article_content, current_node, session_id
-            )
+                self._delay_between_requests()
+                self._check_stop()
 
-            if not search_queries:
-                return
-
-            children_created = 0
-            for i, query in enumerate(search_queries[: Config.MAX_ARTICLES_PER_LEVEL]):
-                if self._process_query(
-                    current_node,
-                    query,
-                    i,
-                    len(search_queries),
-                    depth,
-                    session_id,
-                ):
-                    children_created += 1
+                article_content = self._node_content(current_node)
 
-            # mark current node status
-            if children_created > 0:
-                logger.info(
-                    "Successfully created %d child nodes for: %s",
-                    children_created,
-                    current_node.title,
+                # children are summarised in batches by their parent; only the
+                # root still needs a summary of its own here
+                if current_node.summary is None:
+                    current_node.summary = self._summarize(current_node, article_content)
+                self._check_stop()
+                search_queries = self._get_related_search_queries(
+                    current_node.title, article_content, current_node, session_id
                 )
-                current_node.set_completed()
-            else:
-                logger.warning("No child nodes created for: %s", current_node.title)
-                current_node.set_error("No related articles found")
-
-            self._emit_tree_update(session_id)
 
-        except Exception as e:
-            logger.error(
-                "Error in _recursive_search for node %s: %s", node_id, e, exc_info=True
-            )
-            if node_id in self.search_tree:
-                self.search_tree[node_id].set_error(str(e))
+                if not search_queries:
+                    return
+
+                children: List[SearchTreeNode] = []
+                for i, query in enumerate(search_queries[: Config.MAX_ARTICLES_PER_LEVEL]):
+                    self._check_stop()
+                    child = self._process_query(
+                        current_node,
+                        query,
+                        i,
+                        len(search_queries),
+                        session_id,
+                    )
+                    if child:
+                        children.append(child)
+
+                # leaves at the depth limit are never expanded, so they are
+                # neither fetched nor summarised
+                if depth < Config.MAX_SEARCH_DEPTH - 1:
+                    self._check_stop()
+                    self._summarize_children(children)
+
+                for child in children:
+                    # depth-first dive
+                    if depth < Config.MAX_SEARCH_DEPTH - 1:
+                        logger.info("Continuing recursive search for: '%s'", child.title)
+                        self._recursive_search(child.id, depth + 1, session_id)
+                    else:
+                        logger.info("Max depth reached, marking '%s' as completed", child.title)
+                        child.set_completed()
+                        self._emit_tree_update(session_id)
+
+                # mark current node status
+                if children:
+                    logger.info(
+                        "Successfully created %d child nodes for: %s",
+                        len(children),
+                        current_node.title,
+                    )
+                    current_node.set_completed()
+                else:
+                    logger.warning("No child nodes created for: %s", current_node.title)
+                    current_node.set_error("No related articles found")
+
+                self._synthesize_subtree(current_node)
                 self._emit_tree_update(session_id)
 
+            except SearchStopped:
+                raise
+            except Exception as e:
+                logger.error(
+                    "Error in _recursive_search for node %s: %s", node_id, e, exc_info=True
+                )
+                if node_id in self.search_tree:
+                    self.search_tree[node_id].set_error(str(e))
+                    self._emit_tree_update(session_id)
+
     # ────────────────────────────────  helpers (search)  ──────────────────────────────── #
 
+    def _check_stop(self) -> None:
+        should_stop = self._local.__dict__.get("should_stop")
+        if should_stop is not None and should_stop():
+            raise SearchStopped()
+
     def _delay_between_requests(self) -> None:
         delay = random.uniform(
             Config.MIN_DELAY_BETWEEN_REQUESTS, Config.MAX_DELAY_BETWEEN_REQUESTS
@@ -131,18 +283,84 @@ class RecursiveSearchEngine:
         logger.info("Waiting %.1f seconds to avoid rate limits...", delay)
         time.sleep(delay)
 
+    def _node_content(self, node: SearchTreeNode) -> str:
+        """Return the article text for *node*, fetching it at most once per search."""
+        if node.id not in self.article_content:
+            self.article_content[node.id] = self._fetch_article_content(node)
+        return self.article_content[node.id]
+
+    def _summarize_children(self, children: List[SearchTreeNode]) -> None:
+        """Summarise sibling nodes together in as few Gemini requests as possible."""
+        if not children:
+            return
+
+        articles = {child.id: self._node_content(child) for child in children}
+        if Config.LOCAL_SUMMARIES:
+            for child in children:
+                child.summary = self._summarize(child, articles[child.id])
+            return
+
+        try:
+            summaries = self.gemini_service.summarize_articles(articles)
+        except Exception as e:
+            logger.warning("Batched summarisation failed: %s", e)
+            return
+
+        for child in children:
+            child.summary = summaries.get(child.id)
+
+    def _summarize(self, node: SearchTreeNode, content: str) -> Optional[str]:
+        """Summary of one node: extracted locally in no-LLM mode, else by Gemini."""
+        if Config.LOCAL_SUMMARIES:
+            with span("local_summary"):
+                return local_summary(content, Config.LOCAL_SUMMARY_CHARS, title=node.title)
+        return self.gemini_service.summarize_article(content)
+
     def _fetch_article_content(self, node: SearchTreeNode) -> str:
         """Return the best available text snippet for *node*."""
         content = getattr(node, "snippet", "") or ""
         if getattr(node, "url", ""):
+            url = node.url
             try:
-                full = self.google_search.get_article_content(node.url)
+                (full, replacement), _ = self._fetch_hedger.run(
+                    lambda cancel: (self.google_search.get_article_content(url, cancel), None),
+                    lambda: self._backup_fetch(node),
+                )
+                if replacement is not None:
+                    logger.info("'%s' was slow; using '%s' instead", url, replacement["url"])
+                    self._adopt_result(node, replacement)
+                    content = node.snippet or ""
                 if full and len(full) > len(content):
-                    content = full[:1000]  # trim long bodies
+                    # the most informative sentences, not the page's first 1000
+                    # characters (often navigation or a cookie banner)
+                    with span("extractive_select"):
+                        content = select_sentences(
+                            full, Config.EXTRACT_CONTENT_CHARS, title=node.title
+                        )
             except Exception as e:
                 logger.warning("Could not fetch full content from %s: %s", node.url, e)
         return content
 
+    def _backup_fetch(self, node: SearchTreeNode):
+        """A hedge for *node*'s fetch: the next unused result of its query, if any."""
+        seen_urls = {n.url.lower() for n in self.search_tree.values() if getattr(n, "url", "")}
+        candidates = self.candidate_results.get(node.id, [])
+        while candidates:
+            result = candidates.pop(0)
+            if result["url"].lower() not in seen_urls:
+                url = result["url"]
+                return lambda cancel: (self.google_search.get_article_content(url, cancel), result)
+        return None
+
+    @staticmethod
+    def _adopt_result(node: SearchTreeNode, result: Dict[str, str]) -> None:
+        """Point *node* at another search result, keeping its ID and place in the tree."""
+        node.title = result["title"]
+        node.url = result["url"]
+        node.snippet = result["snippet"]
+        node.image = result["image"]
+        node.source = result["source"]
+
     def _get_related_search_queries(
         self,
         title: str,
@@ -166,39 +384,83 @@ class RecursiveSearchEngine:
             self._emit_tree_update(session_id)
             return []
 
+    @staticmethod
+    def _abstract_block(node: SearchTreeNode) -> str:
+        summary = getattr(node, "summary", "") or ""
+        return (
+            f"TITLE: {node.title}\n"
+            f"SOURCE: {getattr(node, 'source', 'Unknown')}\n"
+            f"SUMMARY: {summary}\n---"
+        )
+
+    def _synthesize_subtree(self, node: SearchTreeNode) -> None:
+        """
+        Merge *node*'s abstract with its children's syntheses into
+        ``node.synthesis``.
+
+        Called as soon as a subtree completes, so the closing analysis is
+        mostly precomputed.  While the merged text fits within
+        ``Config.SUBTREE_SYNTHESIS_TOKEN_BUDGET`` it is passed up verbatim;
+        beyond that Gemini condenses it, so every level stays bounded.
+        """
+        parts = [self._abstract_block(node)]
+        for child_id in node.children:
+            child = self.search_tree.get(child_id)
+            if child:
+                parts.append(child.synthesis or self._abstract_block(child))
+
+        merged = "\n".join(parts)
+        budget = Config.SUBTREE_SYNTHESIS_TOKEN_BUDGET
+        if estimate_tokens(merged) > budget:
+            try:
+                merged = self.gemini_service.synthesize_subtree(node.title, merged, budget)
+            except Exception as e:
+                logger.warning("Subtree synthesis failed for %s: %s", node.title, e)
+                merged = truncate_to_tokens(merged, budget)
+
+        node.synthesis = merged
+
     def _collect_abstract_blocks(self) -> tuple[str, str]:
         """
         Return two newline-joined blocks:
 
-        * leaf_block – only the abstracts of leaf nodes
-        * full_block – every node in the tree
+        * leaf_block – the abstracts of leaf nodes, as many as fit the budget
+        * full_block – the root's subtree synthesis (see ``_synthesize_subtree``)
 
-        Each block entry looks like:
+        Each abstract entry looks like:
 
             TITLE: ...
             SOURCE: ...
             SUMMARY: ...
             ---
 
-        The function never re-queries the network; it just reads `node.summary`.
+        Together the blocks stay within ``Config.FINAL_ANALYSIS_TOKEN_BUDGET``.
+        The function never re-queries the network, except to condense the root
+        subtree if the recursion did not get that far.
         """
-        leaf_lines: list[str] = []
-        full_lines: list[str] = []
+        budget = Config.FINAL_ANALYSIS_TOKEN_BUDGET
+        root = next((n for n in self.search_tree.values() if not n.parent_id), None)
+        if root is None:
+            return "", ""
 
-        for node in self.search_tree.values():
-            summary = getattr(node, "summary", "") or ""
-            blob = (
-                f"TITLE: {node.title}\n"
-                f"SOURCE: {getattr(node, 'source', 'Unknown')}\n"
-                f"SUMMARY: {summary}\n---"
-            )
-            full_lines.append(blob)
+        if root.synthesis is None:
+            self._synthesize_subtree(root)
+        full_block = truncate_to_tokens(root.synthesis or "", budget * 2 // 3)
 
+        leaf_lines: list[str] = []
+        remaining = budget - estimate_tokens(full_block)
+        for node in self.search_tree.values():
             # A leaf has no children or an empty list
-            if not getattr(node, "children", []):
-                leaf_lines.append(blob)
+            if getattr(node, "children", []):
+                continue
+            blob = self._abstract_block(node)
+            cost = estimate_tokens(blob)
+            if cost > remaining:
+                break
+            leaf_lines.append(blob)
+            remaining -= cost
 
-        return "\n".join(leaf_lines), "\n".join(full_lines)
+        return "\n".join(leaf_lines), full_block
 
     def _final_analysis(self, root_title):
         leaf_block, full_block = self._collect_abstract_blocks()
@@ -206,19 +468,51 @@ class RecursiveSearchEngine:
 
     def _find_unique_result(self, results: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
         """
-        Return the first search result whose URL does **not** already appear
+        Return the best search result whose URL does **not** already appear
         anywhere in the tree.  If every result is a duplicate, return ``None``.
         """
+        ranked = self._rank_unique_results(results)
+        return ranked[0] if ranked else None
+
+    def _rank_unique_results(self, results: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        The results whose URLs are not in the tree yet, best first.
+
+        Hosts whose circuit is open or whose cached robots.txt forbids the URL
+        come last, and hosts with recent failures rank below healthy ones.
+        """
         seen_urls = {
             n.url.lower()
             for n in self.search_tree.values()
             if getattr(n, "url", "")
         }
-        for res in results:
-            url = res.get("url", "").lower()
-            if url and url not in seen_urls:
-                return res
-        return None
+        unique = [
+            res for res in results
+            if res.get("url", "") and res["url"].lower() not in seen_urls
+        ]
+        healthy = sorted(
+            (
+                (host_health.penalty(res["url"]), rank, res)
+                for rank, res in enumerate(unique)
+                if host_health.is_available(res["url"])
+                and not host_health.robots_known_disallowed(res["url"])
+            ),
+            key=lambda item: item[:2],
+        )
+        ranked = [res for _, _, res in healthy]
+        return ranked + [res for res in unique if all(res is not r for r in ranked)]
+
+    def _search_results(self, query: str) -> List[Dict[str, str]]:
+        """Google results for *query*, reusing those of an equivalent earlier query."""
+        earlier = self.query_registry.lookup(query)
+        if earlier is not None:
+            logger.info("Query '%s' matches earlier query '%s' — reusing its results", query, earlier[0])
+            ledger.record("google_search", "search", cached=True)
+            return earlier[1]
+
+        results = self.google_search.search_articles(query, limit=10)
+        self.query_registry.record(query, results)
+        return results
 
     def _process_query(
         self,
@@ -226,54 +520,45 @@ class RecursiveSearchEngine:
         query: str,
         index: int,
         total: int,
-        depth: int,
         session_id: str,
-    ) -> bool:
-        """Handle one search query; returns True if a child node was created."""
-        logger.info("Searching Google for query %d/%d: '%s'", index + 1, total, query)
+    ) -> Optional[SearchTreeNode]:
+        """Handle one search query; returns the child node it created, if any."""
+        logger.info(
+            "Searching Google for query %d/%d: '%s'", index + 1, total, query,
+            extra={"event": "search_query"},
+        )
 
         try:
-            results = self.google_search.search_articles(query, limit=10)
+            results = self._search_results(query)
             if not results:
                 logger.warning("No search results found for query: '%s'", query)
-                return False
+                return None
 
-            best = self._find_unique_result(results)
-            if not best:
+            ranked = self._rank_unique_results(results)
+            if not ranked:
                 logger.info("All top results for '%s' were duplicates — skipping", query)
-                return False
+                return None
 
+            best = ranked[0]
             child = self._create_child_node(parent_node.id, best, query)
+            self.candidate_results[child.id] = ranked[1:]
 
             self.search_tree[child.id] = child
             parent_node.add_child(child.id)
 
             logger.info(
-                "Created child node: '%s' from '%s'",
-                best["title"],
-                best["source"],
+                "Created child node: '%s' from '%s' via '%s'",
+                best["title"], best["source"], query,
+                extra={"event": "child_node", "url": best["url"]},
             )
-            logger.info("URL: %s", best["url"])
-            logger.info("Found via query: '%s'", query)
 
             self._emit_tree_update(session_id)
-            if index < total - 1:
-                time.sleep(0.8)  # UX: stagger nodes in UI
-
-            # depth-first dive
-            if depth < Config.MAX_SEARCH_DEPTH - 1:
-                logger.info("Continuing recursive search for: '%s'", best["title"])
-                self._recursive_search(child.id, depth + 1, session_id)
-            else:
-                logger.info("Max depth reached, marking '%s' as completed", best["title"])
-                child.set_completed()
-                self._emit_tree_update(session_id)
 
-            return True
+            return child
 
         except Exception as e:
             logger.error("Error searching for query '%s': %s", query, e)
-            return False
+            return None
 
     # ────────────────────────────────  helpers (node / socket)  ──────────────────────────────── #
 
@@ -300,50 +585,86 @@ class RecursiveSearchEngine:
 
     # ────────────────────────────────  helpers (socket events)  ──────────────────────────────── #
 
+    def _emit(self, event: str, data, session_id: str) -> None:
+        capture = self._local.__dict__.get("capture")
+        if capture is None:
+            self.emitter.emit(event, data, session_id)
+            return
+        events = capture["events"]
+        if event == "tree_update":
+            events[:] = [e for e in events if e[0] != "tree_update"]
+        events.append((event, data))
+
     def _emit_search_started(self, article: str, session_id: str) -> None:
-        self.socketio.emit(
+        self._emit(
             "search_started",
             {
                 "article": article,
                 "ai_provider": "Google Gemini",
                 "session_id": session_id,
             },
-            room=session_id,
+            session_id,
         )
 
     def _emit_search_complete(self, session_id: str) -> None:
-        self.socketio.emit(
+        self._emit(
             "search_complete",
             {
                 "message": "Search completed successfully",
                 "total_nodes": len(self.search_tree),
+                "cost": ledger.search_totals(session_id),
                 "session_id": session_id,
             },
-            room=session_id,
+            session_id,
+        )
+
+    def _emit_search_timings(self, session_id: str) -> None:
+        if not Config.EMIT_SEARCH_TIMINGS:
+            return
+        self._emit(
+            "search_timings",
+            {"stages": metrics.search_breakdown(session_id), "session_id": session_id},
+            session_id,
         )
 
     def _emit_final_analysis(self, message: str, session_id: str) -> None:
-        self.socketio.emit(
+        self._emit(
             "History Analysis Completed",
                 {
                     "message": message, "session_id": session_id
                 },
-            room=session_id
+            session_id
             )
 
     def _emit_error(self, message: str, session_id: str) -> None:
-        self.socketio.emit("error", {"message": message, "session_id": session_id}, room=session_id)
+        self._emit("error", {"message": message, "session_id": session_id}, session_id)
 
     def _emit_tree_update(self, session_id: str) -> None:
-        tree_data = {nid: n.to_dict() for nid, n in self.search_tree.items()}
-        logger.info("Emitting tree update to %s: %d nodes", session_id, len(tree_data))
-
-        for node in tree_data.values():
-            logger.debug(
-                "  Node: %s | Status: %s | URL: %s",
-                node["title"],
-                node["status"],
-                node.get("url", "N/A"),
-            )
+        self._store_node_details(session_id)
 
-        self.socketio.emit("tree_update", tree_data, room=session_id)
+        tree_data = {nid: n.to_summary_dict() for nid, n in self.search_tree.items()}
+        logger.info(
+            "Emitting tree update to %s: %d nodes", session_id, len(tree_data),
+            extra={"event": "tree_update", "nodes": len(tree_data)},
+        )
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for node in tree_data.values():
+                logger.debug("  Node: %s | Status: %s", node["title"], node["status"])
+
+        self._emit("tree_update", tree_data, session_id)
+
+    def _store_node_details(self, session_id: str) -> None:
+        """Write the details of new or changed nodes before the client can ask for them."""
+        changed = {}
+        for nid, node in self.search_tree.items():
+            details = node.to_detail_dict()
+            if self.stored_details.get(nid) != details:
+                changed[nid] = details
+        if changed:
+            capture = self._local.__dict__.get("capture")
+            if capture is None:
+                self.node_store.put(session_id, changed)
+            else:
+                capture["details"].update(changed)
+            self.stored_details.update(changed)
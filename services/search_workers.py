@@ -0,0 +1,305 @@
+"""
+search_workers.py – where search jobs run and how their events reach clients.
+
+Three deployment modes, picked by ``create_search_runner`` from ``Config``:
+
+* inline (``SEARCH_WORKERS=0``, no message queue) – every search runs on a
+  background thread of the web process, as before.
+* local processes (``SEARCH_WORKERS>0``, no message queue) – the web process
+  spawns worker processes and hands them jobs over a multiprocessing queue;
+  workers send their Socket.IO events back over a second queue, which a relay
+  thread in the web process re-emits.  Uses every core on one machine and
+  needs nothing external, so it is also what tests and load runs use.
+* Redis (``SOCKETIO_MESSAGE_QUEUE=redis://…``) – jobs go onto a Redis list and
+  workers emit straight into the Socket.IO message queue, so web nodes and
+  workers scale independently across machines.  Start remote workers with
+  ``python -m services.search_workers``; ``SEARCH_WORKERS>0`` additionally
+  spawns that many next to the web process.
+
+Each worker process builds its own ``GeminiService`` / ``RecursiveSearchEngine``
+and runs ``SEARCH_WORKER_THREADS`` searches at a time.  Quota and rate-limit
+counts are shared (``services.quota_counters``): local workers use the web
+process's shared memory, Redis workers count in Redis.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from services.container import ServiceContainer
+from services.cost_ledger import ledger
+from services.quota_counters import RedisCounters
+from services.session_emitter import SessionEmitter
+from utils import payload_codec
+from utils.structured_logging import configure_logging
+
+logger = logging.getLogger(__name__)
+
+_STOP = None  # sentinel on the local job queue
+_NODE_DETAILS = "__node_details__"  # internal event: details for the web node's store
+
+
+class QueueEmitter:
+    """
+    ``socketio.emit`` look-alike for worker processes without a message queue:
+    events are shipped to the web process, which emits them for real.
+    """
+
+    def __init__(self, events: "multiprocessing.Queue") -> None:
+        self._events = events
+
+    def emit(self, event: str, data: Any = None, room: Optional[str] = None, **_: Any) -> None:
+        self._events.put((event, data, room))
+
+
+class QueueNodeStore:
+    """Node store for local workers: details go to the web process's store."""
+
+    def __init__(self, events: "multiprocessing.Queue") -> None:
+        self._events = events
+
+    def put(self, session_id: str, details: Dict[str, Dict[str, Any]]) -> None:
+        self._events.put((_NODE_DETAILS, details, session_id))
+
+
+# --------------------------------------------------------------------------- #
+# Worker side
+# --------------------------------------------------------------------------- #
+
+
+def _build_engine(emitter, node_store=None, quota_counters=None):
+    services = ServiceContainer(emitter, node_store=node_store, quota_counters=quota_counters)
+    services.warm_up()  # a worker exists to search; pay the start-up cost now
+    return services.search_engine
+
+
+def _run_job(engine, emitter, job: Dict[str, Any]) -> None:
+    session_id = job["session_id"]
+    if "encoding" in job:
+        # a worker on another machine emits the tree frames itself
+        payload_codec.set_encoding(session_id, job["encoding"])
+    try:
+        engine.start_search(job["article_data"], session_id)
+    except Exception as e:
+        logger.error(f"Search engine error: {e}", exc_info=True)
+        emitter.emit('error', {
+            'message': f'Search engine error: {str(e)}',
+            'session_id': session_id
+        }, room=session_id)
+
+
+def _configure_worker_logging() -> None:
+    configure_logging(worker=True)
+
+
+def _exit_with_parent() -> None:
+    """Stop a spawned worker once the web process is gone, however it died."""
+    parent = multiprocessing.parent_process()
+    if parent is None:
+        return
+
+    def watch() -> None:
+        parent.join()
+        os._exit(0)
+
+    threading.Thread(target=watch, name="parent-watchdog", daemon=True).start()
+
+
+def _local_worker_main(
+    jobs: "multiprocessing.Queue", events: "multiprocessing.Queue", quota_counters=None
+) -> None:
+    """Entry point of a worker spawned by ``ProcessSearchRunner``."""
+    _configure_worker_logging()
+    _exit_with_parent()
+    emitter = QueueEmitter(events)
+    engine = _build_engine(emitter, QueueNodeStore(events), quota_counters)
+
+    def consume() -> None:
+        while True:
+            job = jobs.get()
+            if job is _STOP:
+                return
+            _run_job(engine, emitter, job)
+
+    threads = [threading.Thread(target=consume, daemon=True) for _ in range(Config.SEARCH_WORKER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def redis_client(url: str):
+    try:
+        import redis
+    except ModuleNotFoundError as exc:
+        raise RuntimeError("SOCKETIO_MESSAGE_QUEUE points at Redis but the 'redis' package is not installed") from exc
+    return redis.Redis.from_url(url)
+
+
+def redis_worker_main(url: str = "", threads: int = 0) -> None:
+    """Consume jobs from the Redis list and emit through the Socket.IO message queue."""
+    from flask_socketio import SocketIO
+
+    url = url or Config.SOCKETIO_MESSAGE_QUEUE
+    threads = threads or Config.SEARCH_WORKER_THREADS
+    _configure_worker_logging()
+    _exit_with_parent()
+
+    client = redis_client(url)
+    emitter = SocketIO(message_queue=url)  # write-only emitter, no Flask app needed
+    engine = _build_engine(emitter, quota_counters=RedisCounters(client))
+
+    def consume() -> None:
+        while True:
+            _, raw = client.brpop(Config.SEARCH_JOB_QUEUE_KEY)
+            _run_job(engine, emitter, json.loads(raw))
+
+    logger.info(f"Search worker consuming {Config.SEARCH_JOB_QUEUE_KEY} with {threads} threads")
+    workers = [threading.Thread(target=consume, daemon=True) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+# --------------------------------------------------------------------------- #
+# Web side
+# --------------------------------------------------------------------------- #
+
+
+class InlineSearchRunner:
+    """Runs each search on a background task of the web process."""
+
+    def __init__(self, socketio, services: ServiceContainer) -> None:
+        self.socketio = socketio
+        self.services = services
+
+    def submit(self, article_data: Dict[str, Any], session_id: str, encoding: str = "json") -> None:
+        self.socketio.start_background_task(
+            _run_job, self.services.search_engine, self.socketio,
+            {"article_data": article_data, "session_id": session_id},
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        return {"mode": "inline"}
+
+
+class ProcessSearchRunner:
+    """Hands searches to local worker processes and relays their events."""
+
+    def __init__(self, socketio, workers: int, node_store, quota_counters=None) -> None:
+        self.socketio = socketio
+        self.node_store = node_store
+        # re-buffered here, where the client connections and their backlogs live
+        self.emitter = SessionEmitter(socketio)
+        # spawn, not fork: the web process already runs server threads
+        ctx = multiprocessing.get_context("spawn")
+        self._jobs = ctx.Queue()
+        self._events = ctx.Queue()
+        self._processes: List[multiprocessing.Process] = [
+            ctx.Process(
+                target=_local_worker_main,
+                args=(self._jobs, self._events, quota_counters),
+                name=f"search-worker-{i}",
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for process in self._processes:
+            process.start()
+        socketio.start_background_task(self._relay_events)
+        logger.info(f"Started {workers} local search worker processes")
+
+    def submit(self, article_data: Dict[str, Any], session_id: str, encoding: str = "json") -> None:
+        # tree frames are encoded by this process's emitter, which already knows the encoding
+        self._jobs.put({"article_data": article_data, "session_id": session_id})
+
+    def _relay_events(self) -> None:
+        # the only relay thread: one bad event must not cut every session off
+        while True:
+            try:
+                event, data, room = self._events.get()
+            except (EOFError, OSError):
+                return  # the queue was closed: this process is exiting
+            try:
+                self._relay(event, data, room)
+            except Exception as e:
+                logger.error(f"Could not relay '{event}' to {room}: {e}", exc_info=True)
+
+    def _relay(self, event: str, data: Any, room: Optional[str]) -> None:
+        if event == _NODE_DETAILS:
+            # stored before the tree_update that follows it is emitted
+            self.node_store.put(room, data)
+        else:
+            if event == "search_complete":
+                # the worker's calls count towards this process's daily burn
+                ledger.merge_search(room, data.get("cost") or {})
+            self.emitter.emit(event, data, room)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "mode": "processes",
+            "workers": len(self._processes),
+            "alive": sum(p.is_alive() for p in self._processes),
+        }
+
+
+class RedisSearchRunner:
+    """Pushes searches onto a Redis list for workers on any machine."""
+
+    def __init__(self, url: str, local_workers: int = 0) -> None:
+        self._client = redis_client(url)
+        self._processes: List[multiprocessing.Process] = []
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(local_workers):
+            process = ctx.Process(
+                target=redis_worker_main, args=(url,), name=f"search-worker-{i}", daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def submit(self, article_data: Dict[str, Any], session_id: str, encoding: str = "json") -> None:
+        self._client.lpush(
+            Config.SEARCH_JOB_QUEUE_KEY,
+            json.dumps({"article_data": article_data, "session_id": session_id, "encoding": encoding}),
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "mode": "redis",
+            "queued": self._client.llen(Config.SEARCH_JOB_QUEUE_KEY),
+            "local_workers": len(self._processes),
+        }
+
+
+def create_search_runner(socketio, services: ServiceContainer):
+    """Pick the runner for the configured deployment mode."""
+    if Config.SOCKETIO_MESSAGE_QUEUE:
+        return RedisSearchRunner(Config.SOCKETIO_MESSAGE_QUEUE, Config.SEARCH_WORKERS)
+    if Config.SEARCH_WORKERS > 0:
+        return ProcessSearchRunner(
+            socketio, Config.SEARCH_WORKERS, services.node_store, services.quota_counters
+        )
+    return InlineSearchRunner(socketio, services)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a search worker against the Redis job queue.")
+    parser.add_argument("--message-queue", default=Config.SOCKETIO_MESSAGE_QUEUE)
+    parser.add_argument("--threads", type=int, default=Config.SEARCH_WORKER_THREADS)
+    args = parser.parse_args()
+
+    if not args.message_queue:
+        parser.error("set SOCKETIO_MESSAGE_QUEUE or pass --message-queue redis://...")
+    redis_worker_main(args.message_queue, args.threads)
+
+
+if __name__ == "__main__":
+    main()
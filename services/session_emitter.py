@@ -0,0 +1,154 @@
+"""
+session_emitter.py – buffered, coalescing Socket.IO emitter.
+
+The search thread hands events to ``SessionEmitter.emit`` and carries on; a
+single flusher thread delivers them.  Per session it keeps one pending buffer
+in which a newer snapshot event (``tree_update``) replaces any older one still
+waiting, in its place, so a burst of node changes goes out as one frame per
+``EMIT_INTERVAL``.  Other events are delivered in order on the next tick.
+Tree frames are encoded only when they go out, as msgpack for clients that
+asked for it (see ``utils.payload_codec``).
+
+Snapshot frames are held back while a client's outgoing Engine.IO queue is
+longer than ``EMIT_MAX_CLIENT_BACKLOG`` – a slow client gets fewer, fresher
+trees instead of an ever-growing backlog – and nothing here ever blocks the
+producer.  Events queued after a held snapshot are held with it, so a slow
+client never sees ``search_complete`` before the last tree.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from utils import payload_codec
+from utils.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# events whose payload is a full state snapshot, so only the newest one matters
+SNAPSHOT_EVENTS = frozenset({"tree_update"})
+
+
+class SessionEmitter:
+    """Wraps a ``socketio`` (or look-alike) with per-session send buffers."""
+
+    def __init__(
+        self,
+        socketio,
+        interval: Optional[float] = None,
+        max_client_backlog: Optional[int] = None,
+    ) -> None:
+        self.socketio = socketio
+        self.interval = Config.EMIT_INTERVAL if interval is None else interval
+        self.max_client_backlog = (
+            Config.EMIT_MAX_CLIENT_BACKLOG if max_client_backlog is None else max_client_backlog
+        )
+        self._pending: Dict[str, List[Tuple[str, Any]]] = {}
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._sending = False
+        self.superseded = 0
+        self.deferred = 0
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+    # ------------------------------------------------------------------ #
+
+    def emit(self, event: str, data: Any, room: str) -> None:
+        """Queue *event* for *room*; returns immediately."""
+        with self._cond:
+            buffer = self._pending.setdefault(room, [])
+            if event in SNAPSHOT_EVENTS:
+                for i, item in enumerate(buffer):
+                    if item[0] == event:
+                        # keep its place so it still goes out before later events
+                        buffer[i] = (event, data)
+                        self.superseded += 1
+                        break
+                else:
+                    buffer.append((event, data))
+            else:
+                buffer.append((event, data))
+            self._ensure_flusher()
+            self._cond.notify()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every buffered event has been handed to Socket.IO."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._sending, timeout)
+
+    # ------------------------------------------------------------------ #
+    # Flusher
+    # ------------------------------------------------------------------ #
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run, name="session-emitter", daemon=True)
+            self._flusher.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batches = self._take_ready()
+                self._sending = True
+
+            for room, events in batches:
+                for event, data in events:
+                    try:
+                        with span("socket_emit"):
+                            self.socketio.emit(event, payload_codec.encode(event, data, room), room=room)
+                    except Exception as e:
+                        logger.warning("Failed to emit '%s' to %s: %s", event, room, e)
+
+            with self._cond:
+                self._sending = False
+                self._cond.notify_all()  # wakes flush()
+
+            # one frame per session per interval; new events wait for the next tick
+            time.sleep(self.interval)
+
+    def _take_ready(self) -> List[Tuple[str, List[Tuple[str, Any]]]]:
+        """Pop what can be sent now; a backlogged client gets events up to its first snapshot."""
+        batches = []
+        for room in list(self._pending):
+            buffer = self._pending[room]
+            first_snapshot = next(
+                (i for i, item in enumerate(buffer) if item[0] in SNAPSHOT_EVENTS), None
+            )
+            if first_snapshot is not None and self._client_backlog(room) > self.max_client_backlog:
+                ready, held = buffer[:first_snapshot], buffer[first_snapshot:]
+                self.deferred += 1
+            else:
+                ready, held = buffer, []
+
+            if held:
+                self._pending[room] = held
+            else:
+                del self._pending[room]
+            if ready:
+                batches.append((room, ready))
+        return batches
+
+    def _client_backlog(self, room: str) -> int:
+        """Packets queued for *room*'s connection, or 0 if it is not local."""
+        server = getattr(self.socketio, "server", None)
+        try:
+            eio_sid = server.manager.eio_sid_from_sid(room, "/")
+            socket = server.eio.sockets.get(eio_sid)
+            return socket.queue.qsize() if socket is not None else 0
+        except Exception:
+            # message-queue emitters and worker relays have no sockets to inspect
+            return 0
+
+    def get_status(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "pending_sessions": len(self._pending),
+                "superseded_frames": self.superseded,
+                "deferred_frames": self.deferred,
+            }
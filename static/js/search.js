@@ -3,6 +3,9 @@
  * Handles Google Custom Search integration with improved UI state management
  */
 
+const SEARCH_HISTORY_KEY = "articleExplorer.searchHistory"
+const SEARCH_HISTORY_SIZE = 50
+
 class ArticleSearcher {
   constructor() {
     this.searchInput = document.getElementById("search-input")
@@ -12,10 +15,14 @@ class ArticleSearcher {
     this.resultsGrid = document.getElementById("results-grid")
     this.errorContainer = document.getElementById("error-container")
     this.errorMessage = document.getElementById("error-message")
+    this.suggestionList = document.getElementById("search-suggestion-list")
 
     this.currentQuery = ""
     this.isSearching = false
     this.hasSearched = false
+    this.suggestTimer = null
+    this.nextCursor = null
+    this.resultCount = 0
 
     this.init()
   }
@@ -117,9 +124,10 @@ class ArticleSearcher {
         }
       })
 
-      // Input change for real-time validation
+      // Input change for real-time validation and type-ahead
       this.searchInput.addEventListener("input", () => {
         this.validateInput()
+        this.scheduleSuggestions()
       })
 
       // Focus and blur events
@@ -192,42 +200,177 @@ class ArticleSearcher {
     console.log("🔍 Performing search for:", query)
 
     this.currentQuery = query
+    this.rememberSearch(query)
     this.isSearching = true
     this.hasSearched = true
+    this.nextCursor = null
+    this.resultCount = 0
+    this.updateLoadMoreButton()
     this.showLoading()
 
     try {
-      const response = await fetch("/api/search", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          query: query,
-          limit: 10,
-        }),
-      })
+      const total = await this.streamSearch(query)
 
+      if (total === 0) {
+        this.showError("No articles found. Try a different search term.")
+      }
+    } catch (error) {
+      console.error("Search error:", error)
+      this.showError(error.message || "Search failed. Please try again.")
+    } finally {
+      this.isSearching = false
+      this.validateInput()
+    }
+  }
+
+  async streamSearch(query, cursor = null) {
+    // Results arrive as NDJSON: the page of results as soon as it is
+    // available, then a "done" line carrying the cursor for the next page.
+    const response = await fetch("/api/search/stream", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        query: query,
+        limit: 10,
+        cursor: cursor,
+      }),
+    })
+
+    if (!response.ok) {
       const data = await response.json()
+      throw new Error(data.error || "Search failed")
+    }
 
-      if (!response.ok) {
-        throw new Error(data.error || "Search failed")
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ""
+    let total = 0
+
+    const handleLine = (line) => {
+      if (!line.trim()) return
+      const message = JSON.parse(line)
+
+      if (message.error) {
+        throw new Error(message.error)
+      }
+      if (message.done) {
+        this.nextCursor = message.next_cursor
+        this.updateLoadMoreButton()
+        return
+      }
+      if (!message.results || message.results.length === 0) {
+        return
       }
 
-      if (data.success && data.results && data.results.length > 0) {
-        this.showResults(data.results, query, data.using_mock_data)
+      if (this.resultCount === 0) {
+        this.showResults(message.results, query)
       } else {
-        this.showError("No articles found. Try a different search term.")
+        this.appendResults(message.results, this.resultCount)
       }
+      total += message.results.length
+      this.resultCount += message.results.length
+    }
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split("\n")
+      buffer = lines.pop()
+      lines.forEach(handleLine)
+    }
+    handleLine(buffer)
+
+    return total
+  }
+
+  async loadMore() {
+    if (!this.nextCursor || this.isSearching) return
+
+    this.isSearching = true
+    const cursor = this.nextCursor
+    this.nextCursor = null
+    this.updateLoadMoreButton()
+
+    try {
+      await this.streamSearch(this.currentQuery, cursor)
     } catch (error) {
-      console.error("Search error:", error)
-      this.showError(error.message || "Search failed. Please try again.")
+      console.error("Load more error:", error)
+      this.nextCursor = cursor
+      this.updateLoadMoreButton()
     } finally {
       this.isSearching = false
       this.validateInput()
     }
   }
 
+  updateLoadMoreButton() {
+    if (!this.resultsContainer) return
+
+    let button = this.resultsContainer.querySelector(".results__load-more")
+    if (!this.nextCursor) {
+      if (button) button.remove()
+      return
+    }
+
+    if (!button) {
+      button = document.createElement("button")
+      button.type = "button"
+      button.className = "btn btn--secondary results__load-more"
+      button.textContent = "Load more results"
+      button.addEventListener("click", (e) => {
+        e.preventDefault()
+        this.loadMore()
+      })
+      this.resultsContainer.appendChild(button)
+    }
+  }
+
+  scheduleSuggestions() {
+    if (!this.suggestionList) return
+
+    clearTimeout(this.suggestTimer)
+    this.suggestTimer = setTimeout(() => this.loadSuggestions(), 150)
+  }
+
+  loadSuggestions() {
+    // Type-ahead comes from this browser's own past searches; other visitors'
+    // queries are never sent to it.
+    const prefix = this.searchInput.value.trim().toLowerCase()
+    this.suggestionList.innerHTML = ""
+    if (prefix.length < 2) return
+
+    this.searchHistory()
+      .filter((query) => query.toLowerCase().startsWith(prefix))
+      .slice(0, 8)
+      .forEach((query) => {
+        const option = document.createElement("option")
+        option.value = query
+        this.suggestionList.appendChild(option)
+      })
+  }
+
+  searchHistory() {
+    try {
+      return JSON.parse(localStorage.getItem(SEARCH_HISTORY_KEY)) || []
+    } catch (error) {
+      return []
+    }
+  }
+
+  rememberSearch(query) {
+    const history = this.searchHistory().filter((q) => q.toLowerCase() !== query.toLowerCase())
+    history.unshift(query)
+    try {
+      localStorage.setItem(SEARCH_HISTORY_KEY, JSON.stringify(history.slice(0, SEARCH_HISTORY_SIZE)))
+    } catch (error) {
+      console.log("Could not save search history:", error)
+    }
+  }
+
   showLoading() {
     this.hideAllSections()
 
@@ -310,6 +453,14 @@ class ArticleSearcher {
     })
   }
 
+  appendResults(results, offset) {
+    if (!this.resultsGrid) return
+
+    results.forEach((result, index) => {
+      this.resultsGrid.appendChild(this.createResultCard(result, offset + index))
+    })
+  }
+
   createResultCard(result, index) {
     const card = document.createElement("div")
     card.className = "result-card"
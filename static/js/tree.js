@@ -5,6 +5,19 @@
 
 // Import Socket.IO from CDN
 const io = window.io
+// Optional MessagePack decoder from CDN; without it tree updates stay JSON
+const MessagePack = window.MessagePack
+
+/**
+ * Tree updates arrive as msgpack bytes (an ArrayBuffer) when the search was
+ * started with encoding "msgpack", and as a plain object otherwise.
+ */
+function decodeTreePayload(payload) {
+  if (payload instanceof ArrayBuffer || ArrayBuffer.isView(payload)) {
+    return MessagePack.decode(payload instanceof ArrayBuffer ? new Uint8Array(payload) : payload)
+  }
+  return payload
+}
 
 class TreeVisualizer {
   constructor(articleData) {
@@ -15,6 +28,13 @@ class TreeVisualizer {
     this.isSearching = false
     this.rateLimitTimer = null
     this.finalAnalysis = null
+    this.searchTimings = null
+    this.searchSessionId = null
+
+    // Rendered node elements and lazily loaded node details, keyed by node ID
+    this.nodeElements = new Map()
+    this.nodeDetails = new Map()
+    this.treeContainer = null
 
     // Get DOM elements
     this.treeVisualization = document.getElementById("tree-visualization")
@@ -107,11 +127,15 @@ class TreeVisualizer {
         console.log("🔍 Search started:", data)
         this.updateStatus("searching", `${data.ai_provider || "Gemini"} is finding related websites...`)
         // Clear any previous final analysis
+        this.searchSessionId = data.session_id
         this.finalAnalysis = null
+        this.searchTimings = null
+        this.nodeDetails.clear()
         this.renderTree()
       })
 
-      this.socket.on("tree_update", (treeData) => {
+      this.socket.on("tree_update", (payload) => {
+        const treeData = decodeTreePayload(payload)
         console.log("📊 Tree update received:", treeData)
         this.treeData = treeData
         this.renderTree()
@@ -135,6 +159,13 @@ class TreeVisualizer {
         )
       })
 
+      this.socket.on("search_timings", (data) => {
+        console.log("⏱️ Search timings received:", data)
+        this.searchTimings = data.stages
+        console.table(this.searchTimings)
+        this.renderTree()
+      })
+
       // NEW: Handle final analysis
       this.socket.on("History Analysis Completed", (data) => {
         console.log("🧠 Final analysis received:", data)
@@ -255,11 +286,13 @@ class TreeVisualizer {
     // Clear previous tree data and analysis
     this.treeData = {}
     this.finalAnalysis = null
+    this.searchTimings = null
     this.renderTree()
 
     // Emit start search event
     const searchData = {
       article_data: this.articleData,
+      encoding: MessagePack ? "msgpack" : "json",
     }
 
     console.log("📡 Emitting start_search event with data:", searchData)
@@ -336,40 +369,42 @@ class TreeVisualizer {
       return
     }
 
-    if (Object.keys(this.treeData).length === 0) {
+    const nodes = Object.values(this.treeData)
+    if (nodes.length === 0) {
       this.showPlaceholder()
       return
     }
 
-    console.log("🌳 Rendering tree with", Object.keys(this.treeData).length, "nodes")
-
     // Find root node
-    const rootNode = Object.values(this.treeData).find((node) => !node.parent_id)
+    const rootNode = nodes.find((node) => !node.parent_id)
     if (!rootNode) {
       console.log("❌ No root node found in tree data")
       return
     }
 
-    console.log("🌱 Root node:", rootNode.title)
-
-    // Clear visualization
-    this.treeVisualization.innerHTML = ""
-
-    // Create tree container
-    const treeContainer = document.createElement("div")
-    treeContainer.className = "tree-container-inner"
-
-    // Add final analysis section FIRST if available
-    if (this.finalAnalysis) {
-      const analysisSection = this.createAnalysisSection()
-      treeContainer.appendChild(analysisSection)
-    }
-
-    // Then render tree
-    const treeElement = this.createTreeElement(rootNode, true)
-    treeContainer.appendChild(treeElement)
+    this.ensureTreeContainer()
+    this.renderSections()
+
+    // Keyed reconciliation: only new or changed nodes touch the DOM.
+    // Nodes arrive in creation order, so a parent is always placed before its children.
+    const seen = new Set()
+    nodes.forEach((node) => {
+      seen.add(node.id)
+      const entry = this.nodeElements.get(node.id)
+      if (!entry) {
+        this.insertNodeElement(node, node.id === rootNode.id)
+      } else if (entry.status !== node.status || entry.title !== node.title) {
+        this.updateNodeElement(entry, node)
+      }
+    })
 
-    this.treeVisualization.appendChild(treeContainer)
+    this.nodeElements.forEach((entry, nodeId) => {
+      if (!seen.has(nodeId)) {
+        entry.element.remove()
+        this.nodeElements.delete(nodeId)
+        this.nodeDetails.delete(nodeId)
+      }
+    })
 
     // Update search status
     if (this.isSearchComplete()) {
@@ -389,6 +424,37 @@ class TreeVisualizer {
     }
   }
 
+  ensureTreeContainer() {
+    if (this.treeContainer && this.treeVisualization.contains(this.treeContainer)) return
+
+    this.treeVisualization.innerHTML = ""
+    this.nodeElements.clear()
+    this.renderedAnalysis = null
+    this.renderedTimings = null
+
+    this.treeContainer = document.createElement("div")
+    this.treeContainer.className = "tree-container-inner"
+    this.sectionsElement = document.createElement("div")
+    this.treeRootElement = document.createElement("div")
+    this.treeContainer.append(this.sectionsElement, this.treeRootElement)
+    this.treeVisualization.appendChild(this.treeContainer)
+  }
+
+  renderSections() {
+    if (this.finalAnalysis === this.renderedAnalysis && this.searchTimings === this.renderedTimings) return
+
+    this.sectionsElement.innerHTML = ""
+    // Final analysis goes FIRST if available
+    if (this.finalAnalysis) {
+      this.sectionsElement.appendChild(this.createAnalysisSection())
+    }
+    if (this.searchTimings) {
+      this.sectionsElement.appendChild(this.createTimingsSection())
+    }
+    this.renderedAnalysis = this.finalAnalysis
+    this.renderedTimings = this.searchTimings
+  }
+
   createAnalysisSection() {
     const section = document.createElement("div")
     section.className = "final-analysis-section"
@@ -419,6 +485,33 @@ class TreeVisualizer {
     return section
   }
 
+  createTimingsSection() {
+    const section = document.createElement("details")
+    section.className = "search-timings"
+
+    const rows = Object.entries(this.searchTimings)
+      .sort(([, a], [, b]) => b.total_seconds - a.total_seconds)
+      .map(
+        ([stage, timing]) => `
+          <tr>
+            <td>${this.escapeHtml(stage)}</td>
+            <td>${timing.count}</td>
+            <td>${timing.total_seconds.toFixed(2)}s</td>
+          </tr>`,
+      )
+      .join("")
+
+    section.innerHTML = `
+      <summary class="search-timings__title">⏱️ Where this search spent its time</summary>
+      <table class="search-timings__table">
+        <thead><tr><th>Stage</th><th>Calls</th><th>Total</th></tr></thead>
+        <tbody>${rows}</tbody>
+      </table>
+    `
+
+    return section
+  }
+
   formatAnalysisText(text) {
     if (!text) return ""
 
@@ -439,6 +532,10 @@ class TreeVisualizer {
   showPlaceholder() {
     if (!this.treeVisualization) return
 
+    this.treeContainer = null
+    this.nodeElements.clear()
+    this.nodeDetails.clear()
+
     this.treeVisualization.innerHTML = `
       <div class="tree-placeholder">
         <div class="tree-placeholder__icon">🌳</div>
@@ -478,14 +575,53 @@ class TreeVisualizer {
     `
   }
 
-  createTreeElement(node, isRoot = false) {
+  insertNodeElement(node, isRoot = false) {
     const nodeElement = document.createElement("div")
-    nodeElement.className = `tree-node tree-node--${node.status}`
-    if (isRoot) nodeElement.classList.add("tree-node--root")
+    nodeElement.dataset.nodeId = node.id
 
-    // Create node content
     const contentElement = document.createElement("div")
     contentElement.className = "tree-node__content"
+    const headerElement = document.createElement("div")
+    const detailsElement = document.createElement("div")
+    detailsElement.className = "tree-node__details"
+    detailsElement.hidden = true
+    contentElement.append(headerElement, detailsElement)
+    nodeElement.appendChild(contentElement)
+
+    const entry = {
+      element: nodeElement,
+      header: headerElement,
+      details: detailsElement,
+      children: null,
+      isRoot,
+      status: null,
+      title: null,
+    }
+    this.updateNodeElement(entry, node)
+
+    contentElement.addEventListener("click", (e) => {
+      if (e.target.closest("a")) return
+      this.toggleDetails(node.id)
+    })
+
+    const parent = node.parent_id ? this.nodeElements.get(node.parent_id) : null
+    if (parent) {
+      if (!parent.children) {
+        parent.children = document.createElement("div")
+        parent.children.className = "tree-children"
+        parent.element.appendChild(parent.children)
+      }
+      parent.children.appendChild(nodeElement)
+    } else {
+      this.treeRootElement.appendChild(nodeElement)
+    }
+
+    this.nodeElements.set(node.id, entry)
+  }
+
+  updateNodeElement(entry, node) {
+    entry.element.className = `tree-node tree-node--${node.status}`
+    if (entry.isRoot) entry.element.classList.add("tree-node--root")
 
     let statusIcon = ""
     switch (node.status) {
@@ -505,64 +641,95 @@ class TreeVisualizer {
         statusIcon = "⚪"
     }
 
-    // Create the main node content with website information
-    const nodeTitle = this.escapeHtml(node.title)
-    const nodeSource = node.source ? this.escapeHtml(node.source) : ""
-    const nodeUrl = node.url || ""
-    const nodeSnippet = node.snippet ? this.escapeHtml(node.snippet) : ""
-    const searchQuery = node.search_query ? this.escapeHtml(node.search_query) : ""
-
-    contentElement.innerHTML = `
-      <div class="tree-node__header">
-        <div class="tree-node__status-icon">${statusIcon}</div>
-        <div class="tree-node__main">
-          <div class="tree-node__title-row">
-            <h4 class="tree-node__title">${nodeTitle}</h4>
-            ${nodeSource ? `<span class="tree-node__source">${nodeSource}</span>` : ""}
-          </div>
-          ${nodeSnippet ? `<p class="tree-node__snippet">${nodeSnippet}</p>` : ""}
-          ${searchQuery ? `<div class="tree-node__query">🔍 Found via: "${searchQuery}"</div>` : ""}
-          ${
-            nodeUrl
-              ? `<div class="tree-node__url">
-            <a href="${nodeUrl}" target="_blank" rel="noopener noreferrer" class="tree-node__link">
-              🔗 Visit Website
-            </a>
-          </div>`
-              : ""
-          }
+    entry.header.className = "tree-node__header"
+    entry.header.innerHTML = `
+      <div class="tree-node__status-icon">${statusIcon}</div>
+      <div class="tree-node__main">
+        <div class="tree-node__title-row">
+          <h4 class="tree-node__title">${this.escapeHtml(node.title)}</h4>
         </div>
-        <div class="tree-node__timestamp">${this.formatTimestamp(node.timestamp)}</div>
       </div>
+      <div class="tree-node__toggle">${entry.details.hidden ? "▸" : "▾"}</div>
     `
 
-    // Add error message if present
-    if (node.error_message) {
-      const errorElement = document.createElement("div")
-      errorElement.className = "tree-node__error"
-      errorElement.textContent = node.error_message
-      contentElement.appendChild(errorElement)
+    // status changes move the timestamp / error message, so cached details are stale
+    if (entry.status !== null && entry.status !== node.status) {
+      this.nodeDetails.delete(node.id)
+      if (!entry.details.hidden) this.loadDetails(node.id)
     }
+    entry.status = node.status
+    entry.title = node.title
+  }
 
-    nodeElement.appendChild(contentElement)
+  toggleDetails(nodeId) {
+    const entry = this.nodeElements.get(nodeId)
+    if (!entry) return
 
-    // Add children if they exist
-    if (node.children && node.children.length > 0) {
-      const childrenContainer = document.createElement("div")
-      childrenContainer.className = "tree-children"
+    entry.details.hidden = !entry.details.hidden
+    const toggle = entry.header.querySelector(".tree-node__toggle")
+    if (toggle) toggle.textContent = entry.details.hidden ? "▸" : "▾"
+    if (!entry.details.hidden) this.loadDetails(nodeId)
+  }
 
-      node.children.forEach((childId) => {
-        const childNode = this.treeData[childId]
-        if (childNode) {
-          const childElement = this.createTreeElement(childNode)
-          childrenContainer.appendChild(childElement)
-        }
-      })
+  async loadDetails(nodeId) {
+    const entry = this.nodeElements.get(nodeId)
+    if (!entry) return
+
+    let details = this.nodeDetails.get(nodeId)
+    if (!details) {
+      entry.details.innerHTML = `<div class="tree-node__details-loading">Loading details…</div>`
+      try {
+        const params = new URLSearchParams({ session: this.searchSessionId || this.socket?.id || "" })
+        const response = await fetch(`/api/node/${encodeURIComponent(nodeId)}?${params}`)
+        if (!response.ok) throw new Error(`HTTP ${response.status}`)
+        details = await response.json()
+        this.nodeDetails.set(nodeId, details)
+      } catch (error) {
+        console.error("❌ Failed to load node details:", error)
+        entry.details.innerHTML = `<div class="tree-node__error">Could not load details</div>`
+        return
+      }
+    }
 
-      nodeElement.appendChild(childrenContainer)
+    // the node may have been removed or collapsed while the request was in flight
+    if (this.nodeElements.get(nodeId) === entry) {
+      this.renderDetails(entry, details)
     }
+  }
+
+  renderDetails(entry, details) {
+    const nodeSource = details.source ? this.escapeHtml(details.source) : ""
+    const nodeUrl = details.url ? this.escapeHtml(details.url) : ""
+    const nodeSnippet = details.snippet ? this.escapeHtml(details.snippet) : ""
+    const nodeSummary = details.summary ? this.escapeHtml(details.summary) : ""
+    const searchQuery = details.search_query ? this.escapeHtml(details.search_query) : ""
+
+    entry.details.innerHTML = `
+      <div class="tree-node__details-meta">
+        ${nodeSource ? `<span class="tree-node__source">${nodeSource}</span>` : ""}
+        <span class="tree-node__timestamp">${this.formatTimestamp(details.timestamp)}</span>
+      </div>
+      ${nodeSnippet ? `<p class="tree-node__snippet">${nodeSnippet}</p>` : ""}
+      ${nodeSummary ? `<p class="tree-node__summary">${nodeSummary}</p>` : ""}
+      ${searchQuery ? `<div class="tree-node__query">🔍 Found via: "${searchQuery}"</div>` : ""}
+      ${
+        nodeUrl
+          ? `<div class="tree-node__url">
+        <a href="${nodeUrl}" target="_blank" rel="noopener noreferrer" class="tree-node__link">
+          🔗 Visit Website
+        </a>
+      </div>`
+          : ""
+      }
+    `
 
-    return nodeElement
+    // Add error message if present
+    if (details.error_message) {
+      const errorElement = document.createElement("div")
+      errorElement.className = "tree-node__error"
+      errorElement.textContent = details.error_message
+      entry.details.appendChild(errorElement)
+    }
   }
 
   updateStatus(type, message) {
@@ -632,6 +799,7 @@ class TreeVisualizer {
       articleTitle: this.articleTitle,
       socketId: this.socket?.id,
       hasFinalAnalysis: !!this.finalAnalysis,
+      searchTimings: this.searchTimings,
     }
   }
 }
@@ -0,0 +1,17 @@
+"""
+Shared setup for the unit tests.
+
+Like the benchmarks, the tests run fully offline: the service config is
+pointed at unroutable or fake backends before any application module is
+imported.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("GOOGLE_SEARCH_BASE_URL", "http://127.0.0.1:9/customsearch/v1")
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+sys.path.insert(0, str(ROOT))
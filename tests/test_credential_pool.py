@@ -0,0 +1,30 @@
+from collections import Counter
+
+from services.credential_pool import Credential, CredentialPool
+
+
+def _pool(**limits):
+    return CredentialPool("test", [Credential(f"key{i}") for i in range(3)], **limits)
+
+
+def test_unlimited_keys_share_calls():
+    pool = _pool()
+    used = Counter(pool.acquire().key for _ in range(9))
+    assert used == {"key0": 3, "key1": 3, "key2": 3}
+
+
+def test_limited_keys_share_calls():
+    pool = _pool(per_minute=10, per_day=100)
+    used = Counter(pool.acquire().key for _ in range(6))
+    assert used == {"key0": 2, "key1": 2, "key2": 2}
+
+
+def test_retired_key_is_skipped():
+    pool = _pool()
+    pool.report_exhausted(Credential("key0"), daily=True)
+    assert {pool.acquire().key for _ in range(4)} == {"key1", "key2"}
+
+
+def test_repeated_keys_are_one_quota():
+    pool = CredentialPool("test", [Credential("a"), Credential("a"), Credential("b")])
+    assert len(pool) == 2
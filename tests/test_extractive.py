@@ -0,0 +1,28 @@
+from utils.extractive import rank_sentences
+
+ON_TOPIC = [
+    "JavaScript closures capture the variables of the function that created them.",
+    "A closure keeps those variables alive after the outer JavaScript function has returned.",
+    "Browsers store each cookie with the domain and path that set it.",
+    "The first HTTP cookie was written by Lou Montulli for Netscape in 1994.",
+    "Every subscriber to the weekly newsletter received a printed catalog in the post.",
+    "The dialog includes a button that lets users log in with their existing account.",
+]
+
+BANNERS = [
+    "We use cookies to improve your experience, please accept all cookies.",
+    "Please enable JavaScript in your browser settings to view this page.",
+    "Subscribe to our newsletter for the latest stories every single week.",
+    "Copyright 2024 Example Media Group, all rights reserved worldwide today.",
+]
+
+
+def test_on_topic_sentences_mentioning_banner_words_are_kept():
+    ranked = rank_sentences(" ".join(ON_TOPIC), "JavaScript closures")
+    assert sorted(ranked) == sorted(ON_TOPIC)
+    assert ranked[0].startswith(("JavaScript closures", "A closure"))
+
+
+def test_short_banners_are_dropped():
+    ranked = rank_sentences(" ".join(BANNERS + ON_TOPIC[:2]), "JavaScript closures")
+    assert sorted(ranked) == sorted(ON_TOPIC[:2])
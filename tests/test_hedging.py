@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from config import Config
+from utils import hedging
+from utils.hedging import Hedger
+
+
+@pytest.fixture
+def hedger(monkeypatch):
+    monkeypatch.setattr(Config, "HEDGE_MIN_DELAY", 0.05)
+    hedger = Hedger("test")
+    for _ in range(5):
+        hedger.latency.observe(0.01)
+    return hedger
+
+
+def _slow(result, seconds=0.3):
+    def attempt(cancel):
+        cancel.wait(seconds)
+        return result, threading.get_ident()
+    return attempt
+
+
+def test_without_a_free_pool_thread_the_call_runs_inline(hedger, monkeypatch):
+    monkeypatch.setattr(hedging, "_idle", threading.BoundedSemaphore(1))
+    hedging._idle.acquire()  # every pool thread is taken
+
+    (result, thread), from_backup = hedger.run(_slow("primary"), pytest.fail)
+
+    assert (result, from_backup) == ("primary", False)
+    assert thread == threading.get_ident()
+
+
+def test_no_backup_without_a_thread_to_run_it(hedger, monkeypatch):
+    monkeypatch.setattr(hedging, "_idle", threading.BoundedSemaphore(1))
+
+    (result, _), from_backup = hedger.run(_slow("primary"), pytest.fail)
+
+    assert (result, from_backup) == ("primary", False)
+    assert hedger.hedged == 0
+
+
+def test_a_faster_backup_wins(hedger, monkeypatch):
+    monkeypatch.setattr(hedging, "_idle", threading.BoundedSemaphore(2))
+
+    start = time.perf_counter()
+    (result, _), from_backup = hedger.run(_slow("primary", 5), lambda: _slow("backup", 0))
+
+    assert (result, from_backup) == ("backup", True)
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,61 @@
+import time
+
+from config import Config
+from services.host_health import HostHealthRegistry
+
+URL = "https://arxiv.org/pdf/1234.pdf"
+
+
+def _expire(registry):
+    """Let the host's cooldown pass."""
+    state = registry._hosts["arxiv.org"]
+    state.open_until = time.monotonic() - 1
+
+
+def test_one_timeout_does_not_open_the_circuit():
+    registry = HostHealthRegistry()
+    registry.record_failure(URL, "timeout")
+    assert registry.is_available(URL)
+
+
+def test_concurrent_failures_open_once_without_escalating():
+    registry = HostHealthRegistry()
+    for _ in range(Config.FETCH_PER_HOST_CONCURRENCY + 2):
+        registry.record_failure(URL, "timeout")
+    assert not registry.is_available(URL)
+    assert registry._hosts["arxiv.org"].cooldown == Config.HOST_COOLDOWN_SECONDS
+
+
+def test_half_open_lets_one_probe_through():
+    registry = HostHealthRegistry()
+    for _ in range(Config.HOST_FAILURE_THRESHOLD):
+        registry.record_failure(URL, "http_5xx")
+    _expire(registry)
+
+    assert registry.is_available(URL)
+    assert registry.allow_request(URL)
+    assert not registry.allow_request(URL)
+
+    registry.record_success(URL)
+    assert registry.allow_request(URL) and registry.allow_request(URL)
+
+
+def test_failed_probe_doubles_the_cooldown():
+    registry = HostHealthRegistry()
+    for _ in range(Config.HOST_FAILURE_THRESHOLD):
+        registry.record_failure(URL, "http_5xx")
+    _expire(registry)
+    assert registry.allow_request(URL)
+
+    registry.record_failure(URL, "timeout")
+    assert not registry.allow_request(URL)
+    assert registry._hosts["arxiv.org"].cooldown == min(
+        Config.HOST_COOLDOWN_SECONDS * 2, Config.HOST_COOLDOWN_MAX_SECONDS
+    )
+
+
+def test_least_recently_used_hosts_are_forgotten():
+    registry = HostHealthRegistry(max_hosts=2)
+    for host in ("a.com", "b.com", "c.com"):
+        registry.record_failure(f"https://{host}/", "timeout")
+    assert list(registry._hosts) == ["b.com", "c.com"]
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from services.credential_pool import Credential, CredentialPool
+from services.prewarm import Prewarmer
+from utils.rate_limiter import RateLimiter
+
+ARTICLE = {"title": "Printing press", "url": "https://example.org/printing-press"}
+
+
+class _InterruptedEngine:
+    """An exploration during which a client opens an article."""
+
+    def __init__(self):
+        self.prewarmer = None
+        self.stopped = None
+
+    def explore(self, article_data, session_id, should_stop):
+        assert not should_stop()
+        self.prewarmer.record_open({"title": "Steam engine"})
+        self.stopped = should_stop()
+        return {"events": [], "details": {}}
+
+
+def test_live_traffic_stops_an_exploration():
+    engine = _InterruptedEngine()
+    pool = CredentialPool("test", [Credential("key")])
+    services = SimpleNamespace(
+        search_engine=engine,
+        rate_limiter=RateLimiter(100),
+        google_search=SimpleNamespace(credentials=pool),
+        gemini_service=SimpleNamespace(credentials=pool),
+    )
+    prewarmer = engine.prewarmer = Prewarmer(services, socketio=None)
+    for _ in range(2):
+        prewarmer.record_open(ARTICLE)
+    prewarmer._last_open = 0.0  # the site has been quiet since
+
+    assert prewarmer.run_once() is None
+    assert engine.stopped
+    assert prewarmer.stopped == 1
+    assert prewarmer.last_skip == "stopped: live traffic"
@@ -0,0 +1,43 @@
+import multiprocessing
+
+from services.credential_pool import Credential, CredentialPool
+from services.quota_counters import SharedCounters, SharedRateLimiter
+
+
+def _pool(counters, **limits):
+    return CredentialPool("test", [Credential("key0"), Credential("key1")], counters=counters, **limits)
+
+
+def _record_calls(counters, calls):
+    limiter = SharedRateLimiter(100, counters, "gemini:calls")
+    for _ in range(calls):
+        limiter.record_call()
+
+
+def test_pools_sharing_counters_share_the_limit():
+    counters = SharedCounters(slots=8)
+    first, second = _pool(counters, per_minute=1), _pool(counters, per_minute=1)
+
+    assert first.acquire() is not None
+    assert second.acquire() is not None
+    assert first.acquire() is None and second.acquire() is None
+    assert second.get_status()["available_keys"] == 0
+
+
+def test_retired_key_is_skipped_by_every_pool():
+    counters = SharedCounters(slots=8)
+    _pool(counters).report_exhausted(Credential("key0"), daily=True)
+    assert {_pool(counters).acquire().key for _ in range(3)} == {"key1"}
+
+
+def test_calls_in_a_worker_process_reach_the_web_limiter():
+    counters = SharedCounters(slots=8)
+    limiter = SharedRateLimiter(5, counters, "gemini:calls")
+
+    worker = multiprocessing.get_context("spawn").Process(target=_record_calls, args=(counters, 5))
+    worker.start()
+    worker.join(30)
+
+    assert worker.exitcode == 0
+    assert not limiter.can_make_call()
+    assert 0 < limiter.wait_time() <= 60
@@ -0,0 +1,37 @@
+import threading
+
+from services.search_workers import ProcessSearchRunner
+
+
+class _ThreadedSocketIO:
+    def start_background_task(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+
+class _FlakyEmitter:
+    """Fails on the first event, then records the rest."""
+
+    def __init__(self):
+        self.emitted = []
+        self.calls = 0
+        self.relayed = threading.Event()
+
+    def emit(self, event, data, room=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("client gone")
+        self.emitted.append((event, room))
+        self.relayed.set()
+
+
+def test_relay_survives_a_failing_emit():
+    runner = ProcessSearchRunner(_ThreadedSocketIO(), workers=0, node_store=None)
+    runner.emitter = _FlakyEmitter()
+
+    runner._events.put(("search_started", {"session_id": "a"}, "a"))
+    runner._events.put(("search_started", {"session_id": "b"}, "b"))
+
+    assert runner.emitter.relayed.wait(5)
+    assert runner.emitter.emitted == [("search_started", "b")]
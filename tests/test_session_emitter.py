@@ -0,0 +1,40 @@
+from services.session_emitter import SessionEmitter
+
+
+def _emitter(backlog=0):
+    emitter = SessionEmitter(socketio=None, interval=0, max_client_backlog=5)
+    emitter._ensure_flusher = lambda: None  # drive _take_ready by hand
+    emitter._client_backlog = lambda room: backlog
+    return emitter
+
+
+def _events(batches):
+    return [(event, data) for _, events in batches for event, data in events]
+
+
+def test_newer_tree_replaces_the_older_one_in_place():
+    emitter = _emitter()
+    emitter.emit("tree_update", 1, "s")
+    emitter.emit("node_loaded", "a", "s")
+    emitter.emit("tree_update", 2, "s")
+
+    assert _events(emitter._take_ready()) == [("tree_update", 2), ("node_loaded", "a")]
+    assert emitter.superseded == 1
+
+
+def test_events_after_a_held_tree_wait_for_it():
+    emitter = _emitter(backlog=10)
+    emitter.emit("search_started", None, "s")
+    emitter.emit("tree_update", 1, "s")
+    emitter.emit("final_analysis", "x", "s")
+    emitter.emit("search_complete", None, "s")
+
+    assert _events(emitter._take_ready()) == [("search_started", None)]
+
+    emitter._client_backlog = lambda room: 0
+    assert _events(emitter._take_ready()) == [
+        ("tree_update", 1),
+        ("final_analysis", "x"),
+        ("search_complete", None),
+    ]
+    assert not emitter._pending
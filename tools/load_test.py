@@ -0,0 +1,211 @@
+"""
+Load-test harness: drives N concurrent Socket.IO clients through ``start_search``.
+
+Reports throughput plus p50/p95/p99 time-to-first-node (the first
+``tree_update`` carrying a child node) and time-to-complete
+(``search_complete``).
+
+Against a running server:
+
+    python -m tools.load_test --url http://localhost:5000 --clients 20
+
+Fully offline – starts the search stub and an app subprocess wired to the
+stub and the fake Gemini backend:
+
+    python -m tools.load_test --offline --clients 20 --gemini-latency 0.3
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import socketio
+
+from services.fake_backends import SearchStubServer
+
+
+@dataclass(slots=True)
+class _SearchTiming:
+    started: float = 0.0
+    first_node: Optional[float] = None
+    completed: Optional[float] = None
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of *values* (which must be non-empty)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _run_client(url: str, index: int, searches: int, timeout: float) -> List[_SearchTiming]:
+    timings: List[_SearchTiming] = []
+    client = socketio.Client(reconnection=False)
+    current: List[_SearchTiming] = []
+
+    @client.on("tree_update")
+    def on_tree_update(tree):
+        timing = current[-1]
+        if timing.first_node is None and len(tree) > 1:
+            timing.first_node = time.perf_counter() - timing.started
+
+    @client.on("search_complete")
+    def on_complete(_data):
+        timing = current[-1]
+        timing.completed = time.perf_counter() - timing.started
+        timing.done.set()
+
+    @client.on("error")
+    def on_error(data):
+        timing = current[-1]
+        timing.error = (data or {}).get("message", "error")
+        timing.done.set()
+
+    @client.on("rate_limit_warning")
+    def on_rate_limited(data):
+        timing = current[-1]
+        timing.error = "rate limited"
+        timing.done.set()
+
+    client.connect(url, transports=["websocket", "polling"], wait_timeout=timeout)
+    try:
+        for n in range(searches):
+            timing = _SearchTiming(started=time.perf_counter())
+            current.append(timing)
+            client.emit(
+                "start_search",
+                {"article_data": {"title": f"Load test article {index}-{n}", "url": ""}},
+            )
+            if not timing.done.wait(timeout):
+                timing.error = "timeout"
+            timings.append(timing)
+    finally:
+        client.disconnect()
+    return timings
+
+
+def _launch_offline_app(args: argparse.Namespace) -> tuple[SearchStubServer, subprocess.Popen]:
+    stub = SearchStubServer(
+        seed=args.seed,
+        search_latency=args.search_latency,
+        article_latency=args.article_latency,
+    ).start()
+
+    env = dict(
+        os.environ,
+        GOOGLE_SEARCH_BASE_URL=stub.base_url,
+        GEMINI_BACKEND="fake",
+        FAKE_SEED=str(args.seed),
+        FAKE_GEMINI_LATENCY=str(args.gemini_latency),
+        FAKE_GEMINI_ERROR_RATE=str(args.gemini_error_rate),
+        FAKE_GEMINI_THROTTLE_RATE=str(args.gemini_throttle_rate),
+        MAX_CALLS_PER_MINUTE="1000000",
+        MIN_DELAY_BETWEEN_REQUESTS="0",
+        MAX_DELAY_BETWEEN_REQUESTS="0",
+        DEBUG="False",
+        LOG_LEVEL="WARNING",
+        HOST="127.0.0.1",
+        PORT=str(args.port),
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    app = subprocess.Popen([sys.executable, "app.py"], cwd=root, env=env)
+    return stub, app
+
+
+def _wait_for_server(url: str, timeout: float) -> None:
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{url}/api/health", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout:.0f}s")
+
+
+def _report(timings: List[_SearchTiming], wall: float) -> None:
+    ok = [t for t in timings if t.completed is not None and t.error is None]
+    failed = len(timings) - len(ok)
+    print(f"searches: {len(timings)}  completed: {len(ok)}  failed: {failed}")
+    print(f"wall time: {wall:.2f}s  throughput: {len(ok) / wall:.3f} searches/s")
+
+    for label, values in (
+        ("time-to-first-node", [t.first_node for t in ok if t.first_node is not None]),
+        ("time-to-complete", [t.completed for t in ok]),
+    ):
+        if not values:
+            print(f"{label}: no samples")
+            continue
+        print(
+            f"{label}: p50={_percentile(values, 50):.3f}s "
+            f"p95={_percentile(values, 95):.3f}s p99={_percentile(values, 99):.3f}s"
+        )
+
+    errors = sorted({t.error for t in timings if t.error})
+    if errors:
+        print("errors: " + "; ".join(errors))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Socket.IO load test for start_search.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--searches-per-client", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--offline", action="store_true", help="start the stub and an offline app")
+    parser.add_argument("--port", type=int, default=5055, help="app port with --offline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--article-latency", type=float, default=0.1)
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = app = None
+    url = args.url
+    if args.offline:
+        stub, app = _launch_offline_app(args)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_for_server(url, timeout=30)
+
+        results: List[List[_SearchTiming]] = [[] for _ in range(args.clients)]
+
+        def worker(i: int) -> None:
+            try:
+                results[i] = _run_client(url, i, args.searches_per_client, args.timeout)
+            except Exception as e:
+                results[i] = [_SearchTiming(error=f"client failed: {e}")]
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.clients)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - start
+
+        _report([t for client in results for t in client], wall)
+    finally:
+        if app is not None:
+            app.terminate()
+            app.wait(timeout=10)
+        if stub is not None:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+TTL cache for DNS lookups of one HTTP client
+
+Article fetches hit many distinct hosts, often repeatedly within one search;
+caching their lookups saves a resolver round trip per new connection.
+``mount_dns_cache`` scopes the cache to one ``requests.Session`` by swapping
+in connection classes that connect to the cached addresses; every other
+client in the process resolves as usual.
+"""
+
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class DnsCache:
+    """Least-recently-used cache of resolved addresses, each kept for *ttl_seconds*."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024) -> None:
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def addresses(self, host: str, port: int) -> List[str]:
+        """The addresses of *host*, in resolver order; empty if it does not resolve."""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        try:
+            infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            return []
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+
+        with self._lock:
+            self._entries[key] = (now, addresses)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _cached_connection(base, cache: DnsCache):
+    class CachedDnsConnection(base):
+        def _new_conn(self):
+            # _dns_host is only used to open the socket; Host headers, SNI and
+            # certificate checks keep using the hostname
+            host = self._dns_host
+            error = None
+            for address in cache.addresses(host, self.port):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+                finally:
+                    self._dns_host = host
+            if error is not None:
+                raise error
+            return super()._new_conn()  # unresolvable: urllib3's usual error
+
+    return CachedDnsConnection
+
+
+def mount_dns_cache(session: requests.Session, cache: DnsCache) -> None:
+    """Resolve the hosts *session* connects to through *cache*."""
+    http_pool = type("CachedDnsHTTPConnectionPool", (HTTPConnectionPool,), {
+        "ConnectionCls": _cached_connection(HTTPConnection, cache),
+    })
+    https_pool = type("CachedDnsHTTPSConnectionPool", (HTTPSConnectionPool,), {
+        "ConnectionCls": _cached_connection(HTTPSConnection, cache),
+    })
+    for adapter in set(session.adapters.values()):
+        adapter.poolmanager.pool_classes_by_scheme = {"http": http_pool, "https": https_pool}
+    logger.info("DNS cache mounted (ttl=%.0fs, %d hosts)", cache.ttl, cache.max_entries)
@@ -0,0 +1,204 @@
+"""
+Local extractive summarisation for shrinking LLM prompts
+
+Sentences are scored with TextRank over TF-IDF vectors (PageRank on the
+sentence-similarity graph), nudged towards sentences that share words with
+the article title, and the best ones are kept – in their original order –
+until a character budget is spent.  Navigation text, cookie banners and
+other fragments are dropped before scoring.
+
+NumPy is used for the similarity matrix and the power iteration when it is
+installed; the pure-Python fallback computes the same scores.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # optional: only speeds up scoring
+    np = None
+
+# Longer articles are ranked on their first sentences only; the similarity
+# matrix grows with the square of this.
+MAX_SENTENCES = 200
+_DAMPING = 0.85
+_ITERATIONS = 30
+_TOLERANCE = 1e-4
+_TITLE_WEIGHT = 0.5
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_WORD = re.compile(r"[a-z][a-z0-9'-]+")
+# Whole banner phrases, not topic words: an article about cookies, JavaScript
+# or newsletters still mentions them in its prose.
+_BOILERPLATE = re.compile(
+    r"\b(?:accept (?:all )?cookies|(?:we|this (?:web)?site) uses? cookies"
+    r"|manage (?:cookie|privacy) (?:settings|preferences)"
+    r"|(?:subscribe|sign up) (?:to|for) (?:our|the) newsletter|(?:sign|log) in to (?:continue|read|comment)"
+    r"|(?:please )?enable javascript|javascript is (?:disabled|required|not enabled)"
+    r"|(?:read|see|view) our (?:privacy policy|terms)|agree to (?:our|the) terms"
+    r"|all rights reserved|continues below (?:this )?advertisement|share this (?:article|story|page)"
+    r"|click here to|skip to (?:main )?content)\b",
+    re.IGNORECASE,
+)
+# a sentence with more terms than this is prose, whatever phrase it contains
+_BANNER_MAX_TERMS = 12
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i in into is it its "
+    "of on or our she so than that the their them then there these they this those to was "
+    "we were what when which while who will with would you your not no can could also more "
+    "most other some such only over after before about between through during".split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text or "") if s.strip()]
+
+
+def _terms(sentence: str) -> List[str]:
+    return [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS]
+
+
+def _is_content(sentence: str, terms: List[str]) -> bool:
+    """Looks like prose rather than a menu, banner or caption."""
+    if len(terms) < 4 or len(sentence) > 1000:
+        return False
+    letters = sum(c.isalpha() for c in sentence)
+    if letters <= 0.6 * len(sentence):
+        return False
+    return len(terms) > _BANNER_MAX_TERMS or not _BOILERPLATE.search(sentence)
+
+
+def _tfidf(term_lists: List[List[str]]) -> List[Dict[str, float]]:
+    df = Counter(t for terms in term_lists for t in set(terms))
+    n = len(term_lists)
+    vectors = []
+    for terms in term_lists:
+        counts = Counter(terms)
+        vector = {t: c * (math.log((1 + n) / (1 + df[t])) + 1) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        vectors.append({t: v / norm for t, v in vector.items()})
+    return vectors
+
+
+def _similarity(vectors: List[Dict[str, float]]):
+    """Cosine similarity of every pair of (unit) vectors, zero on the diagonal."""
+    if np is not None:
+        vocab = {t: i for i, t in enumerate({t for v in vectors for t in v})}
+        matrix = np.zeros((len(vectors), len(vocab)))
+        for row, vector in enumerate(vectors):
+            for term, weight in vector.items():
+                matrix[row, vocab[term]] = weight
+        similarity = matrix @ matrix.T
+        np.fill_diagonal(similarity, 0.0)
+        return similarity
+
+    # sparse rows {j: similarity}, accumulated through an inverted index:
+    # most sentence pairs share no terms at all
+    postings: Dict[str, List[Tuple[int, float]]] = {}
+    for i, vector in enumerate(vectors):
+        for term, weight in vector.items():
+            postings.setdefault(term, []).append((i, weight))
+
+    rows: List[Dict[int, float]] = [{} for _ in vectors]
+    for entries in postings.values():
+        for i, wi in entries:
+            row = rows[i]
+            for j, wj in entries:
+                if i != j:
+                    row[j] = row.get(j, 0.0) + wi * wj
+    return rows
+
+
+def _textrank(similarity) -> List[float]:
+    """PageRank over the weighted, undirected sentence graph."""
+    n = len(similarity)
+    if np is not None:
+        out_weight = similarity.sum(axis=1)
+        out_weight[out_weight == 0] = 1.0
+        transition = (similarity / out_weight[:, None]).T
+        scores = np.full(n, 1.0 / n)
+        for _ in range(_ITERATIONS):
+            previous, scores = scores, (1 - _DAMPING) / n + _DAMPING * transition @ scores
+            if np.abs(scores - previous).sum() < _TOLERANCE:
+                break
+        return scores.tolist()
+
+    out_weight = [sum(row.values()) or 1.0 for row in similarity]
+    incoming: List[List[Tuple[int, float]]] = [[] for _ in range(n)]
+    for j, row in enumerate(similarity):
+        for i, weight in row.items():
+            incoming[i].append((j, weight / out_weight[j]))
+
+    scores = [1.0 / n] * n
+    for _ in range(_ITERATIONS):
+        previous, scores = scores, [
+            (1 - _DAMPING) / n + _DAMPING * sum(weight * scores[j] for j, weight in edges)
+            for edges in incoming
+        ]
+        if sum(abs(a - b) for a, b in zip(scores, previous)) < _TOLERANCE:
+            break
+    return scores
+
+
+def rank_sentences(text: str, title: str = "") -> List[str]:
+    """Content sentences of *text*, most informative first."""
+    sentences = []
+    term_lists = []
+    for sentence in split_sentences(text)[:MAX_SENTENCES]:
+        terms = _terms(sentence)
+        if _is_content(sentence, terms):
+            sentences.append(sentence)
+            term_lists.append(terms)
+    if len(sentences) <= 1:
+        return sentences
+
+    scores = _textrank(_similarity(_tfidf(term_lists)))
+    title_terms = set(_terms(title))
+    if title_terms:
+        top = max(scores)
+        scores = [
+            score + _TITLE_WEIGHT * top * len(title_terms & set(terms)) / len(title_terms)
+            for score, terms in zip(scores, term_lists)
+        ]
+
+    order = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    return [sentences[i] for i in order]
+
+
+def select_sentences(text: str, max_chars: int, title: str = "") -> str:
+    """
+    The most informative sentences of *text* that fit in *max_chars*, joined
+    in their original order.  Falls back to the head of *text* when it has no
+    recognisable prose.
+    """
+    if not text or len(text) <= max_chars:
+        return text or ""
+
+    ranked = rank_sentences(text, title)
+    if not ranked:
+        return text[:max_chars]
+
+    chosen = []
+    used = 0
+    for sentence in ranked:
+        cost = len(sentence) + (1 if chosen else 0)
+        if used + cost > max_chars:
+            continue
+        chosen.append(sentence)
+        used += cost
+
+    if not chosen:
+        return ranked[0][:max_chars]
+
+    position = {s: i for i, s in enumerate(split_sentences(text))}
+    chosen.sort(key=lambda s: position.get(s, 0))
+    return " ".join(chosen)
+
+
+def local_summary(text: str, max_chars: int, title: str = "") -> Optional[str]:
+    """An extractive node summary, or None if *text* has no usable prose."""
+    summary = select_sentences(text, max_chars, title)
+    return summary or None
@@ -0,0 +1,165 @@
+"""
+Hedged calls for tail-latency control
+
+``Hedger.run`` starts a call and, if it is still running once the observed
+p90 latency of such calls has passed, starts a backup (another URL, or the
+same request again) and returns whichever succeeds first.  The loser's
+``cancel`` event is set; callables that can stop early (article downloads)
+check it, the rest finish in the background and their result is dropped.
+
+Hedged attempts run on a shared pool of ``HEDGE_MAX_WORKERS`` threads with
+the caller's context copied in, so spans still land in the right search.  An
+attempt only goes to the pool when a thread is free to take it at once:
+otherwise the call runs unhedged on the caller's thread, rather than queueing
+behind other searches and looking slow.  Attempts should not wait for quota;
+do that on the caller's thread before ``run`` (see ``GeminiService``).
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from config import Config
+from utils.metrics import LatencyWindow, current_trace, trace_context
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# an attempt: called with the event that is set once it is no longer wanted
+Attempt = Callable[[threading.Event], T]
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_idle = threading.BoundedSemaphore(Config.HEDGE_MAX_WORKERS)  # pool threads not taken
+_hedgers: Dict[str, "Hedger"] = {}
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=Config.HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _pool
+
+
+class Hedger:
+    """Latency tracking and hedging for one kind of call."""
+
+    def __init__(self, name: str, latency: Optional[LatencyWindow] = None) -> None:
+        self.name = name
+        self.latency = latency or LatencyWindow()
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self._lock = threading.Lock()
+        _hedgers[name] = self
+
+    def delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None while there is too little data."""
+        p = self.latency.percentile(Config.HEDGE_PERCENTILE)
+        return None if p is None else max(p, Config.HEDGE_MIN_DELAY)
+
+    def _submit(self, attempt: Attempt, cancel: threading.Event) -> Future:
+        """Run *attempt* on a pool thread already reserved from ``_idle``."""
+        context = contextvars.copy_context()
+        start = time.perf_counter()  # from submission: time spent queued counts
+
+        def traced():
+            # attribute this pool thread to the search, for the stack sampler
+            with trace_context(*current_trace()):
+                return attempt(cancel)
+
+        def timed():
+            try:
+                result = context.run(traced)
+            finally:
+                _idle.release()
+            # a hedged-over attempt that still finished is the tail we want to see
+            self.latency.observe(time.perf_counter() - start)
+            return result
+
+        return _executor().submit(timed)
+
+    def run(self, primary: Attempt, backup: Callable[[], Optional[Attempt]]) -> Tuple[T, bool]:
+        """
+        Run *primary*, hedging with ``backup()`` once it is slower than usual.
+
+        *backup* is only called when a hedge is due and may return None to
+        decline (no other candidate, no spare quota).  Returns the winning
+        result and whether it came from the backup.  If every attempt fails,
+        the primary's exception is raised.
+        """
+        with self._lock:
+            self.calls += 1
+        delay = self.delay() if Config.HEDGE_REQUESTS else None
+
+        primary_cancel = threading.Event()
+        if delay is None or not _idle.acquire(blocking=False):
+            return self._run_inline(primary, primary_cancel), False
+
+        first = self._submit(primary, primary_cancel)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result(), False
+
+        # a backup that would queue for a thread could not win; don't spend quota on it
+        if not _idle.acquire(blocking=False):
+            return first.result(), False
+        try:
+            second_attempt = backup()
+        except BaseException:
+            _idle.release()
+            raise
+        if second_attempt is None:
+            _idle.release()
+            return first.result(), False
+
+        with self._lock:
+            self.hedged += 1
+        backup_cancel = threading.Event()
+        second = self._submit(second_attempt, backup_cancel)
+        logger.info("%s exceeded %.2fs; started a backup", self.name, delay)
+
+        pending = {first: primary_cancel, second: backup_cancel}
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                if future.exception() is not None:
+                    if future is first:
+                        error = future.exception()
+                    continue
+                for cancel in pending.values():
+                    cancel.set()  # the loser
+                if future is second:
+                    with self._lock:
+                        self.backup_wins += 1
+                return future.result(), future is second
+
+        raise error if error is not None else second.exception()
+
+    def _run_inline(self, attempt: Attempt, cancel: threading.Event) -> T:
+        # no hedge possible (too little data, or no free thread): run on the
+        # caller's thread, but keep learning
+        start = time.perf_counter()
+        result = attempt(cancel)
+        self.latency.observe(time.perf_counter() - start)
+        return result
+
+    def get_status(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "backup_wins": self.backup_wins,
+                "delay_seconds": self.delay(),
+            }
+
+
+def hedging_status() -> Dict[str, Dict[str, object]]:
+    return {name: hedger.get_status() for name, hedger in list(_hedgers.items())}
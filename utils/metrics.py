@@ -0,0 +1,227 @@
+"""
+Span-style latency tracing with Prometheus-style histograms
+
+Usage::
+
+    with trace_context(session_id=sid, depth=2):
+        with span("google_search"):
+            ...
+
+Every span is recorded in the ``stage_duration_seconds`` histogram, labelled
+by stage and depth, and added to the per-search breakdown of its session.
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = (
+    256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+)
+ENCODE_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+
+_session_var: ContextVar[Optional[str]] = ContextVar("trace_session", default=None)
+_depth_var: ContextVar[Optional[int]] = ContextVar("trace_depth", default=None)
+_node_var: ContextVar[Optional[str]] = ContextVar("trace_node", default=None)
+
+# thread ident -> session it is tracing, for code that looks at other threads
+_thread_sessions: Dict[int, str] = {}
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # per-bucket counts, then +Inf count, then sum
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+
+        for key, series in sorted(snapshot.items()):
+            labels = ",".join(f'{k}="{v}"' for k, v in key)
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative:g}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-2]:g}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_count{suffix} {series[-2]:g}")
+            lines.append(f"{self.name}_sum{suffix} {series[-1]:.6f}")
+        return lines
+
+
+class LatencyWindow:
+    """
+    The most recent samples of one latency, for decisions made at run time
+    (routing, hedging) rather than for dashboards: samples older than
+    *max_age* seconds no longer count.
+    """
+
+    def __init__(self, max_samples: int = 100, max_age: float = 300.0, min_samples: int = 5):
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def _recent(self) -> List[float]:
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            return [seconds for _, seconds in self._samples]
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile, or None until there are *min_samples* recent samples."""
+        values = self._recent()
+        if len(values) < self.min_samples:
+            return None
+        values.sort()
+        return values[max(1, math.ceil(pct / 100 * len(values))) - 1]
+
+    def __len__(self) -> int:
+        return len(self._recent())
+
+
+class MetricsRegistry:
+    """Holds the stage and payload histograms and the running per-search breakdowns."""
+
+    def __init__(self):
+        self.stage_duration = Histogram(
+            "stage_duration_seconds", "Time spent in each search pipeline stage."
+        )
+        self.payload_size = Histogram(
+            "socketio_payload_bytes", "Encoded size of Socket.IO event payloads.", SIZE_BUCKETS
+        )
+        self.payload_encode = Histogram(
+            "socketio_payload_encode_seconds", "Time spent encoding Socket.IO event payloads.",
+            ENCODE_BUCKETS,
+        )
+        self._searches: Dict[str, Dict[str, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record one finished span under the current trace context."""
+        session_id = _session_var.get()
+        depth = _depth_var.get()
+        self.stage_duration.observe(
+            seconds, stage=stage, depth="" if depth is None else str(depth)
+        )
+
+        if session_id is not None:
+            with self._lock:
+                totals = self._searches.setdefault(session_id, {})
+                entry = totals.setdefault(stage, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+    def search_breakdown(self, session_id: str) -> Dict[str, Dict[str, float]]:
+        """Return ``{stage: {count, total_seconds}}`` for *session_id*'s search."""
+        with self._lock:
+            totals = self._searches.get(session_id, {})
+            return {
+                stage: {"count": int(count), "total_seconds": round(total, 4)}
+                for stage, (count, total) in sorted(totals.items())
+            }
+
+    def reset_search(self, session_id: str) -> None:
+        """Forget the breakdown of *session_id*'s search."""
+        with self._lock:
+            self._searches.pop(session_id, None)
+
+    def record_payload(self, event: str, encoding: str, size: int, seconds: float) -> None:
+        self.payload_size.observe(size, event=event, encoding=encoding)
+        self.payload_encode.observe(seconds, event=event, encoding=encoding)
+
+    def render_prometheus(self) -> str:
+        lines = self.stage_duration.render() + self.payload_size.render() + self.payload_encode.render()
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def trace_context(
+    session_id: Optional[str] = None, depth: Optional[int] = None, node_id: Optional[str] = None
+) -> Iterator[None]:
+    """Tag every span opened inside the block with *session_id*, *depth* and *node_id*."""
+    tokens = []
+    thread = threading.get_ident()
+    previous = _thread_sessions.get(thread)
+    if session_id is not None:
+        tokens.append((_session_var, _session_var.set(session_id)))
+        _thread_sessions[thread] = session_id
+    if depth is not None:
+        tokens.append((_depth_var, _depth_var.set(depth)))
+    if node_id is not None:
+        tokens.append((_node_var, _node_var.set(node_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+        if session_id is not None:
+            if previous is None:
+                _thread_sessions.pop(thread, None)
+            else:
+                _thread_sessions[thread] = previous
+
+
+def current_trace() -> Tuple[Optional[str], Optional[int], Optional[str]]:
+    """The ``(session_id, depth, node_id)`` set by the innermost ``trace_context``."""
+    return _session_var.get(), _depth_var.get(), _node_var.get()
+
+
+def session_threads(session_id: str) -> Set[int]:
+    """Idents of the threads currently inside a ``trace_context`` for *session_id*."""
+    return {thread for thread, session in list(_thread_sessions.items()) if session == session_id}
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one *stage* span."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.record(stage, elapsed)
+        logger.debug(
+            "span %s took %.3fs (session=%s depth=%s)",
+            stage, elapsed, _session_var.get(), _depth_var.get(),
+        )
@@ -0,0 +1,77 @@
+"""
+Binary encoding of tree payloads for Socket.IO
+
+``tree_update`` carries the whole tree on every change and dominates a
+session's bandwidth.  A client that can decode MessagePack says so when it
+starts a search (``"encoding": "msgpack"``).  Its tree frames are then sent
+as msgpack bytes – a binary Socket.IO attachment – instead of JSON text.
+Every other event, and every client that did not ask, gets JSON as before.
+
+``encode`` also records each tree frame's size and encode time in the
+``socketio_payload_bytes`` and ``socketio_payload_encode_seconds``
+histograms, labelled by encoding.  JSON frames are measured by encoding
+them once more here, which ``PAYLOAD_METRICS=False`` turns off.
+
+msgpack is optional; without it every client gets JSON.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config import Config
+from utils.metrics import metrics
+
+try:
+    import msgpack
+except ModuleNotFoundError:  # optional: tree frames stay JSON
+    msgpack = None
+
+# events whose payload may be sent as msgpack
+BINARY_EVENTS = frozenset({"tree_update"})
+
+_MAX_SESSIONS = 10000
+_encodings: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None and Config.SOCKETIO_MSGPACK
+
+
+def set_encoding(session_id: str, requested: Optional[str]) -> str:
+    """Remember the tree encoding for *session_id*; returns the one it will get."""
+    encoding = "msgpack" if requested == "msgpack" and msgpack_available() else "json"
+    with _lock:
+        _encodings[session_id] = encoding
+        _encodings.move_to_end(session_id)
+        while len(_encodings) > _MAX_SESSIONS:
+            _encodings.popitem(last=False)
+    return encoding
+
+
+def forget(session_id: str) -> None:
+    with _lock:
+        _encodings.pop(session_id, None)
+
+
+def encode(event: str, data: Any, session_id: str) -> Any:
+    """*data* as it should be handed to ``socketio.emit`` for *session_id*."""
+    if event not in BINARY_EVENTS:
+        return data
+    with _lock:
+        encoding = _encodings.get(session_id, "json")
+
+    if encoding == "msgpack":
+        start = time.perf_counter()
+        payload = msgpack.packb(data, use_bin_type=True)
+        metrics.record_payload(event, encoding, len(payload), time.perf_counter() - start)
+        return payload
+
+    if Config.PAYLOAD_METRICS:
+        start = time.perf_counter()
+        size = len(json.dumps(data, separators=(",", ":")).encode())
+        metrics.record_payload(event, encoding, size, time.perf_counter() - start)
+    return data
@@ -0,0 +1,225 @@
+"""
+On-demand profiling of the running process
+
+``sample_stacks`` is a wall-clock sampling profiler.  For ``seconds`` it
+reads every thread's stack (``sys._current_frames``) once per ``interval``,
+from the calling thread.  Blocked frames are counted as well as running
+ones.  Time spent waiting on a lock, a socket or a queue therefore shows up
+next to time spent parsing HTML or PDFs or encoding JSON.  Nothing is
+instrumented, so profiled code runs at full speed apart from the GIL each
+sample holds briefly.
+
+Given a *session_id*, only threads inside that search's ``trace_context``
+are sampled: the thread running the search and the hedged fetches it
+started.  Searches run by worker processes (``SEARCH_WORKERS>0`` or Redis)
+are not visible from the web process.
+
+The result holds flamegraph-ready collapsed stacks and a table of the
+functions with the most samples.  Collapsed stacks are ``frame;frame;frame
+count`` lines, as read by flamegraph.pl and speedscope.
+
+``start_memory_trace`` starts tracemalloc.  Each ``memory_snapshot`` lists
+the biggest allocation sites and what grew since the previous snapshot.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import CodeType
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from utils.metrics import session_threads
+
+_capture_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_last_snapshot: Optional[tracemalloc.Snapshot] = None
+
+# allocations made by tracemalloc and the import system are noise here
+_MEMORY_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+class ProfilerBusy(RuntimeError):
+    """Another stack-sampling run is in progress."""
+
+
+def _frame_label(code: CodeType) -> str:
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+def _thread_label(name: str) -> str:
+    # pool threads differ only by number; fold them into one root frame
+    return re.sub(r"[-_]\d+", "", name).replace(";", ":")
+
+
+def sample_stacks(
+    seconds: float, interval: Optional[float] = None, session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Sample thread stacks for *seconds*; raises ``ProfilerBusy`` if a run is in progress."""
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        return _sample(seconds, interval or Config.PROFILE_SAMPLE_INTERVAL, session_id)
+    finally:
+        _capture_lock.release()
+
+
+def _sample(seconds: float, interval: float, session_id: Optional[str]) -> Dict[str, Any]:
+    interval = min(max(interval, 0.001), 1.0)
+    own = threading.get_ident()
+    labels: Dict[CodeType, str] = {}
+    stacks: Counter = Counter()
+    threads_seen = set()
+    ticks = 0
+
+    started = time.time()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        wanted = session_threads(session_id) if session_id is not None else None
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (wanted is not None and ident not in wanted):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            stack.append(_thread_label(names.get(ident, "thread")))
+            stacks[";".join(reversed(stack))] += 1
+            threads_seen.add(ident)
+        ticks += 1
+        time.sleep(interval)
+
+    return {
+        "mode": "sample",
+        "session_id": session_id,
+        "started": started,
+        "seconds": round(time.time() - started, 3),
+        "interval": interval,
+        "ticks": ticks,
+        "samples": sum(stacks.values()),
+        "threads": len(threads_seen),
+        "top": top_functions(stacks),
+        "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+    }
+
+
+def top_functions(stacks: Counter, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Functions by samples spent in them (self) and under them (total)."""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")[1:]  # the root frame is the thread
+        if not frames:
+            continue
+        own[frames[-1]] += count
+        for frame in set(frames):  # once per stack, however deep the recursion
+            total[frame] += count
+
+    samples = sum(stacks.values()) or 1
+    ranked = sorted(total, key=lambda f: (-own[f], -total[f]))
+    return [
+        {
+            "function": frame,
+            "self": own[frame],
+            "self_pct": round(100.0 * own[frame] / samples, 1),
+            "total": total[frame],
+            "total_pct": round(100.0 * total[frame] / samples, 1),
+        }
+        for frame in ranked[: limit or Config.PROFILE_TOP_N]
+    ]
+
+
+# ---------------------------------------------------------------------- #
+# Memory
+# ---------------------------------------------------------------------- #
+
+def start_memory_trace(frames: Optional[int] = None) -> Dict[str, Any]:
+    """Start tracemalloc (restarting it if running) and take the baseline snapshot."""
+    global _last_snapshot
+    with _memory_lock:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        tracemalloc.start(frames or Config.TRACEMALLOC_FRAMES)
+        _last_snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+    return memory_status()
+
+
+def stop_memory_trace() -> Dict[str, Any]:
+    global _last_snapshot
+    with _memory_lock:
+        tracemalloc.stop()
+        _last_snapshot = None
+    return memory_status()
+
+
+def memory_status() -> Dict[str, Any]:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "frames": tracemalloc.get_traceback_limit(),
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "overhead_kb": round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+    }
+
+
+def _where(traceback: tracemalloc.Traceback, group_by: str) -> Any:
+    if group_by == "traceback":
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+def memory_snapshot(group_by: str = "lineno", limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    The largest allocation sites now and the biggest growth since the previous
+    snapshot, grouped by ``lineno``, ``filename`` or ``traceback``.
+    """
+    global _last_snapshot
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise ValueError("group_by must be lineno, filename or traceback")
+    limit = limit or Config.PROFILE_TOP_N
+
+    with _memory_lock:
+        if not tracemalloc.is_tracing():
+            return memory_status()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        previous, _last_snapshot = _last_snapshot, snapshot
+
+    body = memory_status()
+    body["top"] = [
+        {
+            "where": _where(stat.traceback, group_by),
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+    if previous is not None:
+        body["growth"] = [
+            {
+                "where": _where(stat.traceback, group_by),
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(previous, group_by)[:limit]
+            if stat.size_diff > 0
+        ]
+    return body
@@ -0,0 +1,227 @@
+"""
+Asynchronous structured logging
+
+``configure_logging`` puts a ``QueueHandler`` on the root logger.  A call to
+``logger.info`` on the search thread only filters the record, merges its
+arguments into the message and puts it on an in-memory queue.  A
+``QueueListener`` thread does the formatting and the stream I/O.
+
+Three filters run before a record is queued:
+
+* records tagged ``extra={"event": name}`` below WARNING are kept with the
+  probability configured for *name* in ``LOG_SAMPLE_RATES``, and carry that
+  rate so counts can be scaled back up;
+* the current search's session id, depth and node (see ``utils.metrics``) are
+  stamped onto it, since the listener thread cannot see the caller's context;
+* WARNING-or-worse records from the same call site (logger, level, file
+  and line) are let through ``LOG_ERROR_BURST`` times per
+  ``LOG_ERROR_WINDOW`` seconds.  The next one after a quiet spell reports
+  how many were suppressed.  Keying on the call site rather than the
+  message also catches storms of f-string errors, whose text differs every
+  time.
+
+With ``LOG_FORMAT=json`` every line is a JSON object; ``text`` keeps the
+human-readable format.  A full queue drops records rather than blocking the
+search thread; ``logging_status`` reports the drops.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from utils.metrics import current_trace
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+WORKER_TEXT_FORMAT = '%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord attributes that are not ``extra`` fields
+_RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_TRACEBACKS = logging.Formatter()
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["_DroppingQueueHandler"] = None
+_lock = threading.Lock()
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """``"tree_update=0.1,child_node=0.5"`` -> ``{"tree_update": 0.1, "child_node": 0.5}``."""
+    rates = {}
+    for entry in spec.split(","):
+        event, _, rate = entry.partition("=")
+        if event.strip() and rate.strip():
+            rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamp the caller's trace context onto the record before it changes threads."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        session_id, depth, node_id = current_trace()
+        if session_id is not None and not hasattr(record, "session_id"):
+            record.session_id = session_id
+        if depth is not None and not hasattr(record, "depth"):
+            record.depth = depth
+        if node_id is not None and not hasattr(record, "node_id"):
+            record.node_id = node_id
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a configured fraction of each tagged, routine event."""
+
+    def __init__(self, rates: Dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event)
+        if rate is None or rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class RepeatFilter(logging.Filter):
+    """Let warnings and errors from one call site through a few times per window."""
+
+    def __init__(self, burst: int, window: float) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._seen: Dict[Tuple[str, int, str, int], list] = {}  # key -> [window_start, count]
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if len(self._seen) > 1000:
+                    self._seen.clear()
+                skipped = entry[1] - self.burst if entry and entry[1] > self.burst else 0
+                self._seen[key] = [now, 1]
+                if skipped:
+                    record.suppressed = skipped
+                return True
+            entry[1] += 1
+            if entry[1] <= self.burst:
+                return True
+            self.suppressed += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, ``extra`` fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.processName,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never block or raise on the caller's thread when the listener falls behind."""
+
+    def __init__(self, log_queue: "queue.Queue") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # merge the arguments now (they may change), but keep the traceback
+        # separate so the JSON formatter can give it its own field
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(worker: bool = False) -> None:
+    """Route the root logger through a queue to a background writer; idempotent."""
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler()
+        if Config.LOG_FORMAT == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(logging.Formatter(WORKER_TEXT_FORMAT if worker else TEXT_FORMAT))
+
+        _handler = _DroppingQueueHandler(queue.Queue(Config.LOG_QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter(parse_sample_rates(Config.LOG_SAMPLE_RATES)))
+        _handler.addFilter(TraceContextFilter())
+        _handler.addFilter(RepeatFilter(Config.LOG_ERROR_BURST, Config.LOG_ERROR_WINDOW))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(getattr(logging, Config.LOG_LEVEL.upper()))
+
+        _listener = QueueListener(_handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def logging_status() -> Dict[str, Any]:
+    if _handler is None:
+        return {"configured": False}
+    repeats = next((f for f in _handler.filters if isinstance(f, RepeatFilter)), None)
+    return {
+        "configured": True,
+        "format": Config.LOG_FORMAT,
+        "queued": _handler.queue.qsize(),
+        "dropped": _handler.dropped,
+        "suppressed_repeats": repeats.suppressed if repeats else 0,
+    }
@@ -0,0 +1,23 @@
+"""
+Token estimation utilities for LLM prompt budgeting
+"""
+
+import math
+
+# Gemini averages roughly four characters of English text per token; a cheap
+# heuristic is good enough for packing prompts under a budget.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate how many tokens *text* will consume in a prompt."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim *text* so that it fits within *max_tokens*."""
+    if max_tokens <= 0:
+        return ""
+    return text[: max_tokens * CHARS_PER_TOKEN]
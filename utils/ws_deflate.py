@@ -0,0 +1,75 @@
+"""
+permessage-deflate settings for the WebSocket transport
+
+simple-websocket (used by Engine.IO in threading mode) accepts a browser's
+permessage-deflate offer with wsproto's defaults: a 32 KiB window, default
+compression level, and context kept between messages.  ``install_ws_deflate``
+swaps in an extension built from Config: off, or with a chosen level, window
+and context takeover.
+
+Context takeover is what makes successive ``tree_update`` frames cheap – each
+one repeats most of the previous tree – at the cost of one compressor
+(roughly ``2 ** (window_bits + 2)`` bytes) per connection.  A window smaller
+than the client offered is always safe: the client's decompressor handles it.
+"""
+
+import logging
+import zlib
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_installed = False
+
+
+def _tuned_extension():
+    from wsproto.extensions import PerMessageDeflate
+    from wsproto.frame_protocol import Opcode
+
+    class TunedPerMessageDeflate(PerMessageDeflate):
+        def __init__(self) -> None:
+            super().__init__(
+                server_no_context_takeover=not Config.WS_DEFLATE_CONTEXT_TAKEOVER,
+                server_max_window_bits=Config.WS_DEFLATE_WINDOW_BITS,
+            )
+
+        def accept(self, offer):
+            window_bits = self.server_max_window_bits
+            accepted = super().accept(offer)
+            # the client may allow a bigger window than we want to spend memory on
+            self.server_max_window_bits = min(self.server_max_window_bits, window_bits)
+            return accepted
+
+        def frame_outbound(self, proto, opcode, rsv, data, fin):
+            if self._compressor is None and opcode is not Opcode.CONTINUATION and self._compressible_opcode(opcode):
+                self._compressor = zlib.compressobj(
+                    Config.WS_DEFLATE_LEVEL, zlib.DEFLATED, -int(self.server_max_window_bits)
+                )
+            return super().frame_outbound(proto, opcode, rsv, data, fin)
+
+    class NoDeflate(PerMessageDeflate):
+        def accept(self, offer):
+            return None  # declined: messages go out uncompressed
+
+    return TunedPerMessageDeflate if Config.WS_DEFLATE else NoDeflate
+
+
+def install_ws_deflate() -> bool:
+    """Use the configured permessage-deflate on new WebSocket connections; idempotent."""
+    global _installed
+    if _installed:
+        return True
+    try:
+        import simple_websocket.ws
+    except ModuleNotFoundError:  # other async modes bring their own WebSocket server
+        return False
+
+    simple_websocket.ws.PerMessageDeflate = _tuned_extension()
+    _installed = True
+    logger.info(
+        "WebSocket permessage-deflate: %s",
+        f"level {Config.WS_DEFLATE_LEVEL}, {Config.WS_DEFLATE_WINDOW_BITS}-bit window, "
+        f"context takeover {Config.WS_DEFLATE_CONTEXT_TAKEOVER}" if Config.WS_DEFLATE else "off",
+    )
+    return True